@@ -2,6 +2,8 @@
 ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Landing page tracking beacons are answered by prometei.beacon_lane in front of
+Django; every other request goes through the Django application.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Імпорт після налаштування Django: модуль тягне моделі
+from prometei.beacon_lane import BeaconFastLane  # noqa: E402
+
+application = BeaconFastLane(django_application)
@@ -111,10 +111,13 @@ ASGI_APPLICATION = 'config.asgi.application' # Додано, якщо викор
 # DATABASE_URL = os.environ.get('DATABASE_URL')
 
 # Тимчасово використовуємо SQLite навіть на продакшені для запуску сайту
+# WAL, busy_timeout та інші PRAGMA вмикає prometei.sqlite_tuning на кожному з'єднанні
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Транзакції лишаються DEFERRED, щоб читання не чекали замку запису;
+        # BEGIN IMMEDIATE відкривають лише записи через prometei.sqlite_tuning.db_writer
     }
 }
 
@@ -243,8 +246,21 @@ DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'Prometey Labs <info@p
 # Адреса, на яку будуть надходити контактні запити
 CONTACT_EMAIL = os.environ.get('CONTACT_EMAIL', 'info@prometeylabs.com')
 
+# Листи ставляться в чергу (OutboundEmail) і відправляються у фоні.
+# Якщо запущено окремий воркер (python manage.py send_queued_emails --loop),
+# вбудований потік у веб-процесі можна вимкнути: EMAIL_OUTBOX_INLINE_WORKER=False
+EMAIL_OUTBOX_INLINE_WORKER = os.environ.get('EMAIL_OUTBOX_INLINE_WORKER', 'True') == 'True'
+
+# Ліміти запитів мають бути спільними для всіх воркерів (WEB_CONCURRENCY),
+# тому за замовчуванням лічильники зберігаються в окремому SQLite-файлі.
+# Варіанти: 'sqlite', 'redis', 'cache' (кеш Django за замовчуванням)
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'sqlite')
+RATE_LIMIT_SQLITE_PATH = os.environ.get('RATE_LIMIT_SQLITE_PATH', os.path.join(BASE_DIR, 'ratelimit.sqlite3'))
+RATE_LIMIT_REDIS_URL = os.environ.get('RATE_LIMIT_REDIS_URL', 'redis://127.0.0.1:6379/0')
+
 # Налаштування Monobank Acquiring
 MONOBANK_TOKEN = os.environ.get('MONOBANK_TOKEN', '***REMOVED***')
+MONOBANK_API_URL = os.environ.get('MONOBANK_API_URL', 'https://api.monobank.ua')
 SITE_URL = os.environ.get('SITE_URL', 'https://www.prometeylabs.com')
 
 # Для локальної розробки
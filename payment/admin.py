@@ -1,4 +1,5 @@
 from django.contrib import admin, messages
+from django.db.models import Case, F, Value, When
 from django.utils.html import format_html, mark_safe
 from django.urls import reverse
 from django.utils import timezone
@@ -37,6 +38,21 @@ class PaymentLinkAdminForm(forms.ModelForm):
         if instance and instance.final_amount_uah:
                 self.fields['final_amount_uah_display'].initial = f"{instance.final_amount_uah} UAH"
 
+class EffectiveStatusFilter(admin.SimpleListFilter):
+    """Фільтр за статусом, у якому прострочені посилання вже вважаються протермінованими."""
+
+    title = 'Статус'
+    parameter_name = 'status'
+
+    def lookups(self, request, model_admin):
+        return PaymentLink.STATUS_CHOICES
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(effective_status=self.value())
+        return queryset
+
+
 @admin.register(PaymentLink)
 class PaymentLinkAdmin(admin.ModelAdmin):
     form = PaymentLinkAdminForm
@@ -45,12 +61,12 @@ class PaymentLinkAdmin(admin.ModelAdmin):
         'amount_usd',
         'exchange_rate_usd_to_uah',
         'final_amount_uah',
-        'status', 
+        'effective_status_display',
         'created_at',
         'expires_at',
         'payment_link_button'
     )
-    list_filter = ('status', 'created_at', 'duration_minutes')
+    list_filter = (EffectiveStatusFilter, 'created_at', 'duration_minutes')
     search_fields = ('client_name', 'client_email', 'description', 'unique_id')
     readonly_fields = (
         'unique_id', 'created_at', 'updated_at', 
@@ -88,6 +104,18 @@ class PaymentLinkAdmin(admin.ModelAdmin):
 
     def get_readonly_fields(self, request, obj=None):
         return self.readonly_fields
+
+    def get_queryset(self, request):
+        # Статус у БД оновлює команда expire_payment_links; до її запуску прострочені показуємо як протерміновані
+        return super().get_queryset(request).annotate(effective_status=Case(
+            When(PaymentLink.overdue_q(), then=Value('expired')),
+            default=F('status'),
+        ))
+
+    def effective_status_display(self, obj):
+        return dict(PaymentLink.STATUS_CHOICES).get(obj.effective_status, obj.effective_status)
+    effective_status_display.short_description = 'Статус'
+    effective_status_display.admin_order_field = 'effective_status'
         
     def payment_link_button(self, obj):
         """Додає кнопку для перегляду та копіювання посилання на сторінку оплати."""
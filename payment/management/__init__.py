@@ -0,0 +1 @@
+# Management commands directory 
\ No newline at end of file
@@ -0,0 +1 @@
+# Commands directory 
\ No newline at end of file
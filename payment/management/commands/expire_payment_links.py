@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from payment.models import PaymentLink
+
+
+class Command(BaseCommand):
+    help = "Позначає прострочені платіжні посилання як 'expired'"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Працювати постійно")
+        parser.add_argument('--interval', type=float, default=60, help="Пауза між проходами з --loop, с")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            expired = PaymentLink.expire_overdue()
+            if expired or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f"Протерміновано посилань: {expired}"))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
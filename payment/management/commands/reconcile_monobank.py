@@ -0,0 +1,94 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from payment.models import PaymentLink
+from payment.monobank_service import MONOBANK_POOL_SIZE, get_monobank_service
+
+# Статус інвойсу monobank -> статус PaymentLink (так само, як у monobank_webhook)
+INVOICE_STATUS_TRANSITIONS = {
+    'success': 'paid',
+}
+OUTSTANDING_STATUSES = ('new', 'pending')
+# expire_overdue позначає посилання 'expired' за часом, навіть якщо інвойс устигли оплатити
+EXPIRED_LOOKBACK_HOURS = 48
+
+
+class Command(BaseCommand):
+    help = "Звіряє статуси неоплачених посилань з monobank (на випадок втраченого webhook)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=min(8, MONOBANK_POOL_SIZE),
+                            help="Кількість паралельних запитів до API")
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help="Скільки посилань перевіряти та зберігати за один прохід")
+        parser.add_argument('--expired-hours', type=float, default=EXPIRED_LOOKBACK_HOURS,
+                            help="Також перевіряти посилання, що прострочилися за останні N годин")
+        parser.add_argument('--dry-run', action='store_true', help="Лише показати зміни, не зберігати")
+        parser.add_argument('--loop', action='store_true', help="Працювати постійно")
+        parser.add_argument('--interval', type=float, default=300, help="Пауза між проходами з --loop, с")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            self.reconcile(options)
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
+
+    def reconcile(self, options):
+        service = get_monobank_service()
+        started = time.monotonic()
+        checked = changed = errors = 0
+
+        expired_since = timezone.now() - timedelta(hours=options['expired_hours'])
+        outstanding = (
+            PaymentLink.objects
+            .filter(Q(status__in=OUTSTANDING_STATUSES) | Q(status='expired', expires_at__gte=expired_since),
+                    monobank_invoice_id__isnull=False)
+            .exclude(monobank_invoice_id='')
+            .only('id', 'unique_id', 'status', 'monobank_invoice_id')
+            .order_by('id')
+        )
+        last_id = 0
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            while True:
+                links = list(outstanding.filter(id__gt=last_id)[:options['chunk_size']])
+                if not links:
+                    break
+                last_id = links[-1].id
+
+                results = pool.map(lambda link: service.check_payment_status(link.monobank_invoice_id), links)
+                for link, result in zip(links, results):
+                    checked += 1
+                    if not result:
+                        errors += 1
+                        continue
+                    new_status = INVOICE_STATUS_TRANSITIONS.get(result.get('status'))
+                    if not new_status or new_status == link.status:
+                        continue
+                    values = {'status': new_status, 'updated_at': timezone.now()}
+                    if new_status == 'paid':
+                        values['payment_processed_at'] = (parse_datetime(result.get('modifiedDate') or '')
+                                                          or timezone.now())
+                    # Лише якщо статус не змінився з моменту вибірки: webhook чи адмін могли встигнути раніше
+                    if not options['dry_run'] and not PaymentLink.objects.filter(
+                            pk=link.pk, status=link.status).update(**values):
+                        continue
+                    changed += 1
+                    if options['verbosity'] >= 2:
+                        self.stdout.write(f"{link.unique_id}: {link.status} -> {new_status}")
+
+        elapsed = time.monotonic() - started
+        rate = checked / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Перевірено: {checked}, змінено: {changed}{' (dry run)' if options['dry_run'] else ''}, "
+            f"помилок: {errors}, час: {elapsed:.1f} с ({rate:.1f} інвойсів/с)"
+        ))
+        return checked, changed, errors
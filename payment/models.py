@@ -163,6 +163,25 @@ class PaymentLink(models.Model):
     def is_expired(self):
         return self.duration_minutes > 0 and self.expires_at and timezone.now() > self.expires_at
 
+    @staticmethod
+    def overdue_q(now=None):
+        """Умова для посилань, які вже прострочені, але ще не позначені як 'expired'."""
+        return models.Q(
+            expires_at__lt=now or timezone.now(),
+            duration_minutes__gt=0,
+            status__in=('new', 'pending'),
+        )
+
+    @classmethod
+    def expire_overdue(cls, now=None):
+        """
+        Позначає всі прострочені посилання як 'expired' одним UPDATE (через індекс expires_at).
+
+        :return: Кількість оновлених посилань
+        """
+        now = now or timezone.now()
+        return cls.objects.filter(cls.overdue_q(now)).update(status='expired', updated_at=now)
+
     def __str__(self):
         details = f"{self.amount_usd} USD"
         if self.final_amount_uah is not None:
@@ -1,28 +1,100 @@
 import requests
 import json
 import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.urls import reverse
 from django.core.exceptions import ImproperlyConfigured
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 
 logger = logging.getLogger(__name__)
 
+# Таймаути (connect, read) у секундах: недоступний API не повинен тримати воркер 30 с
+MONOBANK_CONNECT_TIMEOUT = getattr(settings, 'MONOBANK_CONNECT_TIMEOUT', 3.05)
+MONOBANK_READ_TIMEOUT = getattr(settings, 'MONOBANK_READ_TIMEOUT', 10)
+MONOBANK_POOL_SIZE = getattr(settings, 'MONOBANK_POOL_SIZE', 20)
+MONOBANK_MAX_RETRIES = getattr(settings, 'MONOBANK_MAX_RETRIES', 3)
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def build_session(pool_size=MONOBANK_POOL_SIZE, max_retries=MONOBANK_MAX_RETRIES):
+    """
+    Сесія з пулом keep-alive з'єднань і повторними спробами.
+
+    Запити повторюються з експоненційною затримкою та jitter лише тоді, коли
+    це безпечно: помилки з'єднання (запит ще не відправлено) для всіх методів,
+    помилки читання та 429/5xx відповіді лише для ідемпотентних GET.
+    """
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        allowed_methods=frozenset({'GET'}),
+        status_forcelist=(429, 500, 502, 503, 504),
+        backoff_factor=0.2,
+        backoff_max=5,
+        backoff_jitter=0.2,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    """Спільна для процесу сесія (окрема в кожному воркері після fork)."""
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        with _session_lock:
+            if _session is None or _session_pid != os.getpid():
+                _session = build_session()
+                _session_pid = os.getpid()
+    return _session
+
+
+_services = {}
+
+
+def get_monobank_service(token=None):
+    """Повторно використовує екземпляр сервісу (і його сесію) для токена."""
+    token = token or getattr(settings, 'MONOBANK_TOKEN', None)
+    service = _services.get(token)
+    if service is None:
+        service = _services[token] = MonobankAcquiringService(token)
+    return service
+
+
 class MonobankAcquiringService:
     """
     Сервіс для роботи з monobank acquiring API
     """
     
-    def __init__(self, token=None):
+    def __init__(self, token=None, session=None, base_url=None):
         """
         Ініціалізація сервісу
         :param token: Токен для API (якщо не передано, буде взято з settings)
+        :param session: HTTP-сесія (за замовчуванням спільна для процесу)
+        :param base_url: Адреса API (за замовчуванням MONOBANK_API_URL)
         """
         self.token = token or getattr(settings, 'MONOBANK_TOKEN', None)
         if not self.token:
             raise ImproperlyConfigured("MONOBANK_TOKEN must be set in settings")
         
-        self.base_url = "https://api.monobank.ua"
+        self.base_url = (base_url or getattr(settings, 'MONOBANK_API_URL', 'https://api.monobank.ua')).rstrip('/')
         self.headers = {'X-Token': self.token, 'Content-Type': 'application/json'}
+        self.session = session or get_session()
+        self.timeout = (MONOBANK_CONNECT_TIMEOUT, MONOBANK_READ_TIMEOUT)
     
     def create_invoice(self, payment_link, payment_method='card'):
         """
@@ -50,8 +122,8 @@ class MonobankAcquiringService:
             
             logger.info(f"Creating monobank invoice for {payment_link.unique_id}: {amount_kopecks} kopecks")
             
-            response = requests.post(f"{self.base_url}/api/merchant/invoice/create", 
-                                   headers=self.headers, json=payload, timeout=30)
+            response = self.session.post(f"{self.base_url}/api/merchant/invoice/create",
+                                         headers=self.headers, json=payload, timeout=self.timeout)
             
             if response.status_code == 200:
                 return response.json()
@@ -70,8 +142,8 @@ class MonobankAcquiringService:
         :return: Словник з даними статусу або None при помилці
         """
         try:
-            response = requests.get(f"{self.base_url}/api/merchant/invoice/status",
-                                  headers=self.headers, params={"invoiceId": invoice_id}, timeout=30)
+            response = self.session.get(f"{self.base_url}/api/merchant/invoice/status",
+                                        headers=self.headers, params={"invoiceId": invoice_id}, timeout=self.timeout)
             return response.json() if response.status_code == 200 else None
         except Exception as e:
             logger.error(f"Error checking payment status for invoice {invoice_id}: {str(e)}")
@@ -81,4 +153,38 @@ class MonobankAcquiringService:
         domain = getattr(settings, 'SITE_URL', 'http://localhost:8000')
         kwargs = {'link_uuid': uuid} if uuid else {}
         relative_url = reverse(url_name, kwargs=kwargs)
-        return f"{domain}{relative_url}" 
\ No newline at end of file
+        return f"{domain}{relative_url}"
+
+
+class AsyncMonobankAcquiringService:
+    """
+    Асинхронний варіант сервісу для ASGI-в'юх.
+
+    Виклики виконуються у власному пулі потоків (розміром з пул з'єднань) поверх
+    тієї ж спільної keep-alive сесії, тому event loop не блокується, а з'єднання
+    перевикористовуються.
+    """
+
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    def __init__(self, token=None, session=None, base_url=None):
+        self.sync_service = MonobankAcquiringService(token, session=session, base_url=base_url)
+
+    @classmethod
+    def executor(cls):
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(max_workers=MONOBANK_POOL_SIZE, thread_name_prefix='monobank')
+        return cls._executor
+
+    async def create_invoice(self, payment_link, payment_method='card'):
+        return await sync_to_async(self.sync_service.create_invoice, thread_sensitive=False, executor=self.executor())(
+            payment_link, payment_method=payment_method
+        )
+
+    async def check_payment_status(self, invoice_id):
+        return await sync_to_async(
+            self.sync_service.check_payment_status, thread_sensitive=False, executor=self.executor()
+        )(invoice_id)
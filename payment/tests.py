@@ -1,7 +1,20 @@
-from django.test import TestCase
+import asyncio
+import json
+import threading
+import uuid
+from io import StringIO
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from datetime import timedelta
 from payment.models import PaymentLink
+from payment.monobank_service import AsyncMonobankAcquiringService, MonobankAcquiringService, build_session
 from decimal import Decimal
 
 class PaymentLinkModelTest(TestCase):
@@ -64,3 +77,223 @@ class PaymentLinkModelTest(TestCase):
         expected_start = 'Платіжне посилання для Тестовий Клієнт - 100.00 USD'
         self.assertTrue(str(self.payment_link).startswith(expected_start))
         self.assertIn('Нове (не відкрито)', str(self.payment_link))
+
+
+class _MonobankStandInHandler(BaseHTTPRequestHandler):
+    """Keep-alive stand-in for the two acquiring endpoints; the first ``fail_next`` requests get 503."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self):
+        self.server.requests += 1
+        if self.server.fail_next:
+            self.server.fail_next -= 1
+            status, payload = 503, {'errCode': 'UNAVAILABLE'}
+        elif self.command == 'POST':
+            status, payload = 200, {'invoiceId': 'inv-1', 'pageUrl': 'https://pay.example/inv-1'}
+        else:
+            status, payload = 200, {'invoiceId': 'inv-1', 'status': 'success'}
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self._reply()
+
+
+class MonobankServiceTest(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _MonobankStandInHandler)
+        self.server.daemon_threads = True
+        self.server.connections = self.server.requests = self.server.fail_next = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self.service = MonobankAcquiringService('test-token', session=build_session(), base_url=base_url)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_session_reuses_connection(self):
+        for _ in range(3):
+            self.assertEqual(self.service.check_payment_status('inv-1')['status'], 'success')
+        self.assertEqual((self.server.requests, self.server.connections), (3, 1))
+
+    def test_status_check_is_retried(self):
+        self.server.fail_next = 2
+        self.assertEqual(self.service.check_payment_status('inv-1')['status'], 'success')
+        self.assertEqual(self.server.requests, 3)
+
+    def test_invoice_creation_is_not_retried(self):
+        """POST не ідемпотентний: повтор після відповіді сервера міг би створити другий інвойс"""
+        self.server.fail_next = 1
+        payment_link = PaymentLink(
+            client_name='Клієнт', amount_usd=Decimal('1.00'), exchange_rate_usd_to_uah=Decimal('40.00'),
+            final_amount_uah=Decimal('40.00'), description='Тест'
+        )
+        self.assertIsNone(self.service.create_invoice(payment_link))
+        self.assertEqual(self.server.requests, 1)
+
+    def test_async_variant(self):
+        async_service = AsyncMonobankAcquiringService('test-token', session=self.service.session,
+                                                      base_url=self.service.base_url)
+        result = asyncio.run(async_service.check_payment_status('inv-1'))
+        self.assertEqual(result['status'], 'success')
+
+
+class ReconcileMonobankCommandTest(TestCase):
+    def setUp(self):
+        self.statuses = {}
+        for i, (link_status, invoice_status) in enumerate([
+            ('pending', 'success'), ('pending', 'processing'), ('new', 'success'),
+            ('paid', 'success'), ('pending', None), ('expired', 'success'), ('expired', 'success'),
+        ]):
+            link = PaymentLink.objects.create(
+                client_name=f'Клієнт {i}', amount_usd=Decimal('10.00'), exchange_rate_usd_to_uah=Decimal('40.00'),
+                description='Тест', status=link_status, monobank_invoice_id=f'inv-{i}'
+            )
+            self.statuses[link.monobank_invoice_id] = invoice_status and {
+                'invoiceId': link.monobank_invoice_id, 'status': invoice_status,
+                'modifiedDate': '2025-05-01T10:00:00Z',
+            }
+        # inv-5 прострочилося годину тому, inv-6 — тиждень тому
+        now = timezone.now()
+        PaymentLink.objects.filter(monobank_invoice_id='inv-5').update(expires_at=now - timedelta(hours=1))
+        PaymentLink.objects.filter(monobank_invoice_id='inv-6').update(expires_at=now - timedelta(days=7))
+        PaymentLink.objects.create(client_name='Без інвойсу', amount_usd=Decimal('1.00'),
+                                   exchange_rate_usd_to_uah=Decimal('40.00'), description='Тест')
+        self.service = mock.Mock()
+        self.service.check_payment_status.side_effect = self.statuses.get
+
+    def run_command(self, *args):
+        out = StringIO()
+        with mock.patch('payment.management.commands.reconcile_monobank.get_monobank_service',
+                        return_value=self.service):
+            call_command('reconcile_monobank', *args, stdout=out)
+        return out.getvalue()
+
+    def test_paid_invoices_are_applied(self):
+        with self.assertNumQueries(5):  # chunk, UPDATE per paid link, empty chunk
+            output = self.run_command('--chunk-size', '10')
+        self.assertIn('Перевірено: 5, змінено: 3', output)
+        self.assertIn('помилок: 1', output)
+        self.assertEqual(self.service.check_payment_status.call_count, 5)
+
+        paid = PaymentLink.objects.filter(status='paid', monobank_invoice_id__in=['inv-0', 'inv-2', 'inv-5'])
+        self.assertEqual(paid.count(), 3)
+        self.assertEqual(paid.first().payment_processed_at.isoformat(), '2025-05-01T10:00:00+00:00')
+        self.assertEqual(PaymentLink.objects.get(monobank_invoice_id='inv-1').status, 'pending')
+        self.assertEqual(PaymentLink.objects.get(monobank_invoice_id='inv-6').status, 'expired')
+
+    def test_status_changed_meanwhile_is_not_overwritten(self):
+        def deactivated_by_admin(value):
+            # Адмін деактивує inv-0 між вибіркою посилань і їх оновленням
+            PaymentLink.objects.filter(monobank_invoice_id='inv-0').update(status='deactivated')
+            return parse_datetime(value)
+
+        with mock.patch('payment.management.commands.reconcile_monobank.parse_datetime', deactivated_by_admin):
+            output = self.run_command()
+        self.assertIn('змінено: 2', output)
+        self.assertEqual(PaymentLink.objects.get(monobank_invoice_id='inv-0').status, 'deactivated')
+
+    def test_dry_run_changes_nothing(self):
+        self.run_command('--dry-run')
+        self.assertEqual(PaymentLink.objects.filter(status='paid').count(), 1)
+
+
+class MonobankWebhookTest(TestCase):
+    def setUp(self):
+        self.link = PaymentLink.objects.create(
+            client_name='Клієнт', amount_usd=Decimal('10.00'), exchange_rate_usd_to_uah=Decimal('40.00'),
+            description='Тест', status='pending'
+        )
+
+    def post(self, payload):
+        return self.client.post(reverse('payment:monobank_webhook'), json.dumps(payload),
+                                content_type='application/json')
+
+    def test_success_marks_link_paid(self):
+        with self.assertNumQueries(1):
+            response = self.post({'status': 'processing', 'merchantPaymInfo': {'reference': str(self.link.unique_id)}})
+        self.assertEqual(response.status_code, 200)
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.status, 'pending')
+
+        with self.assertNumQueries(1):
+            self.post({'status': 'success', 'merchantPaymInfo': {'reference': str(self.link.unique_id)}})
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.status, 'paid')
+        self.assertIsNotNone(self.link.payment_processed_at)
+
+    def test_unknown_reference_and_bad_json(self):
+        with self.assertLogs('payment.views', 'ERROR'):
+            response = self.post({'status': 'success', 'merchantPaymInfo': {'reference': str(uuid.uuid4())}})
+        self.assertEqual(response.status_code, 200)
+        with self.assertLogs('payment.views', 'ERROR'):
+            response = self.client.post(reverse('payment:monobank_webhook'), 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ExpireOverdueLinksTest(TestCase):
+    def create_link(self, status='pending', expires_in=None, duration_minutes=60):
+        link = PaymentLink.objects.create(
+            client_name='Клієнт', amount_usd=Decimal('10.00'), exchange_rate_usd_to_uah=Decimal('40.00'),
+            description='Тест', status=status, duration_minutes=duration_minutes
+        )
+        if expires_in is not None:
+            PaymentLink.objects.filter(pk=link.pk).update(
+                first_opened_at=timezone.now(), expires_at=timezone.now() + expires_in
+            )
+        return link
+
+    def test_overdue_links_are_expired_in_one_update(self):
+        overdue = self.create_link(expires_in=timedelta(minutes=-1))
+        overdue_new = self.create_link(status='new', expires_in=timedelta(minutes=-5))
+        active = self.create_link(expires_in=timedelta(minutes=30))
+        paid = self.create_link(status='paid', expires_in=timedelta(minutes=-1))
+        unopened = self.create_link(status='new')
+
+        with self.assertNumQueries(1):
+            self.assertEqual(PaymentLink.expire_overdue(), 2)
+        statuses = dict(PaymentLink.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[overdue.pk], 'expired')
+        self.assertEqual(statuses[overdue_new.pk], 'expired')
+        self.assertEqual(statuses[active.pk], 'pending')
+        self.assertEqual(statuses[paid.pk], 'paid')
+        self.assertEqual(statuses[unopened.pk], 'new')
+
+        out = StringIO()
+        call_command('expire_payment_links', stdout=out)
+        self.assertIn('Протерміновано посилань: 0', out.getvalue())
+
+    def test_admin_shows_overdue_links_as_expired_without_writing(self):
+        overdue = self.create_link(expires_in=timedelta(minutes=-1))
+        self.create_link(expires_in=timedelta(minutes=30))
+        self.client.force_login(get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass'))
+        url = reverse('admin:payment_paymentlink_changelist')
+
+        response = self.client.get(url, {'status': 'expired'})
+        self.assertEqual([link.pk for link in response.context['cl'].result_list], [overdue.pk])
+        self.assertEqual(response.context['cl'].result_list[0].effective_status, 'expired')
+        self.assertEqual(PaymentLink.objects.get(pk=overdue.pk).status, 'pending')
+
+    def test_payment_page_does_not_write_expiry(self):
+        link = self.create_link(expires_in=timedelta(minutes=-1))
+        response = self.client.get(link.get_absolute_url())
+        self.assertTemplateUsed(response, 'payment/link_inactive.html')
+        self.assertEqual(PaymentLink.objects.get(pk=link.pk).status, 'pending')
+
@@ -8,7 +8,7 @@ from datetime import timedelta # Додано, якщо раптом було в
 import json
 import logging
 from .models import PaymentLink, PaymentSettings
-from .monobank_service import MonobankAcquiringService
+from .monobank_service import get_monobank_service
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
@@ -26,9 +26,9 @@ def payment_page_view(request, link_uuid):
             payment_link.status = 'pending'
         payment_link.save(update_fields=['first_opened_at', 'expires_at', 'status'])
     
+    # Статус у базі оновлює expire_payment_links; тут лише показуємо актуальний стан
     if payment_link.is_expired() and payment_link.status not in ['expired', 'paid', 'deactivated']:
         payment_link.status = 'expired'
-        payment_link.save(update_fields=['status'])
 
     inactive_statuses = ['paid', 'deactivated']
     if payment_link.duration_minutes > 0:
@@ -57,7 +57,7 @@ def create_monobank_invoice(request, link_uuid):
     payment_link = get_object_or_404(PaymentLink, unique_id=link_uuid)
     
     # Перевіряємо, чи може посилання використовуватися для оплати
-    if payment_link.status in ['paid', 'deactivated', 'expired']:
+    if payment_link.status in ['paid', 'deactivated', 'expired'] or payment_link.is_expired():
         messages.error(request, 'Це платіжне посилання більше не активне.')
         return redirect('payment:payment_page_view', link_uuid=link_uuid)
     
@@ -65,8 +65,8 @@ def create_monobank_invoice(request, link_uuid):
     payment_method = request.POST.get('payment_method', 'card')
     
     try:
-        # Ініціалізуємо сервіс monobank
-        mono_service = MonobankAcquiringService()
+        # Сервіс monobank зі спільною keep-alive сесією
+        mono_service = get_monobank_service()
         
         # Створюємо інвойс з перенаправленням на платіжну сторінку Monobank
         invoice_data = mono_service.create_invoice(payment_link, payment_method=payment_method)
@@ -91,7 +91,7 @@ def create_monobank_invoice(request, link_uuid):
 
 @csrf_exempt
 @require_POST
-def monobank_webhook(request):
+async def monobank_webhook(request):
     """
     Обробка webhook від monobank
     Згідно з документацією: зміст тіла запиту ідентичний відповіді запиту "Статус рахунку"
@@ -104,22 +104,22 @@ def monobank_webhook(request):
         logger.info(f"Monobank webhook: status={status}, reference={reference}")
         
         if reference:
-            try:
-                payment_link = PaymentLink.objects.get(unique_id=reference)
-                
-                if status == 'success':
-                    payment_link.status = 'paid'
-                    payment_link.payment_processed_at = timezone.now()
-                    payment_link.save(update_fields=['status', 'payment_processed_at'])
+            payment_links = PaymentLink.objects.filter(unique_id=reference)
+            if status == 'success':
+                # Один UPDATE замість get() + save(); save() полів status/payment_processed_at не змінює
+                found = await payment_links.aupdate(status='paid', payment_processed_at=timezone.now())
+                if found:
                     logger.info(f"Payment successful for {reference}")
-                elif status == 'failure':
+            else:
+                found = await payment_links.aexists()
+                if found and status == 'failure':
                     # Платіж не вдався, але посилання залишається активним
                     logger.info(f"Payment failed for {reference}")
-                elif status == 'processing':
+                elif found and status == 'processing':
                     # Платіж обробляється
                     logger.info(f"Payment processing for {reference}")
-                
-            except PaymentLink.DoesNotExist:
+
+            if not found:
                 logger.error(f"PaymentLink with reference {reference} not found")
         else:
             logger.warning("No reference found in webhook data")
@@ -182,7 +182,7 @@ def test_monobank_api(request):
                 description='Тестовий платіж для перевірки API Monobank'
             )
             
-            invoice_data = MonobankAcquiringService().create_invoice(test_payment)
+            invoice_data = get_monobank_service().create_invoice(test_payment)
             
             if invoice_data:
                 context.update({'success': True, 'invoice_data': invoice_data, 'test_payment': test_payment})
@@ -1,4 +1,5 @@
 from django.contrib import admin, messages
+from django.db.models import Count, F
 from django.urls import reverse, path
 from django.utils.html import format_html, escape
 from django.utils.safestring import mark_safe
@@ -7,9 +8,15 @@ from django.utils import timezone
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import HttpResponseRedirect
 from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
 from django.views.decorators.http import require_POST
-from .models import ContactRequest, LandingPage, LandingPageVisit, LandingPageInteraction, LandingPageTemplate
+from .models import (ContactRequest, LandingPage, LandingPageDailyStats, LandingPageVisit, LandingPageInteraction,
+                     LandingPageTemplate, OutboundEmail)
 from .forms import ContactForm
+from .landing_cache import invalidate_landing_slugs
+from .landing_stats import annotate_visit_totals
+from .path_samples import decode_path_samples
+from . import search
 import json
 
 # Register your models here.
@@ -39,6 +46,62 @@ class ContactRequestAdmin(admin.ModelAdmin):
         }),
     )
 
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipients', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('subject', 'to', 'last_error')
+    readonly_fields = ('subject', 'body', 'html_body', 'from_email', 'to', 'reply_to', 'attempts',
+                       'claimed_by', 'claimed_at', 'last_error', 'created_at', 'sent_at')
+    actions = ['retry_now']
+
+    def recipients(self, obj):
+        return ', '.join(obj.to)
+    recipients.short_description = _('Кому')
+
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=OutboundEmail.STATUS_SENT).update(
+            status=OutboundEmail.STATUS_PENDING, next_attempt_at=timezone.now(), claimed_by=''
+        )
+        self.message_user(request, _("Поставлено на повторну відправку: %(count)d") % {'count': updated})
+    retry_now.short_description = _('Відправити повторно зараз')
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(LandingPageDailyStats)
+class LandingPageDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ('date', 'landing_page_title', 'visits', 'unique_ips', 'time_spent_avg_formatted',
+                    'time_spent_p50', 'time_spent_p90', 'submits')
+    list_filter = ('landing_page',)
+    list_select_related = ('landing_page',)
+    date_hierarchy = 'date'
+    readonly_fields = ('landing_page', 'date', 'visits', 'unique_ips', 'time_spent_total', 'time_spent_avg',
+                       'time_spent_p50', 'time_spent_p90', 'interactions', 'submits', 'updated_at')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer(
+            'landing_page__html_content', 'landing_page__css_content', 'landing_page__js_content'
+        )
+
+    def landing_page_title(self, obj):
+        return obj.landing_page.title
+    landing_page_title.short_description = _('Лендінг')
+    landing_page_title.admin_order_field = 'landing_page__title'
+
+    def time_spent_avg_formatted(self, obj):
+        return f"{obj.time_spent_avg:.0f} сек"
+    time_spent_avg_formatted.short_description = _('Середній час')
+    time_spent_avg_formatted.admin_order_field = 'time_spent_avg'
+
+    # Рядки створює тільки rollup_landing_stats
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(LandingPageInteraction)
 class LandingPageInteractionAdmin(admin.ModelAdmin):
     list_display = ('visit_id_link', 'landing_page_title', 'interaction_type', 'element_id', 'element_type', 'timestamp')
@@ -47,15 +110,20 @@ class LandingPageInteractionAdmin(admin.ModelAdmin):
     readonly_fields = ('visit', 'element_id', 'element_type', 'interaction_type', 'timestamp')
     date_hierarchy = 'timestamp'
 
+    def get_queryset(self, request):
+        # Назва лендінгу одним JOIN, без завантаження візиту і сторінки для кожного рядка
+        return super().get_queryset(request).annotate(landing_page_title_value=F('visit__landing_page__title'))
+
     def visit_id_link(self, obj):
-        visit_url = reverse('admin:prometei_landingpagevisit_change', args=[obj.visit.id])
-        return mark_safe(f'<a href="{escape(visit_url)}">Візит {obj.visit.id}</a>')
+        visit_url = reverse('admin:prometei_landingpagevisit_change', args=[obj.visit_id])
+        return mark_safe(f'<a href="{escape(visit_url)}">Візит {obj.visit_id}</a>')
     visit_id_link.short_description = _('Візит ID')
     visit_id_link.admin_order_field = 'visit'
 
     def landing_page_title(self, obj):
-        return obj.visit.landing_page.title
+        return obj.landing_page_title_value
     landing_page_title.short_description = _('Лендінг')
+    landing_page_title.admin_order_field = 'landing_page_title_value'
 
     def has_add_permission(self, request):
         return False
@@ -91,10 +159,20 @@ class LandingPageVisitAdmin(admin.ModelAdmin):
                        'visit_time', 'time_spent', 'path_data_pretty', 'meta_data_pretty')
     inlines = [LandingPageInteractionInline]
     date_hierarchy = 'visit_time'
+
+    def get_queryset(self, request):
+        return (
+            super().get_queryset(request)
+            .select_related('landing_page')
+            .defer('landing_page__html_content', 'landing_page__css_content', 'landing_page__js_content')
+            .annotate(interactions_total=Count('interactions'))
+        )
     
     def path_data_pretty(self, obj):
         import json
-        return mark_safe(f"<pre>{escape(json.dumps(obj.path_data, indent=2, ensure_ascii=False))}</pre>")
+        # Нові візити зберігають семпли у path_samples, старі - у path_data
+        data = decode_path_samples(obj.path_samples) if obj.path_samples else obj.path_data
+        return mark_safe(f"<pre>{escape(json.dumps(data, indent=2, ensure_ascii=False))}</pre>")
     path_data_pretty.short_description = _('Дані активності (JSON)')
     
     def meta_data_pretty(self, obj):
@@ -103,7 +181,7 @@ class LandingPageVisitAdmin(admin.ModelAdmin):
     meta_data_pretty.short_description = _('Метадані відвідувача (JSON)')
 
     def landing_page_link(self, obj):
-        lp_url = reverse('admin:prometei_landingpage_change', args=[obj.landing_page.id])
+        lp_url = reverse('admin:prometei_landingpage_change', args=[obj.landing_page_id])
         return mark_safe(f'<a href="{escape(lp_url)}">{escape(obj.landing_page.title)}</a>')
     landing_page_link.short_description = _('Лендінг')
     landing_page_link.admin_order_field = 'landing_page'
@@ -119,8 +197,9 @@ class LandingPageVisitAdmin(admin.ModelAdmin):
     time_spent_formatted.admin_order_field = 'time_spent'
 
     def interactions_count(self, obj):
-        return obj.interactions.count()
+        return obj.interactions_total
     interactions_count.short_description = _('Взаємодій')
+    interactions_count.admin_order_field = 'interactions_total'
     
     def has_add_permission(self, request):
         return False # Visits are created automatically
@@ -129,6 +208,16 @@ class LandingPageVisitAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         return request.user.is_superuser
 
+class LandingPageChangeList(ChangeList):
+    """Під час пошуку без явного сортування найкращі збіги йдуть першими"""
+
+    def get_queryset(self, request, exclude_parameters=None):
+        qs = super().get_queryset(request, exclude_parameters)
+        if self.query and ORDER_VAR not in self.params and search.backend() is not None:
+            qs = qs.order_by('search_rank', '-pk')
+        return qs
+
+
 @admin.register(LandingPage)
 class LandingPageAdmin(admin.ModelAdmin):
     list_display = ('title', 'slug_link', 'is_active', 'created_at', 'visit_count_admin', 'generate_link_button')
@@ -156,6 +245,18 @@ class LandingPageAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        return annotate_visit_totals(super().get_queryset(request))
+
+    def get_search_results(self, request, queryset, search_term):
+        # Пошук через повнотекстовий індекс замість icontains по html_content
+        if not search_term or search.backend() is None:
+            return super().get_search_results(request, queryset, search_term)
+        return search.search_queryset(queryset, search_term), False
+
+    def get_changelist(self, request, **kwargs):
+        return LandingPageChangeList
+
     def slug_link(self,obj):
         if obj.slug:
             return mark_safe(f'<a href="{escape(obj.get_absolute_url())}" target="_blank">{escape(obj.slug)}</a>')
@@ -164,10 +265,11 @@ class LandingPageAdmin(admin.ModelAdmin):
     slug_link.admin_order_field = 'slug'
 
     def visit_count_admin(self, obj):
-        count = obj.visits.count()
+        count = obj.visit_total
         url = reverse('admin:prometei_landingpagevisit_changelist') + f'?landing_page__id__exact={obj.id}'
         return mark_safe(f'<a href="{escape(url)}">{count}</a>')
     visit_count_admin.short_description = _('Візити')
+    visit_count_admin.admin_order_field = 'visit_total'
     
     def generate_link_button(self, obj):
         if obj.id is None: # Check if the object is saved
@@ -194,12 +296,16 @@ class LandingPageAdmin(admin.ModelAdmin):
     admin_generate_new_links.short_description = _("Згенерувати нові посилання для обраних")
 
     def activate_pages(self, request, queryset):
+        slugs = list(queryset.values_list('slug', flat=True))
         updated_count = queryset.update(is_active=True, updated_at=timezone.now())
+        invalidate_landing_slugs(slugs)  # update() не надсилає post_save
         self.message_user(request, _("%(count)d лендінгів активовано.") % {'count': updated_count}, messages.SUCCESS)
     activate_pages.short_description = _("Активувати обрані лендінги")
 
     def deactivate_pages(self, request, queryset):
+        slugs = list(queryset.values_list('slug', flat=True))
         updated_count = queryset.update(is_active=False, updated_at=timezone.now())
+        invalidate_landing_slugs(slugs)
         self.message_user(request, _("%(count)d лендінгів деактивовано.") % {'count': updated_count}, messages.SUCCESS)
     deactivate_pages.short_description = _("Деактивувати обрані лендінги")
 
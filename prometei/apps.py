@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PrometeiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'prometei'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
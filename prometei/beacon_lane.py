@@ -0,0 +1,257 @@
+"""
+Beacon Fast Lane
+
+ASGI middleware mounted in front of the Django application (config/asgi.py).
+It answers the landing page tracking beacons itself, without the MIDDLEWARE
+stack (sessions, locale, CSRF, auth, messages, WhiteNoise) and without
+building an HttpRequest:
+
+    /<lang>/landing/track/        visit summary      -> visit_ingest.summary_buffer
+    /<lang>/landing/interaction/  one interaction    -> visit_ingest.interaction_queue
+    /<lang>/landing/events/       batched beacon     -> both
+
+A beacon is parsed and validated, its signed visit token is verified, the
+rate limit is hit with the same keys as the Django views, and the cleaned
+rows are queued. Requests get the same status codes and JSON as from the
+views, with one exception: the lane never returns 404 for an unknown visit.
+Rows of unknown visits are dropped when they are written, like buffered
+track heartbeats.
+
+The CSRF check is not repeated. The visit token is only handed out with the
+rendered page, and a beacon acts on no session, so the token is all the
+anti-forgery these endpoints need.
+
+Everything else goes to the Django application unchanged: every beacon
+while LANDING_BEACON_FAST_LANE or LANDING_VISIT_INGEST_ASYNC is off, and
+beacons whose Host is not in ALLOWED_HOSTS, so Django rejects them as usual.
+"""
+
+import json
+import logging
+
+from django.conf import settings
+from django.http.request import split_domain_port, validate_host
+from django.urls import reverse
+from django.utils import translation
+
+from . import views, visit_ingest
+from .models import LandingPageInteraction, LandingPageVisit
+from .payload_schema import clean_element
+from .visit_tokens import InvalidVisitToken, verify_visit_token
+
+logger = logging.getLogger(__name__)
+
+BEACON_URL_NAMES = {
+    'prometei:landing_track': 'track',
+    'prometei:landing_interaction': 'interaction',
+    'prometei:landing_events': 'events',
+}
+
+_HEADERS = [
+    (b'content-type', b'application/json'),
+    (b'cache-control', b'max-age=0, no-cache, no-store, must-revalidate, private'),
+    (b'x-content-type-options', b'nosniff'),
+]
+
+
+class BeaconError(Exception):
+    """A beacon rejected with an HTTP status and the message of the Django view."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def beacon_paths():
+    """Map each language's beacon URL (without the script prefix) to its beacon kind."""
+    paths = {}
+    for code, _name in settings.LANGUAGES:
+        with translation.override(code):
+            for url_name, kind in BEACON_URL_NAMES.items():
+                paths[reverse(url_name)] = kind
+    return paths
+
+
+def header(scope, name):
+    """Value of a request header (repeated headers joined with commas), or None."""
+    values = [value.decode('latin-1') for key, value in scope.get('headers', ()) if key == name]
+    return ','.join(values) if values else None
+
+
+def client_ip(scope):
+    """get_client_ip() for an ASGI scope."""
+    client = scope.get('client')
+    return views.client_ip_from(header(scope, b'x-forwarded-for'), client[0] if client else '')
+
+
+def host_allowed(scope):
+    """HttpRequest.get_host()'s ALLOWED_HOSTS check for an ASGI scope."""
+    host = None
+    if settings.USE_X_FORWARDED_HOST:
+        host = header(scope, b'x-forwarded-host')
+    if host is None:
+        host = header(scope, b'host')
+    if host is None and scope.get('server'):
+        host = scope['server'][0]
+    allowed_hosts = settings.ALLOWED_HOSTS
+    if settings.DEBUG and not allowed_hosts:
+        allowed_hosts = ['.localhost', '127.0.0.1', '[::1]']
+    domain, _port = split_domain_port(host or '')
+    return bool(domain) and validate_host(domain, allowed_hosts)
+
+
+async def read_body(receive, max_size):
+    """
+    Read the whole request body.
+
+    Returns:
+        bytes: The body, or None if the client disconnected
+
+    Raises:
+        BeaconError: If the body is larger than ``max_size`` bytes
+    """
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if max_size is not None and size > max_size:
+            raise BeaconError(413, 'Request body too large.')
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+class BeaconFastLane:
+    """ASGI application that handles beacon POSTs and passes everything else to ``app``."""
+
+    def __init__(self, app):
+        self.app = app
+        self._paths = None
+
+    @property
+    def paths(self):
+        if self._paths is None:
+            self._paths = beacon_paths()
+        return self._paths
+
+    def match(self, scope):
+        """Beacon kind of an ASGI scope, or None if Django should handle it."""
+        if scope['type'] != 'http' or scope['method'] != 'POST':
+            return None
+        if not getattr(settings, 'LANDING_BEACON_FAST_LANE', True):
+            return None
+        if not getattr(settings, 'LANDING_VISIT_INGEST_ASYNC', True):
+            return None  # Immediate writes and their 404s stay with the views
+        path, root_path = scope['path'], scope.get('root_path', '')
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        kind = self.paths.get(path)
+        if kind is None or not host_allowed(scope):
+            return None
+        return kind
+
+    async def __call__(self, scope, receive, send):
+        kind = self.match(scope)
+        if kind is None:
+            return await self.app(scope, receive, send)
+
+        try:
+            body = await read_body(receive, settings.DATA_UPLOAD_MAX_MEMORY_SIZE)
+            if body is None:
+                return
+            status, payload = 200, await self.handle(kind, scope, body)
+        except BeaconError as e:
+            status, payload = e.status, {'status': 'error', 'message': e.message}
+        except Exception as e:
+            logger.error(f"Error in beacon fast lane ({kind}): {e}", exc_info=True)
+            status, payload = 500, {'status': 'error', 'message': 'Server error.'}
+
+        body = json.dumps(payload).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': _HEADERS + [(b'content-length', str(len(body)).encode('ascii'))],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def handle(self, kind, scope, body):
+        """
+        Validate and queue one beacon.
+
+        Returns:
+            dict: The success payload
+
+        Raises:
+            BeaconError: With the status and message the Django view would return
+        """
+        try:
+            data = json.loads(body)
+        except ValueError:
+            raise BeaconError(400, 'Invalid JSON.')
+        if not isinstance(data, dict):
+            raise BeaconError(400, 'Invalid payload.')
+
+        if kind == 'interaction' and not data.get('type'):
+            raise BeaconError(400, 'Missing required interaction data (visit_token, type).')
+        if kind == 'events':
+            events = data.get('interactions') or []
+            summary = data.get('summary')
+            if not isinstance(events, list) or len(events) > views.MAX_EVENTS_PER_BATCH:
+                raise BeaconError(400, f'Expected at most {views.MAX_EVENTS_PER_BATCH} interactions.')
+            if summary is not None and not isinstance(summary, dict):
+                raise BeaconError(400, 'Invalid summary.')
+
+        ip = client_ip(scope)
+        token = data.get('visit_token')
+        if not token:
+            raise BeaconError(400, 'Missing visit_token.')
+        try:
+            token = verify_visit_token(token)
+        except InvalidVisitToken as e:
+            logger.warning(f"Rejected tracking beacon from IP {ip}: {e}")
+            raise BeaconError(403, 'Invalid or expired visit_token.')
+
+        key_prefix, rate = {
+            'track': ('lp_track', views.RATE_LIMIT_TRACK_LP),
+            'interaction': ('lp_interact', views.RATE_LIMIT_INTERACT_LP),
+            'events': ('lp_events', views.RATE_LIMIT_EVENTS_LP),
+        }[kind]
+        try:
+            await views.acheck_rate_limit_for_ip(ip, f"{key_prefix}:{token.slug}", rate)
+        except views.RateLimitExceeded:
+            raise BeaconError(429, 'Rate limit exceeded.')
+
+        if kind == 'track':
+            await self.submit_summary(token.visit_id, data)
+            return {'status': 'success'}
+
+        if kind == 'interaction':
+            interaction_type = data['type']
+            if interaction_type not in views.VALID_INTERACTION_TYPES:
+                interaction_type = 'click'
+            element_id, element_tag = clean_element(data.get('element_id'), data.get('element_tag'))
+            await visit_ingest.interaction_queue.asubmit(LandingPageInteraction(
+                visit_id=token.visit_id,
+                interaction_type=interaction_type,
+                element_id=element_id,
+                element_type=element_tag,
+            ))
+            return {'status': 'success'}
+
+        interactions = views.build_batch_interactions(token.visit_id, events, data.get('sent_at'))
+        for interaction in interactions:
+            await visit_ingest.interaction_queue.asubmit(interaction)
+        if summary:
+            await self.submit_summary(token.visit_id, summary)
+        return {'status': 'success', 'accepted': len(interactions)}
+
+    async def submit_summary(self, visit_id, data):
+        visit = LandingPageVisit(id=visit_id)
+        fields = views.apply_visit_summary(visit, data)
+        if fields:
+            await visit_ingest.summary_buffer.asubmit(visit_id, {name: getattr(visit, name) for name in fields})
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.checks import Error, register
+
+from .landing_cache import is_process_local_cache
+
+
+@register()
+def check_slug_cache_is_shared(app_configs, **kwargs):
+    """Level 2 of the slug cache must be visible to every worker, or invalidation misses the others."""
+    if getattr(settings, 'LANDING_SLUG_CACHE_SHARED', None) and is_process_local_cache(caches['default']):
+        return [Error(
+            'LANDING_SLUG_CACHE_SHARED is on, but the default cache is local to each process.',
+            hint='Configure CACHES with Redis, Memcached, the database or file cache, '
+                 'or leave LANDING_SLUG_CACHE_SHARED unset.',
+            id='prometei.E001',
+        )]
+    return []
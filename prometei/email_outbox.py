@@ -0,0 +1,236 @@
+"""
+Email Outbox
+
+Views no longer talk to SMTP. ``enqueue`` stores the message as an
+OutboundEmail row and returns; a worker delivers due rows in batches over a
+single reused SMTP connection (``get_connection``), retrying failures with
+exponential backoff.
+
+Workers:
+    ``python manage.py send_queued_emails --loop``: dedicated daemon
+    in-process kick: with ``EMAIL_OUTBOX_INLINE_WORKER`` enabled (default) a
+        daemon thread drains the outbox after each enqueue, so mail still goes
+        out when no dedicated worker is running
+
+Rows are claimed with a conditional UPDATE tagged with a per-run token, so
+several workers (and several processes) never send the same row twice.
+"""
+
+import logging
+import random
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50)
+OUTBOX_MAX_ATTEMPTS = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 6)
+OUTBOX_RETRY_BASE = getattr(settings, 'EMAIL_OUTBOX_RETRY_BASE', 30)  # seconds
+OUTBOX_RETRY_MAX = getattr(settings, 'EMAIL_OUTBOX_RETRY_MAX', 60 * 60)  # seconds
+OUTBOX_CLAIM_TIMEOUT = getattr(settings, 'EMAIL_OUTBOX_CLAIM_TIMEOUT', 10 * 60)  # seconds
+
+
+def enqueue(message):
+    """
+    Store an EmailMessage / EmailMultiAlternatives for background delivery.
+
+    Args:
+        message: Unsent Django email message
+
+    Returns:
+        OutboundEmail: The queued row
+    """
+    html_body = ''
+    for content, mimetype in getattr(message, 'alternatives', []):
+        if mimetype == 'text/html':
+            html_body = content
+            break
+    reply_to = message.reply_to[0] if message.reply_to else message.extra_headers.get('Reply-To', '')
+
+    email = OutboundEmail.objects.create(
+        subject=str(message.subject),
+        body=message.body,
+        html_body=html_body,
+        from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(message.to),
+        reply_to=reply_to,
+    )
+    if getattr(settings, 'EMAIL_OUTBOX_INLINE_WORKER', True):
+        transaction.on_commit(kick)
+    return email
+
+
+def build_message(email, connection=None):
+    """Rebuild the Django email message for a queued row."""
+    msg = EmailMultiAlternatives(
+        email.subject,
+        email.body,
+        email.from_email,
+        email.to,
+        connection=connection,
+        reply_to=[email.reply_to] if email.reply_to else None,
+    )
+    if email.html_body:
+        msg.attach_alternative(email.html_body, 'text/html')
+    return msg
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter for the given number of failed attempts."""
+    delay = min(OUTBOX_RETRY_BASE * (2 ** (attempts - 1)), OUTBOX_RETRY_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_batch(limit=OUTBOX_BATCH_SIZE, now=None):
+    """
+    Claim up to ``limit`` due emails for this worker.
+
+    Rows left in ``sending`` by a crashed worker become claimable again after
+    EMAIL_OUTBOX_CLAIM_TIMEOUT.
+    """
+    now = now or timezone.now()
+    due = (
+        Q(status=OutboundEmail.STATUS_PENDING, next_attempt_at__lte=now)
+        | Q(status=OutboundEmail.STATUS_SENDING, claimed_at__lt=now - timedelta(seconds=OUTBOX_CLAIM_TIMEOUT))
+    )
+    ids = list(OutboundEmail.objects.filter(due).order_by('next_attempt_at').values_list('id', flat=True)[:limit])
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    OutboundEmail.objects.filter(due, id__in=ids).update(
+        status=OutboundEmail.STATUS_SENDING, claimed_by=token, claimed_at=now
+    )
+    return list(OutboundEmail.objects.filter(claimed_by=token, status=OutboundEmail.STATUS_SENDING))
+
+
+def send_batch(emails, connection=None):
+    """
+    Deliver claimed emails over one SMTP connection.
+
+    Returns:
+        tuple: (sent, retried, failed)
+    """
+    sent = retried = failed = 0
+    if not emails:
+        return sent, retried, failed
+
+    connection = connection or get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        logger.error(f"Не вдалося підключитися до SMTP, відкладаємо {len(emails)} листів: {e}")
+        for email in emails:
+            if _mark_failed(email, e):
+                retried += 1
+            else:
+                failed += 1
+        return sent, retried, failed
+
+    try:
+        for email in emails:
+            try:
+                if connection.send_messages([build_message(email, connection)]) != 1:
+                    raise RuntimeError('SMTP backend reported 0 messages sent')
+            except Exception as e:
+                logger.warning(f"Помилка відправки листа ID {email.id} (спроба {email.attempts + 1}): {e}")
+                if _mark_failed(email, e):
+                    retried += 1
+                else:
+                    failed += 1
+                # A broken session would fail every following message; start a fresh one.
+                _reopen(connection)
+                continue
+            email.status = OutboundEmail.STATUS_SENT
+            email.sent_at = timezone.now()
+            email.attempts += 1
+            email.last_error = ''
+            email.save(update_fields=['status', 'sent_at', 'attempts', 'last_error'])
+            sent += 1
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            pass
+    return sent, retried, failed
+
+
+def _reopen(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
+    try:
+        connection.open()
+    except Exception as e:
+        logger.error(f"Не вдалося перепідключитися до SMTP: {e}")
+
+
+def _mark_failed(email, error):
+    """Schedule a retry or give up. Returns True if the email will be retried."""
+    email.attempts += 1
+    email.last_error = str(error)[:1000]
+    if email.attempts >= OUTBOX_MAX_ATTEMPTS:
+        email.status = OutboundEmail.STATUS_FAILED
+        logger.error(f"Лист ID {email.id} не відправлено після {email.attempts} спроб: {error}")
+    else:
+        email.status = OutboundEmail.STATUS_PENDING
+        email.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay(email.attempts))
+    email.claimed_by = ''
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at', 'claimed_by'])
+    return email.status == OutboundEmail.STATUS_PENDING
+
+
+def process_outbox(batch_size=OUTBOX_BATCH_SIZE, connection=None):
+    """
+    Send everything that is due, batch by batch.
+
+    Returns:
+        dict: Totals of sent, retried and failed emails
+    """
+    totals = {'sent': 0, 'retried': 0, 'failed': 0}
+    while True:
+        emails = claim_batch(batch_size)
+        if not emails:
+            return totals
+        sent, retried, failed = send_batch(emails, connection)
+        totals['sent'] += sent
+        totals['retried'] += retried
+        totals['failed'] += failed
+        if retried or failed:
+            # Do not spin on a failing server; the rest waits for the next run.
+            return totals
+
+
+_kick_lock = threading.Lock()
+_kick_event = threading.Event()
+_kick_thread = None
+
+
+def kick():
+    """Wake the in-process outbox thread, starting it on first use."""
+    global _kick_thread
+    with _kick_lock:
+        if _kick_thread is None or not _kick_thread.is_alive():
+            _kick_thread = threading.Thread(target=_run_inline_worker, name='email-outbox', daemon=True)
+            _kick_thread.start()
+    _kick_event.set()
+
+
+def _run_inline_worker():
+    while True:
+        _kick_event.wait(timeout=OUTBOX_RETRY_BASE)
+        _kick_event.clear()
+        close_old_connections()
+        try:
+            process_outbox()
+        except Exception as e:
+            logger.error(f"Помилка обробки черги листів: {e}", exc_info=True)
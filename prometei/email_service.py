@@ -8,11 +8,18 @@ from django.utils.translation import gettext_lazy as _
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 
+from . import email_outbox
+
 # Налаштування логування
 logger = logging.getLogger(__name__)
 
 class EmailService:
-    """Сервіс для відправки електронних листів."""
+    """
+    Сервіс для відправки електронних листів.
+
+    Листи не відправляються під час запиту: вони ставляться в чергу
+    (див. email_outbox) і доставляються фоновим воркером.
+    """
     
     @staticmethod
     def is_valid_email(email):
@@ -53,7 +60,7 @@ class EmailService:
             contact_request: Екземпляр моделі ContactRequest
         
         Returns:
-            bool: True якщо відправлено успішно, False у разі помилки
+            bool: True якщо лист поставлено в чергу, False у разі помилки
         """
         try:
             context = {
@@ -105,18 +112,13 @@ class EmailService:
             if EmailService.is_valid_email(contact_request.contact_method):
                 msg.extra_headers = {'Reply-To': contact_request.contact_method}
             
-            # Відправляємо лист
-            num_sent = msg.send(fail_silently=False)
-            
-            if num_sent > 0:
-                logger.info(f"Успішно відправлено email про контактний запит ID {contact_request.id}")
-                return True
-            else:
-                logger.warning(f"Не вдалося відправити email про контактний запит ID {contact_request.id}")
-                return False
+            # Ставимо лист у чергу на відправку
+            queued = email_outbox.enqueue(msg)
+            logger.info(f"Email про контактний запит ID {contact_request.id} поставлено в чергу (лист ID {queued.id})")
+            return True
             
         except Exception as e:
-            logger.error(f"Помилка відправки email для контактного запиту ID {contact_request.id}: {str(e)}")
+            logger.error(f"Помилка підготовки email для контактного запиту ID {contact_request.id}: {str(e)}")
             return False
     
     @staticmethod
@@ -128,7 +130,7 @@ class EmailService:
             contact_request: Екземпляр моделі ContactRequest
         
         Returns:
-            bool: True якщо відправлено успішно, False у разі помилки
+            bool: True якщо лист поставлено в чергу, False у разі помилки
         """
         # Перевіряємо, чи контактний метод є email
         if not EmailService.is_valid_email(contact_request.contact_method):
@@ -182,16 +184,11 @@ class EmailService:
             )
             msg.attach_alternative(html_content, "text/html")
             
-            # Відправляємо лист
-            num_sent = msg.send(fail_silently=False)
-            
-            if num_sent > 0:
-                logger.info(f"Успішно відправлено підтвердження користувачу {to_email}")
-                return True
-            else:
-                logger.warning(f"Не вдалося відправити підтвердження користувачу {to_email}")
-                return False
+            # Ставимо лист у чергу на відправку
+            queued = email_outbox.enqueue(msg)
+            logger.info(f"Підтвердження користувачу {to_email} поставлено в чергу (лист ID {queued.id})")
+            return True
             
         except Exception as e:
-            logger.error(f"Помилка відправки підтвердження користувачу: {str(e)}")
+            logger.error(f"Помилка підготовки підтвердження користувачу: {str(e)}")
             return False 
\ No newline at end of file
@@ -0,0 +1,183 @@
+"""
+Landing Page Slug Cache
+
+Resolves a ``/landing/<slug>/`` hit to a LandingPageSnapshot (id, slug,
+updated_at) without loading the page's HTML/CSS/JS columns:
+
+    1. per-process LRU      LANDING_SLUG_CACHE_SIZE entries, LANDING_SLUG_CACHE_LOCAL_TTL seconds
+    2. shared Django cache  LANDING_SLUG_CACHE_TIMEOUT seconds, only if shared
+    3. database             one indexed lookup of three columns
+
+Unknown and inactive slugs are cached too (LANDING_SLUG_CACHE_NEGATIVE_TIMEOUT),
+so bots replaying URL lists stop reaching the database after the first hit.
+
+Entries are dropped by the LandingPage post_save/post_delete handlers (old and
+new slug) and by ``invalidate_landing_slugs()`` after queryset ``update()``s.
+Entries are dropped again on commit, in case a concurrent request re-cached
+the old row.
+
+Invalidation only reaches other worker processes through level 2, so level 2
+is only used when the default cache is shared between processes (Redis,
+Memcached, database, file). With the per-process LocMemCache, which is what
+an unset CACHES gives, level 2 is skipped, and other processes see a change
+after at most the local TTL. LANDING_SLUG_CACHE_SHARED forces level 2 on or
+off; forcing it on over LocMemCache fails the system check (prometei.E001).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from .models import LandingPage
+
+SLUG_CACHE_VERSION = 1
+SLUG_CACHE_SIZE = getattr(settings, 'LANDING_SLUG_CACHE_SIZE', 4096)
+SLUG_CACHE_LOCAL_TTL = getattr(settings, 'LANDING_SLUG_CACHE_LOCAL_TTL', 5)
+SLUG_CACHE_TIMEOUT = getattr(settings, 'LANDING_SLUG_CACHE_TIMEOUT', 60 * 60)
+SLUG_CACHE_NEGATIVE_TIMEOUT = getattr(settings, 'LANDING_SLUG_CACHE_NEGATIVE_TIMEOUT', 5 * 60)
+
+_NOT_FOUND = 0  # shared cache value of an unknown or inactive slug (None means "not cached")
+
+
+class LandingPageSnapshot:
+    """What a landing page hit needs before the render cache: id, slug and version."""
+
+    __slots__ = ('id', 'slug', 'updated_at')
+
+    def __init__(self, id, slug, updated_at):
+        self.id = id
+        self.slug = slug
+        self.updated_at = updated_at
+
+    def __eq__(self, other):
+        return isinstance(other, LandingPageSnapshot) and \
+            (self.id, self.slug, self.updated_at) == (other.id, other.slug, other.updated_at)
+
+    def __repr__(self):
+        return f'<LandingPageSnapshot {self.id} {self.slug}>'
+
+
+def slug_cache_key(slug):
+    return f"lp_slug:v{SLUG_CACHE_VERSION}:{slug}"
+
+
+def is_process_local_cache(backend):
+    """True for cache backends whose contents other worker processes cannot see."""
+    return isinstance(backend, (LocMemCache, DummyCache))
+
+
+def shared_slug_cache():
+    """
+    The cache used as level 2, or None if there is no shared one.
+
+    LANDING_SLUG_CACHE_SHARED: None (default) to decide from the backend,
+    True/False to force it.
+    """
+    backend = caches['default']
+    shared = getattr(settings, 'LANDING_SLUG_CACHE_SHARED', None)
+    if shared is None:
+        shared = not is_process_local_cache(backend)
+    return backend if shared else None
+
+
+class SlugCache:
+    """Per-process LRU in front of the shared cache; values are snapshots or None."""
+
+    def __init__(self, maxsize=SLUG_CACHE_SIZE, local_ttl=SLUG_CACHE_LOCAL_TTL):
+        self.maxsize = maxsize
+        self.local_ttl = local_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'local_hits': 0, 'shared_hits': 0, 'db_queries': 0, 'not_found': 0}
+
+    def get(self, slug):
+        """
+        Snapshot of the active page with ``slug``.
+
+        Returns:
+            LandingPageSnapshot: Or None if no active page has the slug
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(slug)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(slug)
+                self._stats['local_hits'] += 1
+                if entry[1] is None:
+                    self._stats['not_found'] += 1
+                return entry[1]
+
+        shared = shared_slug_cache()
+        key = slug_cache_key(slug)
+        cached = shared.get(key) if shared is not None else None
+        if cached is not None:
+            snapshot, counter = cached or None, 'shared_hits'
+        else:
+            row = (LandingPage.objects.filter(slug=slug, is_active=True)
+                   .values_list('id', 'slug', 'updated_at').first())
+            snapshot, counter = (LandingPageSnapshot(*row) if row else None), 'db_queries'
+            if shared is not None and snapshot is None:
+                shared.set(key, _NOT_FOUND, timeout=SLUG_CACHE_NEGATIVE_TIMEOUT)
+            elif shared is not None:
+                shared.set(key, snapshot, timeout=SLUG_CACHE_TIMEOUT)
+
+        with self._lock:
+            self._stats[counter] += 1
+            if snapshot is None:
+                self._stats['not_found'] += 1
+            self._entries[slug] = (now + self.local_ttl, snapshot)
+            self._entries.move_to_end(slug)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, slugs):
+        """Forget ``slugs`` now and once more when the transaction commits."""
+        slugs = {slug for slug in slugs if slug}
+        if not slugs:
+            return
+
+        def drop():
+            shared = shared_slug_cache()
+            if shared is not None:
+                shared.delete_many([slug_cache_key(slug) for slug in slugs])
+            with self._lock:
+                for slug in slugs:
+                    self._entries.pop(slug, None)
+
+        drop()
+        # Запит між змінами й комітом міг знову закешувати старий рядок
+        transaction.on_commit(drop)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for name in self._stats:
+                self._stats[name] = 0
+
+    def stats(self):
+        """Snapshot of the lookup counters and current size."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        stats['maxsize'] = self.maxsize
+        return stats
+
+
+slug_cache = SlugCache()
+
+
+def resolve_landing_slug(slug):
+    """Snapshot of the active landing page with ``slug``, or None."""
+    return slug_cache.get(slug)
+
+
+def invalidate_landing_slugs(slugs):
+    """Drop cached lookups of ``slugs`` (call after queryset ``update()``s, which send no signals)."""
+    slug_cache.invalidate(slugs)
@@ -10,11 +10,47 @@ import logging
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, transaction
+from .landing_templates import CompiledTemplate, TemplateVariableError, compile_template, get_compiled_template
 from .models import LandingPage
+from .payload_schema import INVALID, Bool
+from .search import index_landing_pages, search_queryset
 
 logger = logging.getLogger(__name__)
 
+BULK_CREATE_ATTEMPTS = 3  # slug races with concurrent creators
+
+def coerce_bool(value, name='is_active'):
+    """
+    Strict bool of a flag from JSON input: true/false, 1/0 or "true"/"false".
+
+    Raises:
+        ValueError: If ``value`` is not bool-like (the string "false" would be truthy)
+    """
+    cleaned = Bool().clean(value)
+    if cleaned is INVALID:
+        raise ValueError(f"{name} must be a boolean, got {value!r}")
+    return cleaned
+
+def new_slug():
+    return f"lp-{uuid.uuid4().hex[:12]}"
+
+def assign_free_slugs(pages, chunk_size=500):
+    """Give every page a generated slug that is neither in the database nor elsewhere in ``pages``."""
+    used = set()
+    pending = pages
+    while pending:
+        for page in pending:
+            page.slug = new_slug()
+            while page.slug in used:
+                page.slug = new_slug()
+            used.add(page.slug)
+        taken = set()
+        for i in range(0, len(pending), chunk_size):
+            chunk = [page.slug for page in pending[i:i + chunk_size]]
+            taken.update(LandingPage.objects.filter(slug__in=chunk).values_list('slug', flat=True))
+        pending = [page for page in pending if page.slug in taken]
+
 def create_landing_page(
     title, 
     html_content,
@@ -42,9 +78,9 @@ def create_landing_page(
         tuple: (LandingPage instance, url)
     """
     try:
+        is_active = coerce_bool(is_active)
         # Generate a unique slug
-        unique_id = uuid.uuid4().hex[:12]
-        slug = f"lp-{unique_id}"
+        slug = new_slug()
         
         # Create landing page
         landing_page = LandingPage.objects.create(
@@ -150,6 +186,7 @@ def create_landing_page_from_template(
     title,
     template_content,
     template_variables=None,
+    strict=False,
     **kwargs
 ):
     """
@@ -157,24 +194,89 @@ def create_landing_page_from_template(
     
     Args:
         title (str): Title of the landing page
-        template_content (str): HTML template with placeholders
+        template_content (str | CompiledTemplate): HTML template with {{placeholders}},
+            or an already compiled one (see LandingPageTemplate.create_landing_page)
         template_variables (dict, optional): Variables to substitute in the template
+        strict (bool, optional): Reject placeholders without a value instead of
+            leaving them in the page
         **kwargs: Additional parameters for create_landing_page
         
     Returns:
         tuple: (LandingPage instance, url)
+
+    Raises:
+        TemplateVariableError: If ``strict`` and a placeholder has no value
     """
-    # Handle template variables
-    if template_variables:
-        html_content = template_content
-        for key, value in template_variables.items():
-            placeholder = f"{{{{{key}}}}}"
-            html_content = html_content.replace(placeholder, str(value))
-    else:
-        html_content = template_content
-        
+    if not isinstance(template_content, CompiledTemplate):
+        template_content = compile_template(template_content)
+    html_content = template_content.render(template_variables, strict=strict)
+
     return create_landing_page(title=title, html_content=html_content, **kwargs)
 
+def create_landing_pages_from_template(template, rows, batch_size=500, strict=False):
+    """
+    Create many landing pages from one template in a single transaction.
+    
+    The template is compiled once, slugs are generated and checked against
+    the database in chunks, and the pages are inserted with ``bulk_create``
+    (retried with fresh slugs if a concurrent creator takes one first). bulk_create sends no post_save,
+    so the search index is updated here; render artifacts are not warmed
+    and get compiled on each page's first visit.
+    
+    Args:
+        template (LandingPageTemplate): Template to render
+        rows (list): Dicts with ``title`` and optional ``variables``,
+            ``google_pixel_id``, ``facebook_pixel_id``, ``meta_robots``, ``is_active``
+        batch_size (int, optional): Rows per INSERT
+        strict (bool, optional): Reject rows that leave a placeholder without a value
+        
+    Returns:
+        list: (LandingPage instance, url) tuples in the order of ``rows``
+    
+    Raises:
+        TemplateVariableError: If ``strict`` and a row lacks a placeholder value; ``row`` holds its index
+        ValueError: If a row's ``is_active`` is not bool-like
+    """
+    compiled = get_compiled_template(template)
+    pages = []
+    for index, row in enumerate(rows):
+        try:
+            html_content = compiled.render(row.get('variables'), strict=strict)
+        except TemplateVariableError as e:
+            e.row = index
+            raise
+        try:
+            is_active = coerce_bool(row.get('is_active', True))
+        except ValueError as e:
+            raise ValueError(f"Page {index}: {e}") from e
+        pages.append(LandingPage(
+            title=row['title'],
+            html_content=html_content,
+            css_content=template.css_content,
+            js_content=template.js_content,
+            google_pixel_id=row.get('google_pixel_id') or '',
+            facebook_pixel_id=row.get('facebook_pixel_id') or '',
+            meta_robots=row.get('meta_robots') or 'noindex, nofollow',
+            is_active=is_active,
+        ))
+    
+    for attempt in range(1, BULK_CREATE_ATTEMPTS + 1):
+        assign_free_slugs(pages, chunk_size=batch_size)
+        try:
+            with transaction.atomic():
+                pages = LandingPage.objects.bulk_create(pages, batch_size=batch_size)
+                index_landing_pages(pages)
+            break
+        except IntegrityError:
+            if attempt == BULK_CREATE_ATTEMPTS:
+                raise
+            logger.warning(f"Slug taken while creating pages from template {template.id}; retrying with new slugs")
+            for page in pages:
+                page.pk = None
+    
+    logger.info(f"Created {len(pages)} landing pages from template {template.id}")
+    return [(page, page.get_absolute_url()) for page in pages]
+
 def find_landing_pages(search_query=None, is_active=None):
     """
     Find landing pages based on search criteria.
@@ -184,7 +286,8 @@ def find_landing_pages(search_query=None, is_active=None):
         is_active (bool, optional): Filter by active status
         
     Returns:
-        QuerySet: Filtered landing pages
+        QuerySet: Filtered landing pages, best search matches first
+        (annotated with ``search_rank``) when a search query is given
     """
     query = LandingPage.objects.all()
     
@@ -192,10 +295,6 @@ def find_landing_pages(search_query=None, is_active=None):
         query = query.filter(is_active=is_active)
         
     if search_query:
-        query = query.filter(
-            models.Q(title__icontains=search_query) |
-            models.Q(html_content__icontains=search_query) |
-            models.Q(slug__icontains=search_query)
-        )
+        return search_queryset(query, search_query).order_by('search_rank', '-created_at')
         
     return query.order_by('-created_at') 
\ No newline at end of file
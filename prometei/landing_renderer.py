@@ -0,0 +1,346 @@
+"""
+Landing Page Renderer
+
+Compiles a LandingPage into a render artifact: the page HTML with tracking
+components already injected, split into prebuilt byte segments around the
+per-visit values (visit ID, signed visit token and CSRF token). Artifacts are cached under a
+versioned key derived from ``(id, updated_at)`` so a request only has to stitch
+the segments together.
+
+The per-visit values sit in a short tail at the end of the tracking script.
+Everything before the first of them is minified and compressed to brotli and
+gzip when the artifact is built (on save, see ``warm_landing_page_cache``);
+a request appends the tail to the compressed prefix as uncompressed brotli
+meta-blocks or deflate stored blocks, so no per-request compression is done
+and the CSRF token never shares a compression context with page content.
+"""
+
+import logging
+import re
+import struct
+import zlib
+from functools import lru_cache
+
+import brotli
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.urls import reverse as django_reverse
+from django.utils import translation
+from django.utils.html import escape
+
+logger = logging.getLogger(__name__)
+
+RENDER_CACHE_VERSION = 4
+RENDER_CACHE_TIMEOUT = getattr(settings, 'LANDING_PAGE_RENDER_CACHE_TIMEOUT', 60 * 60 * 24)
+MINIFY_HTML = getattr(settings, 'LANDING_PAGE_MINIFY_HTML', True)
+# 11 стискає ще на ~5%, але вдесятеро довше (~300 мс на 64 KB), а артефакт будується й при промаху кешу
+BROTLI_QUALITY = getattr(settings, 'LANDING_PAGE_BROTLI_QUALITY', 10)
+GZIP_LEVEL = getattr(settings, 'LANDING_PAGE_GZIP_LEVEL', 9)
+# Як у GZipMiddleware: дрібні сторінки стиснення не зменшує
+COMPRESS_MIN_LENGTH = getattr(settings, 'LANDING_PAGE_COMPRESS_MIN_LENGTH', 200)
+
+# Placeholders rendered into the tracking script instead of the per-visit values.
+# They only contain characters that survive template autoescaping unchanged.
+VISIT_ID_SLOT = 'visit_id'
+VISIT_TOKEN_SLOT = 'visit_token'
+CSRF_TOKEN_SLOT = 'csrf_token'
+_SLOT_MARKERS = {
+    VISIT_ID_SLOT: '__LP_SLOT_VISIT_ID__',
+    VISIT_TOKEN_SLOT: '__LP_SLOT_VISIT_TOKEN__',
+    CSRF_TOKEN_SLOT: '__LP_SLOT_CSRF_TOKEN__',
+}
+_SLOT_BY_MARKER = {marker: slot for slot, marker in _SLOT_MARKERS.items()}
+_SLOT_RE = re.compile('|'.join(re.escape(marker) for marker in _SLOT_BY_MARKER))
+
+_HEAD_CLOSE_RE = re.compile(r'</head\s*>', re.IGNORECASE)
+_BODY_OPEN_RE = re.compile(r'<body\b[^>]*>', re.IGNORECASE)
+_BODY_CLOSE_RE = re.compile(r'</body\s*>', re.IGNORECASE)
+
+# Вміст цих елементів не чіпаємо: пробіли й коментарі в них значущі
+_RAW_TEXT_RE = re.compile(r'(<(pre|textarea|script|style)\b.*?</\2\s*>)', re.IGNORECASE | re.DOTALL)
+# Умовні коментарі IE (<!--[if ...]>) лишаються
+_COMMENT_RE = re.compile(r'<!--(?!\[if|<!\[endif).*?-->', re.DOTALL)
+_INTER_TAG_SPACE_RE = re.compile(r'>\s+<')
+
+ACCEPTED_ENCODINGS = ('br', 'gzip')  # in order of preference
+
+_GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x02\xff'  # no mtime, max compression, unknown OS
+_BROTLI_LAST_EMPTY_META_BLOCK = b'\x03'  # ISLAST=1, ISLASTEMPTY=1
+
+
+def _deflate_stored_blocks(data):
+    """Raw deflate stored blocks holding ``data``; the last one is marked final."""
+    chunks = [data[i:i + 0xFFFF] for i in range(0, len(data), 0xFFFF)] or [b'']
+    out = []
+    for n, chunk in enumerate(chunks, 1):
+        # BFINAL, BTYPE=00 and padding to the byte boundary fit in the first byte
+        out.append(struct.pack('<BHH', n == len(chunks), len(chunk), len(chunk) ^ 0xFFFF))
+        out.append(chunk)
+    return b''.join(out)
+
+
+def _brotli_uncompressed_meta_blocks(data):
+    """Brotli uncompressed meta-blocks holding ``data`` (none are marked last)."""
+    out = []
+    for i in range(0, len(data), 0x10000):
+        chunk = data[i:i + 0x10000]
+        # ISLAST=0, MNIBBLES=4, MLEN-1 (16 bits), ISUNCOMPRESSED=1, padding to the byte boundary
+        header = ((len(chunk) - 1) << 3) | (1 << 19)
+        out.append(header.to_bytes(3, 'little'))
+        out.append(chunk)
+    return b''.join(out)
+
+
+def minify_html(html_content):
+    """
+    Drop comments and collapse whitespace between tags.
+
+    ``<pre>``, ``<textarea>``, ``<script>`` and ``<style>`` are left as they are.
+    Whitespace between tags is kept as a single space or newline, so inline
+    elements are laid out the same way.
+    """
+    parts = _RAW_TEXT_RE.split(html_content)
+    # split() returns text, raw element, tag name, text, ...
+    for i in range(0, len(parts), 3):
+        text = _COMMENT_RE.sub('', parts[i])
+        parts[i] = _INTER_TAG_SPACE_RE.sub(
+            lambda match: '>\n<' if '\n' in match.group() else '> <', text)
+    del parts[2::3]
+    return ''.join(parts)
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Pick the content coding for an ``Accept-Encoding`` header.
+
+    Returns:
+        str: 'br', 'gzip', or None for the identity coding
+    """
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip().lower()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding] = quality
+
+    best, best_quality = None, 0.0
+    for coding in ACCEPTED_ENCODINGS:
+        quality = qualities.get(coding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class CompiledLandingPage:
+    """
+    Prebuilt landing page body: literal byte segments interleaved with slot names,
+    plus the part before the first slot compressed per content coding.
+    """
+
+    __slots__ = ('segments', 'compressed', 'prefix_crc32')
+
+    def __init__(self, segments, compress=False):
+        # Even positions are literal bytes, odd positions are slot names.
+        self.segments = tuple(segments)
+        self.compressed = {}
+        self.prefix_crc32 = zlib.crc32(self.segments[0])
+        if compress and len(self.segments[0]) >= COMPRESS_MIN_LENGTH:
+            self.compress()
+
+    def compress(self):
+        """Compress the static prefix for every coding in ACCEPTED_ENCODINGS."""
+        prefix = self.segments[0]
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        # flush() ends on a byte boundary without finishing the stream
+        self.compressed['br'] = compressor.process(prefix) + compressor.flush()
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self.compressed['gzip'] = _GZIP_HEADER + compressor.compress(prefix) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def _tail(self, values):
+        encoded = {slot: str(value).encode('utf-8') for slot, value in values.items()}
+        parts = list(self.segments[1:])
+        for i in range(0, len(parts), 2):
+            parts[i] = encoded[parts[i]]
+        return b''.join(parts)
+
+    def render(self, **values):
+        """
+        Stitch the page together with the per-visit values.
+
+        Args:
+            **values: Value for every slot (``visit_id``, ``visit_token``, ``csrf_token``)
+
+        Returns:
+            bytes: UTF-8 encoded HTML document
+        """
+        return self.segments[0] + self._tail(values)
+
+    def render_encoded(self, coding, **values):
+        """
+        Like render(), in the content coding ``coding``.
+
+        Args:
+            coding (str): 'br' or 'gzip'; see ``compressed`` for the available ones
+            **values: Value for every slot
+
+        Returns:
+            bytes: Compressed HTML document
+        """
+        tail = self._tail(values)
+        if coding == 'br':
+            return (self.compressed['br'] + _brotli_uncompressed_meta_blocks(tail)
+                    + _BROTLI_LAST_EMPTY_META_BLOCK)
+        if coding == 'gzip':
+            crc = zlib.crc32(tail, self.prefix_crc32)
+            size = (len(self.segments[0]) + len(tail)) & 0xFFFFFFFF
+            return self.compressed['gzip'] + _deflate_stored_blocks(tail) + struct.pack('<II', crc, size)
+        raise ValueError(f"Unsupported content coding: {coding}")
+
+
+@lru_cache(maxsize=256)
+def render_pixel_partials(google_pixel_id, facebook_pixel_id):
+    """
+    Render the pixel <script> and <noscript> partials for a pixel-ID combination.
+
+    Returns:
+        tuple: (pixel_scripts, pixel_noscript)
+    """
+    context = {
+        'google_pixel_id': google_pixel_id,
+        'facebook_pixel_id': facebook_pixel_id,
+    }
+    return (
+        render_to_string('prometei/landing_partials/_tracking_pixels.html', context),
+        render_to_string('prometei/landing_partials/_tracking_noscript.html', context),
+    )
+
+
+def inject_tracking(html_content, head_html, noscript_html, script_html):
+    """
+    Inject tracking markup into a landing page document.
+
+    ``head_html`` goes right before ``</head>``, ``noscript_html`` right after
+    ``<body>`` and ``script_html`` right before ``</body>``. Missing tags are
+    tolerated the same way the page has always been served.
+    """
+    head_close = _HEAD_CLOSE_RE.search(html_content)
+    if head_close:
+        pos = head_close.start()
+        html_content = f'{html_content[:pos]}{head_html}\n{html_content[pos:]}'
+    else:
+        html_content = f'<head>\n{head_html}\n</head>\n{html_content}'
+
+    body_open = _BODY_OPEN_RE.search(html_content)
+    body_close = _BODY_CLOSE_RE.search(html_content)
+
+    if body_close:
+        pos = body_close.start()
+        html_content = f'{html_content[:pos]}{script_html}\n{html_content[pos:]}'
+        if body_open and body_open.end() <= pos:
+            pos = body_open.end()
+            html_content = f'{html_content[:pos]}\n{noscript_html}{html_content[pos:]}'
+        else:
+            html_content = noscript_html + html_content
+    elif body_open:
+        pos = body_open.end()
+        html_content = f'{html_content[:pos]}\n{noscript_html}{html_content[pos:]}\n{script_html}'
+    else:
+        html_content = f'<body>\n{noscript_html}\n{html_content}\n{script_html}\n</body>'
+    return html_content
+
+
+def compile_landing_page(landing_page, compress=True):
+    """
+    Build the render artifact for a landing page.
+
+    Args:
+        landing_page (LandingPage): Page to compile
+        compress (bool, optional): Also build the brotli and gzip prefixes
+
+    Returns:
+        CompiledLandingPage: Prebuilt segments for the page
+    """
+    pixel_scripts, pixel_noscript = render_pixel_partials(
+        landing_page.google_pixel_id or '',
+        landing_page.facebook_pixel_id or '',
+    )
+    main_script = render_to_string('prometei/landing_partials/_tracking_main_script.html', {
+        'landing_page_id': landing_page.id,
+        'slug': landing_page.slug,
+        'visit_id': _SLOT_MARKERS[VISIT_ID_SLOT],
+        'visit_token': _SLOT_MARKERS[VISIT_TOKEN_SLOT],
+        'csrf_token': _SLOT_MARKERS[CSRF_TOKEN_SLOT],
+        'track_url': django_reverse('prometei:landing_track'),
+        'interaction_url': django_reverse('prometei:landing_interaction'),
+        'events_url': django_reverse('prometei:landing_events'),
+        'form_submit_url': django_reverse('prometei:landing_submit_form'),
+    })
+
+    meta_robots_tag = f'<meta name="robots" content="{escape(landing_page.meta_robots)}">'
+    html_content = inject_tracking(
+        landing_page.html_content,
+        f'{meta_robots_tag}\n{pixel_scripts}',
+        pixel_noscript,
+        main_script,
+    )
+    if MINIFY_HTML:
+        html_content = minify_html(html_content)
+
+    segments = []
+    pos = 0
+    for match in _SLOT_RE.finditer(html_content):
+        segments.append(html_content[pos:match.start()].encode('utf-8'))
+        segments.append(_SLOT_BY_MARKER[match.group()])
+        pos = match.end()
+    segments.append(html_content[pos:].encode('utf-8'))
+    return CompiledLandingPage(segments, compress=compress)
+
+
+def render_cache_key(landing_page_id, updated_at, language=None):
+    """Versioned cache key for a compiled page; changes whenever the page is saved."""
+    language = language or translation.get_language() or settings.LANGUAGE_CODE
+    return f"lp_render:v{RENDER_CACHE_VERSION}:{landing_page_id}:{updated_at.timestamp():.6f}:{language}"
+
+
+def get_compiled_landing_page(landing_page):
+    """
+    Return the cached render artifact for a landing page, compiling it on a miss.
+
+    Args:
+        landing_page (LandingPage | LandingPageSnapshot): Page to render; a
+            snapshot only loads the full page on a miss
+
+    Returns:
+        CompiledLandingPage: Prebuilt segments for the page
+    """
+    key = render_cache_key(landing_page.id, landing_page.updated_at)
+    compiled = cache.get(key)
+    if compiled is None:
+        from .models import LandingPage
+
+        if not isinstance(landing_page, LandingPage):
+            landing_page = LandingPage.objects.get(id=landing_page.id)
+        compiled = compile_landing_page(landing_page)
+        cache.set(key, compiled, timeout=RENDER_CACHE_TIMEOUT)
+    return compiled
+
+
+def warm_landing_page_cache(landing_page):
+    """Compile a landing page for every configured language ahead of the first visit."""
+    for language, _name in settings.LANGUAGES:
+        with translation.override(language):
+            cache.set(
+                render_cache_key(landing_page.id, landing_page.updated_at, language),
+                compile_landing_page(landing_page),
+                timeout=RENDER_CACHE_TIMEOUT,
+            )
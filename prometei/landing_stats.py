@@ -0,0 +1,251 @@
+"""
+Landing Page Daily Stats
+
+Incremental rollup of raw LandingPageVisit / LandingPageInteraction rows
+into one LandingPageDailyStats row per page and local day, so dashboards
+and visit counters cost O(days) instead of O(visits).
+
+``rollup_landing_stats()`` (``python manage.py rollup_landing_stats --loop``)
+only looks at rows newer than its watermark, minus LANDING_STATS_LOOKBACK_SECONDS
+to pick up visits whose ``time_spent`` is still being updated, and rebuilds
+the (page, day) rows those touch. Each run stores its start time as the new
+watermark: rollup rows cover visits before it, so exact totals are the
+rollup sum plus the raw visits from the watermark on (``annotate_visit_totals``).
+"""
+
+import logging
+import math
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import AnalyticsWatermark, LandingPageDailyStats, LandingPageInteraction, LandingPageVisit
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_NAME = 'landing_daily_stats'
+STATS_LOOKBACK = getattr(settings, 'LANDING_STATS_LOOKBACK_SECONDS', 60 * 60)
+STATS_PAGE_CHUNK = 500  # landing page ids per IN (...) clause
+STATS_FIELDS = ('visits', 'unique_ips', 'time_spent_total', 'time_spent_avg',
+                'time_spent_p50', 'time_spent_p90', 'interactions', 'submits')
+
+
+def get_watermark():
+    """Time up to which visits are rolled up, or None before the first run."""
+    return (AnalyticsWatermark.objects.filter(name=ROLLUP_NAME)
+            .values_list('position', flat=True).first())
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list (0 for an empty one)."""
+    if not sorted_values:
+        return 0
+    return sorted_values[max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)]
+
+
+def day_bounds(day):
+    """Aware [start, end) datetimes of a local calendar day."""
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(day, time.min), tz)
+    return start, timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min), tz)
+
+
+def summarize_day(time_spent, ips, interactions):
+    """
+    Stats field values of one page-day.
+
+    Args:
+        time_spent (list): time_spent of every visit
+        ips (set): distinct visitor IP addresses
+        interactions (dict): interaction_type -> count
+
+    Returns:
+        dict: Values for the STATS_FIELDS of LandingPageDailyStats
+    """
+    seconds = sorted(time_spent)
+    total = sum(seconds)
+    return {
+        'visits': len(seconds),
+        'unique_ips': len(ips),
+        'time_spent_total': total,
+        'time_spent_avg': total / len(seconds) if seconds else 0,
+        'time_spent_p50': percentile(seconds, 50),
+        'time_spent_p90': percentile(seconds, 90),
+        'interactions': dict(interactions),
+        'submits': interactions.get('submit', 0),
+    }
+
+
+def dirty_days(since, until):
+    """
+    (landing_page_id, day) pairs with visits or interactions recorded since ``since``.
+
+    Returns:
+        dict: day -> set of landing page ids
+    """
+    visits = LandingPageVisit.objects.filter(visit_time__lt=until)
+    interactions = LandingPageInteraction.objects.filter(visit__visit_time__lt=until)
+    if since is not None:
+        visits = visits.filter(visit_time__gte=since)
+        interactions = interactions.filter(timestamp__gte=since)
+
+    days = defaultdict(set)
+    for queryset, page_field, time_field in ((visits, 'landing_page_id', 'visit_time'),
+                                             (interactions, 'visit__landing_page_id', 'visit__visit_time')):
+        rows = (queryset.order_by().annotate(day=TruncDate(time_field))
+                .values_list(page_field, 'day').distinct())
+        for page_id, day in rows:
+            days[day].add(page_id)
+    return days
+
+
+def rollup_day(day, page_ids, until):
+    """
+    Recompute the stats rows of ``page_ids`` for one local day from raw rows before ``until``.
+
+    Returns:
+        int: Number of rows written
+    """
+    start, end = day_bounds(day)
+    end = min(end, until)
+    written = 0
+    page_ids = sorted(page_ids)
+    for offset in range(0, len(page_ids), STATS_PAGE_CHUNK):
+        chunk = page_ids[offset:offset + STATS_PAGE_CHUNK]
+        ips, time_spent = defaultdict(set), defaultdict(list)
+        visits = (LandingPageVisit.objects
+                  .filter(landing_page_id__in=chunk, visit_time__gte=start, visit_time__lt=end)
+                  .order_by().values_list('landing_page_id', 'ip_address', 'time_spent'))
+        for page_id, ip_address, seconds in visits.iterator(chunk_size=2000):
+            time_spent[page_id].append(seconds)
+            if ip_address:
+                ips[page_id].add(ip_address)
+
+        interactions = defaultdict(dict)
+        counts = (LandingPageInteraction.objects
+                  .filter(visit__landing_page_id__in=chunk, visit__visit_time__gte=start, visit__visit_time__lt=end)
+                  .order_by().values_list('visit__landing_page_id', 'interaction_type')
+                  .annotate(total=Count('id')))
+        for page_id, interaction_type, total in counts:
+            interactions[page_id][interaction_type] = total
+
+        rows = [
+            LandingPageDailyStats(
+                landing_page_id=page_id,
+                date=day,
+                updated_at=timezone.now(),  # bulk_create з update_conflicts не оновлює auto_now
+                **summarize_day(time_spent[page_id], ips[page_id], interactions[page_id]),
+            )
+            for page_id in chunk
+        ]
+        LandingPageDailyStats.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['landing_page', 'date'],
+            update_fields=[*STATS_FIELDS, 'updated_at'],
+        )
+        written += len(rows)
+    return written
+
+
+def rollup_landing_stats(now=None, full=False):
+    """
+    Bring LandingPageDailyStats up to date.
+
+    Args:
+        now (datetime, optional): Cut-off for raw rows, defaults to the current time
+        full (bool): Ignore the watermark and rebuild every day with data
+
+    Returns:
+        dict: {'days': days touched, 'rows': stats rows written}
+    """
+    until = now or timezone.now()
+    watermark = None if full else get_watermark()
+    since = watermark - timedelta(seconds=STATS_LOOKBACK) if watermark else None
+
+    rows = 0
+    days = dirty_days(since, until)
+    with transaction.atomic():
+        for day in sorted(days):
+            rows += rollup_day(day, days[day], until)
+        AnalyticsWatermark.objects.update_or_create(name=ROLLUP_NAME, defaults={'position': until})
+    logger.info(f"Landing stats rollup up to {until.isoformat()}: {len(days)} days, {rows} rows")
+    return {'days': len(days), 'rows': rows}
+
+
+def annotate_visit_totals(queryset, name='visit_total'):
+    """
+    Annotate a LandingPage queryset with its total visit count.
+
+    Reads the rollup sum plus the raw visits newer than the watermark,
+    so the count is exact without scanning every visit.
+    """
+    rolled_up = (LandingPageDailyStats.objects.filter(landing_page=OuterRef('pk'))
+                 .order_by().values('landing_page').annotate(total=Sum('visits')).values('total'))
+    recent = LandingPageVisit.objects.filter(landing_page=OuterRef('pk'))
+    watermark = get_watermark()
+    if watermark is not None:
+        recent = recent.filter(visit_time__gte=watermark)
+    recent = recent.order_by().values('landing_page').annotate(total=Count('id')).values('total')
+    return queryset.annotate(**{
+        name: Coalesce(Subquery(rolled_up, output_field=IntegerField()), 0)
+        + Coalesce(Subquery(recent, output_field=IntegerField()), 0)
+    })
+
+
+def visit_totals_version(queryset):
+    """
+    Cheap validator of a LandingPage listing annotated by annotate_visit_totals().
+
+    Changes whenever a page of ``queryset`` is added, removed or saved, a raw
+    visit arrives or the rollup moves its watermark. Costs the watermark
+    lookup plus one aggregate query.
+
+    Returns:
+        tuple: (watermark, page count, latest updated_at, raw visits past the watermark)
+    """
+    watermark = get_watermark()
+    recent = LandingPageVisit.objects.order_by()
+    if watermark is not None:
+        recent = recent.filter(visit_time__gte=watermark)
+    recent = recent.annotate(one=Value(1)).values('one').annotate(total=Count('id')).values('total')
+    version = queryset.order_by().aggregate(
+        pages=Count('id'),
+        updated=Max('updated_at'),
+        visits=Max(Subquery(recent, output_field=IntegerField())),
+    )
+    return watermark, version['pages'], version['updated'], version['visits']
+
+
+def page_stats(landing_page_id, date_from, date_to):
+    """
+    Daily rows and range totals of one page between two dates (inclusive).
+
+    Returns:
+        dict: {'days': [...], 'totals': {...}}
+    """
+    days = list(
+        LandingPageDailyStats.objects
+        .filter(landing_page_id=landing_page_id, date__gte=date_from, date__lte=date_to)
+        .order_by('date').values('date', *STATS_FIELDS)
+    )
+    interactions = defaultdict(int)
+    for day in days:
+        for interaction_type, total in day['interactions'].items():
+            interactions[interaction_type] += total
+    visits = sum(day['visits'] for day in days)
+    time_spent_total = sum(day['time_spent_total'] for day in days)
+    return {
+        'days': days,
+        'totals': {
+            'visits': visits,
+            'submits': sum(day['submits'] for day in days),
+            'time_spent_avg': time_spent_total / visits if visits else 0,
+            'interactions': dict(interactions),
+        },
+    }
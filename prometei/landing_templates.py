@@ -0,0 +1,143 @@
+"""
+Landing Page Template Compiler
+
+``LandingPageTemplate.html_template`` is compiled once into literal segments
+interleaved with ``{{variable}}`` names, so stamping out a page is a single
+join instead of one ``str.replace`` pass over the whole HTML per variable.
+Compiled templates are cached under a versioned key derived from
+``(id, updated_at)``, like the landing page render artifacts.
+
+A placeholder is anything between ``{{`` and ``}}`` without braces, trimmed,
+so ``{{ first name }}`` and ``{{hero-title}}`` are variables too.
+Placeholders without a value are left in the page as written, so literal
+braces of Vue, Handlebars or inline JSON survive. ``CompiledTemplate.check()``
+reports them together with values the template does not know; rendering with
+``strict=True`` raises TemplateVariableError for them instead.
+"""
+
+import logging
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_CACHE_VERSION = 2
+TEMPLATE_CACHE_TIMEOUT = getattr(settings, 'LANDING_TEMPLATE_CACHE_TIMEOUT', 60 * 60 * 24)
+
+# Будь-що, крім фігурних дужок: інакше {{ назва }} тихо лишається в сторінці навіть зі strict=True
+_VARIABLE_RE = re.compile(r'\{\{([^{}]*)\}\}')
+
+
+class TemplateVariableError(ValueError):
+    """Raised when a template is rendered strictly without values for some of its placeholders."""
+
+    def __init__(self, missing, unknown=()):
+        self.missing = sorted(missing)
+        self.unknown = sorted(unknown)
+        super().__init__(f"Missing template variables: {', '.join(self.missing)}")
+
+
+class CompiledTemplate:
+    """Template HTML split into literal segments and variable names."""
+
+    __slots__ = ('segments', 'placeholders', 'variables', 'declared')
+
+    def __init__(self, segments, declared=(), placeholders=None):
+        # Even positions are literal text, odd positions are variable names.
+        self.segments = tuple(segments)
+        # Placeholders as written in the template, one per variable position.
+        self.placeholders = (tuple(placeholders) if placeholders is not None
+                             else tuple(f'{{{{{name}}}}}' for name in self.segments[1::2]))
+        self.variables = frozenset(self.segments[1::2])
+        self.declared = frozenset(declared)
+
+    def check(self, values):
+        """
+        Compare ``values`` with the template's placeholders and ``available_variables``.
+
+        Returns:
+            dict: {'missing': placeholders without a value,
+                   'unknown': values neither used nor declared}
+        """
+        return {
+            'missing': sorted(self.variables.difference(values)),
+            'unknown': sorted(set(values) - self.variables - self.declared),
+        }
+
+    def render(self, values=None, strict=False):
+        """
+        Substitute ``values`` into the template.
+
+        Placeholders without a value are kept as written.
+
+        Raises:
+            TemplateVariableError: If ``strict`` and a placeholder has no value
+        """
+        values = values or {}
+        if strict:
+            report = self.check(values)
+            if report['missing']:
+                raise TemplateVariableError(report['missing'], report['unknown'])
+        parts = list(self.segments)
+        missing = []
+        for i in range(1, len(parts), 2):
+            name = parts[i]
+            if name in values:
+                parts[i] = str(values[name])
+            else:
+                parts[i] = self.placeholders[i // 2]
+                missing.append(name)
+        if missing:
+            logger.debug(f"Template placeholders left unfilled: {', '.join(sorted(set(missing)))}")
+        return ''.join(parts)
+
+
+def compile_template(html_template, declared=()):
+    """
+    Split template HTML around its ``{{variable}}`` placeholders.
+
+    Args:
+        html_template (str): Template HTML
+        declared (iterable, optional): Names from ``available_variables``
+
+    Returns:
+        CompiledTemplate: Segments of the template
+    """
+    segments = []
+    placeholders = []
+    pos = 0
+    for match in _VARIABLE_RE.finditer(html_template):
+        name = match.group(1).strip()
+        if not name:
+            continue  # {{}} чи {{ }} — не змінна, лишається текстом
+        segments.append(html_template[pos:match.start()])
+        segments.append(name)
+        placeholders.append(match.group(0))
+        pos = match.end()
+    segments.append(html_template[pos:])
+    return CompiledTemplate(segments, declared, placeholders)
+
+
+def template_cache_key(template_id, updated_at):
+    """Versioned cache key for a compiled template; changes whenever the template is saved."""
+    return f"lp_template:v{TEMPLATE_CACHE_VERSION}:{template_id}:{updated_at.timestamp():.6f}"
+
+
+def get_compiled_template(template):
+    """
+    Return the cached compiled form of a LandingPageTemplate, compiling it on a miss.
+
+    Args:
+        template (LandingPageTemplate): Saved template
+
+    Returns:
+        CompiledTemplate: Segments of ``html_template``
+    """
+    key = template_cache_key(template.id, template.updated_at)
+    compiled = cache.get(key)
+    if compiled is None:
+        compiled = compile_template(template.html_template, template.available_variables or ())
+        cache.set(key, compiled, timeout=TEMPLATE_CACHE_TIMEOUT)
+    return compiled
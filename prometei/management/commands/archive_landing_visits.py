@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import gettext_lazy as _
+
+from prometei.visit_archive import (
+    ARCHIVE_AFTER_DAYS, ARCHIVE_CHUNK_SIZE, ARCHIVE_DELETE_BATCH, ARCHIVE_DIR, ArchiveNotReady, archive_cutoff,
+    archive_visits,
+)
+
+
+class Command(BaseCommand):
+    help = _("Move old landing page visits and interactions to compressed archive files")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS,
+                            help=_('Archive visits older than this many days'))
+        parser.add_argument('--archive-dir', default=str(ARCHIVE_DIR), help=_('Archive root directory'))
+        parser.add_argument('--chunk-size', type=int, default=ARCHIVE_CHUNK_SIZE, help=_('Visits read per query'))
+        parser.add_argument('--delete-batch', type=int, default=ARCHIVE_DELETE_BATCH,
+                            help=_('Visits deleted per transaction'))
+        parser.add_argument('--pause', type=float, default=0.0, help=_('Seconds to sleep between delete batches'))
+        parser.add_argument('--keep', action='store_true', help=_('Write the archive but keep the rows'))
+
+    def handle(self, *args, **options):
+        try:
+            cutoff = archive_cutoff(options['days'])
+        except ArchiveNotReady as e:
+            raise CommandError(str(e))
+
+        started = time.monotonic()
+        totals = archive_visits(
+            cutoff,
+            archive_dir=options['archive_dir'],
+            chunk_size=options['chunk_size'],
+            delete_batch=options['delete_batch'],
+            pause=options['pause'],
+            delete=not options['keep'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Visits before {cutoff:%Y-%m-%d}: archived {totals['archived']} to {totals['files']} files, "
+            f"deleted {totals['deleted']}, time: {time.monotonic() - started:.1f}s"
+        ))
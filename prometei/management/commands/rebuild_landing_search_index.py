@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.translation import gettext_lazy as _
+
+from prometei.search import backend, rebuild_index
+
+
+class Command(BaseCommand):
+    help = _("Rebuild the full-text search index of landing pages")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help=_('Pages read per query'))
+
+    def handle(self, *args, **options):
+        if backend() is None:
+            self.stdout.write(self.style.WARNING("Database has no full-text index support, nothing to do"))
+            return
+        started = time.monotonic()
+        count = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} pages in {time.monotonic() - started:.1f}s"))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils.translation import gettext_lazy as _
+
+from prometei.landing_stats import rollup_landing_stats
+
+
+class Command(BaseCommand):
+    help = _("Roll up new landing page visits and interactions into daily stats")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help=_('Ignore the watermark and rebuild every day'))
+        parser.add_argument('--loop', action='store_true', help=_('Keep running'))
+        parser.add_argument('--interval', type=float, default=300, help=_('Seconds between runs with --loop'))
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            close_old_connections()
+            started = time.monotonic()
+            totals = rollup_landing_stats(full=full)
+            self.stdout.write(
+                f"Days: {totals['days']}, rows: {totals['rows']}, time: {time.monotonic() - started:.1f}s"
+            )
+            if not options['loop']:
+                return
+            full = False
+            time.sleep(options['interval'])
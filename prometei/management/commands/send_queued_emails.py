@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils.translation import gettext_lazy as _
+
+from prometei.email_outbox import OUTBOX_BATCH_SIZE, process_outbox
+
+
+class Command(BaseCommand):
+    help = _("Send emails waiting in the outbox over a reused SMTP connection")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help=_('Keep running and poll the outbox'))
+        parser.add_argument('--interval', type=float, default=2.0, help=_('Seconds between polls with --loop'))
+        parser.add_argument('--batch-size', type=int, default=OUTBOX_BATCH_SIZE,
+                            help=_('Emails sent per SMTP connection'))
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            totals = process_outbox(batch_size=options['batch_size'])
+            if any(totals.values()) or not options['loop']:
+                self.stdout.write(
+                    f"Sent: {totals['sent']}, scheduled for retry: {totals['retried']}, failed: {totals['failed']}"
+                )
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
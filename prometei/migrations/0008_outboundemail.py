@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-18 14:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prometei', '0007_remove_course_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255, verbose_name='Тема')),
+                ('body', models.TextField(verbose_name='Текст')),
+                ('html_body', models.TextField(blank=True, verbose_name='HTML')),
+                ('from_email', models.CharField(max_length=255, verbose_name='Від')),
+                ('to', models.JSONField(default=list, verbose_name='Кому')),
+                ('reply_to', models.CharField(blank=True, max_length=255, verbose_name='Reply-To')),
+                ('status', models.CharField(choices=[('pending', 'Очікує'), ('sending', 'Відправляється'), ('sent', 'Відправлено'), ('failed', 'Помилка')], default='pending', max_length=10, verbose_name='Статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Спроби')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Наступна спроба')),
+                ('claimed_by', models.CharField(blank=True, max_length=32, verbose_name='Воркер')),
+                ('claimed_at', models.DateTimeField(blank=True, null=True, verbose_name='Взято в роботу')),
+                ('last_error', models.TextField(blank=True, verbose_name='Остання помилка')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата створення')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата відправки')),
+            ],
+            options={
+                'verbose_name': 'Вихідний лист',
+                'verbose_name_plural': 'Вихідні листи',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='prometei_ou_status_51c0a0_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 14:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prometei', '0008_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='landingpage',
+            index=models.Index(fields=['created_at', 'id'], name='prometei_lp_created_id_idx'),
+        ),
+    ]
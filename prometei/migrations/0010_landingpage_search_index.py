@@ -0,0 +1,68 @@
+import html
+import re
+
+from django.db import migrations
+
+# Знімок prometei.search на момент міграції: живий модуль може змінитися
+FTS_TABLE = 'prometei_landingpage_fts'
+PG_TABLE = 'prometei_landingpage_search'
+BODY_MAX_LENGTH = 100_000
+
+_INVISIBLE_RE = re.compile(r'<(script|style|noscript|template)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r'<!--.*?-->|<[^>]*>', re.DOTALL)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def page_text(html_content):
+    text = _TAG_RE.sub(' ', _INVISIBLE_RE.sub(' ', html_content or ''))
+    return _WHITESPACE_RE.sub(' ', html.unescape(text)).strip()[:BODY_MAX_LENGTH]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5(title, slug, body, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        insert = f'INSERT INTO {FTS_TABLE} (rowid, title, slug, body) VALUES (%s, %s, %s, %s)'
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE TABLE IF NOT EXISTS {PG_TABLE} ("
+            f" landing_page_id bigint PRIMARY KEY REFERENCES prometei_landingpage (id) ON DELETE CASCADE,"
+            f" document tsvector NOT NULL)"
+        )
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {PG_TABLE}_gin ON {PG_TABLE} USING GIN (document)")
+        insert = (
+            f"INSERT INTO {PG_TABLE} (landing_page_id, document) VALUES (%s, "
+            f"setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B') "
+            f"|| setweight(to_tsvector('simple', %s), 'D')) ON CONFLICT (landing_page_id) DO NOTHING"
+        )
+    else:
+        return
+
+    LandingPage = apps.get_model('prometei', 'LandingPage')
+    pages = LandingPage.objects.only('id', 'title', 'slug', 'html_content').order_by('id')
+    with schema_editor.connection.cursor() as cursor:
+        for page in pages.iterator(chunk_size=500):
+            cursor.execute(insert, [page.id, page.title or '', (page.slug or '').replace('-', ' '),
+                                    page_text(page.html_content)])
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == 'postgresql':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {PG_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prometei', '0009_landingpage_created_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
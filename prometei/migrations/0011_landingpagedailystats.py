@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-18 14:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prometei', '0010_landingpage_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Задача')),
+                ('position', models.DateTimeField(verbose_name='Оброблено до')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Оновлено')),
+            ],
+            options={
+                'verbose_name': 'Позиція обробки аналітики',
+                'verbose_name_plural': 'Позиції обробки аналітики',
+            },
+        ),
+        migrations.CreateModel(
+            name='LandingPageDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('visits', models.PositiveIntegerField(default=0, verbose_name='Візити')),
+                ('unique_ips', models.PositiveIntegerField(default=0, verbose_name='Унікальні IP')),
+                ('time_spent_total', models.PositiveBigIntegerField(default=0, verbose_name='Сумарний час на сторінці (сек)')),
+                ('time_spent_avg', models.FloatField(default=0, verbose_name='Середній час на сторінці (сек)')),
+                ('time_spent_p50', models.PositiveIntegerField(default=0, verbose_name='Медіана часу на сторінці (сек)')),
+                ('time_spent_p90', models.PositiveIntegerField(default=0, verbose_name='P90 часу на сторінці (сек)')),
+                ('interactions', models.JSONField(blank=True, default=dict, verbose_name='Взаємодії за типом')),
+                ('submits', models.PositiveIntegerField(default=0, verbose_name='Відправки форм')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Оновлено')),
+                ('landing_page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='prometei.landingpage')),
+            ],
+            options={
+                'verbose_name': 'Денна статистика лендінгу',
+                'verbose_name_plural': 'Денна статистика лендінгів',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date'], name='prometei_la_date_b01f41_idx')],
+                'constraints': [models.UniqueConstraint(fields=('landing_page', 'date'), name='prometei_lp_daily_stats_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 14:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prometei', '0011_landingpagedailystats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='landingpagevisit',
+            name='path_samples',
+            field=models.BinaryField(blank=True, null=True, verbose_name='Семпли руху (бінарні)'),
+        ),
+    ]
@@ -87,11 +87,20 @@ class LandingPage(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['created_at']),
+            # Keyset-пагінація API: ORDER BY created_at DESC, id DESC
+            models.Index(fields=['created_at', 'id'], name='prometei_lp_created_id_idx'),
         ]
     
     def __str__(self):
         return self.title
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Slug як у БД: після зміни посилання кеш скидається і для старого
+        instance._loaded_slug = instance.__dict__.get('slug')
+        return instance
+    
     def get_absolute_url(self):
         return django_reverse('prometei:landing_page', kwargs={'slug': self.slug})
     
@@ -141,24 +150,30 @@ class LandingPageTemplate(models.Model):
     def __str__(self):
         return self.name
     
-    def create_landing_page(self, title, variables=None, **kwargs):
+    def create_landing_page(self, title, variables=None, strict=False, **kwargs):
         """
         Create a landing page from this template with the provided variables.
         
         Args:
             title (str): Title for the new landing page
             variables (dict): Values for template variables
+            strict (bool, optional): Reject placeholders without a value
             **kwargs: Additional parameters for the landing page
             
         Returns:
-            LandingPage: The created landing page
+            tuple: (LandingPage instance, url)
+
+        Raises:
+            TemplateVariableError: If ``strict`` and a placeholder has no value
         """
         from .landing_page_generator import create_landing_page_from_template
+        from .landing_templates import get_compiled_template
         
         return create_landing_page_from_template(
             title=title,
-            template_content=self.html_template,
+            template_content=get_compiled_template(self),
             template_variables=variables,
+            strict=strict,
             css_content=self.css_content,
             js_content=self.js_content,
             **kwargs
@@ -181,6 +196,8 @@ class LandingPageVisit(models.Model):
     # Tracking data
     time_spent = models.PositiveIntegerField(_('Час на сторінці (сек)'), default=0)
     path_data = models.JSONField(_('Дані активності (рух миші, скроли)'), default=dict, blank=True)
+    # Семпли миші та скролу у бінарному форматі prometei.path_samples (нові візити)
+    path_samples = models.BinaryField(_('Семпли руху (бінарні)'), null=True, blank=True)
     meta_data = models.JSONField(_('Метадані відвідувача (екран, браузер)'), default=dict, blank=True)
     
     class Meta:
@@ -231,4 +248,95 @@ class LandingPageInteraction(models.Model):
         ]
     
     def __str__(self):
-        return f"{self.get_interaction_type_display()} on {self.element_id or self.element_type} (Visit {self.visit.id})"
+        return f"{self.get_interaction_type_display()} on {self.element_id or self.element_type} (Visit {self.visit_id})"
+
+
+class OutboundEmail(models.Model):
+    """Лист у черзі на відправку (outbox). Відправляється фоновим воркером."""
+
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, _('Очікує')),
+        (STATUS_SENDING, _('Відправляється')),
+        (STATUS_SENT, _('Відправлено')),
+        (STATUS_FAILED, _('Помилка')),
+    )
+
+    subject = models.CharField(_('Тема'), max_length=255)
+    body = models.TextField(_('Текст'))
+    html_body = models.TextField(_('HTML'), blank=True)
+    from_email = models.CharField(_('Від'), max_length=255)
+    to = models.JSONField(_('Кому'), default=list)
+    reply_to = models.CharField(_('Reply-To'), max_length=255, blank=True)
+
+    status = models.CharField(_('Статус'), max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(_('Спроби'), default=0)
+    next_attempt_at = models.DateTimeField(_('Наступна спроба'), default=timezone.now)
+    claimed_by = models.CharField(_('Воркер'), max_length=32, blank=True)
+    claimed_at = models.DateTimeField(_('Взято в роботу'), null=True, blank=True)
+    last_error = models.TextField(_('Остання помилка'), blank=True)
+    created_at = models.DateTimeField(_('Дата створення'), default=timezone.now)
+    sent_at = models.DateTimeField(_('Дата відправки'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('Вихідний лист')
+        verbose_name_plural = _('Вихідні листи')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} → {', '.join(self.to)} ({self.get_status_display()})"
+
+
+class LandingPageDailyStats(models.Model):
+    """Денний зріз аналітики лендінгу. Заповнюється командою rollup_landing_stats."""
+
+    landing_page = models.ForeignKey(
+        LandingPage,
+        on_delete=models.CASCADE,
+        related_name='daily_stats'
+    )
+    date = models.DateField(_('Дата'))
+    visits = models.PositiveIntegerField(_('Візити'), default=0)
+    unique_ips = models.PositiveIntegerField(_('Унікальні IP'), default=0)
+    time_spent_total = models.PositiveBigIntegerField(_('Сумарний час на сторінці (сек)'), default=0)
+    time_spent_avg = models.FloatField(_('Середній час на сторінці (сек)'), default=0)
+    time_spent_p50 = models.PositiveIntegerField(_('Медіана часу на сторінці (сек)'), default=0)
+    time_spent_p90 = models.PositiveIntegerField(_('P90 часу на сторінці (сек)'), default=0)
+    interactions = models.JSONField(_('Взаємодії за типом'), default=dict, blank=True)
+    submits = models.PositiveIntegerField(_('Відправки форм'), default=0)
+    updated_at = models.DateTimeField(_('Оновлено'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Денна статистика лендінгу')
+        verbose_name_plural = _('Денна статистика лендінгів')
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['landing_page', 'date'], name='prometei_lp_daily_stats_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f"{self.landing_page_id} @ {self.date}: {self.visits} visits"
+
+
+class AnalyticsWatermark(models.Model):
+    """Позиція, до якої інкрементальна задача вже обробила сирі дані."""
+
+    name = models.CharField(_('Задача'), max_length=50, unique=True)
+    position = models.DateTimeField(_('Оброблено до'))
+    updated_at = models.DateTimeField(_('Оновлено'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Позиція обробки аналітики')
+        verbose_name_plural = _('Позиції обробки аналітики')
+
+    def __str__(self):
+        return f"{self.name}: {self.position:%Y-%m-%d %H:%M:%S}"
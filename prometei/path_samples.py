@@ -0,0 +1,178 @@
+"""
+Path Sample Encoding
+
+Compact binary format for the mouse and scroll samples of a visit, stored in
+``LandingPageVisit.path_samples`` instead of JSON lists in ``path_data``.
+
+Layout (little-endian)::
+
+    header   <B3xHHqq   version, mouse count M, scroll count S,
+                        first mouse ts, first scroll ts (epoch ms)
+    uint32[M]  mouse dt      ms since the previous mouse sample
+    int32[S]   scroll dy     change of scrollY
+    uint32[S]  scroll dt     ms since the previous scroll sample
+    int16[M]   mouse dx      change of clientX
+    int16[M]   mouse dy      change of clientY
+
+Every column is delta-encoded (the first delta is from 0 / the header ts)
+and starts at an aligned offset, so analytics can read it without Python
+objects, e.g. ``numpy.frombuffer(blob, '<i2', M, offset).cumsum()`` with
+offsets from ``column_layout()``. A mouse sample takes 8 bytes instead of
+~40 as JSON.
+"""
+
+import struct
+import sys
+from array import array
+from itertools import accumulate
+
+PATH_SAMPLES_VERSION = 1
+MAX_SAMPLES = 200
+HEADER = struct.Struct('<B3xHHqq')
+
+MOUSE_COORD_MAX = 32767  # clientX/clientY, so every delta fits int16
+SCROLL_MAX = 2 ** 31 - 1
+DT_MAX = 2 ** 32 - 1
+JS_SAFE_INT = 2 ** 53 - 1
+
+# name -> (array typecode, numpy dtype); order is the order in the blob
+COLUMNS = (
+    ('mouse_dt', 'I', '<u4'),
+    ('scroll_dy', 'i', '<i4'),
+    ('scroll_dt', 'I', '<u4'),
+    ('mouse_dx', 'h', '<i2'),
+    ('mouse_dy', 'h', '<i2'),
+)
+_SIZES = {code: int(dtype[-1]) for _, code, dtype in COLUMNS}
+
+
+def _clamp(value, low, high):
+    return min(max(int(value), low), high)
+
+
+def clean_samples(samples, fields, limit=MAX_SAMPLES):
+    """
+    Validate client samples: dicts with numeric ``fields`` and ``ts``.
+
+    Returns:
+        list: Tuples (ts, *fields) sorted by ts, invalid samples dropped
+    """
+    cleaned = []
+    if not isinstance(samples, list):
+        return cleaned
+    for sample in samples[:limit]:
+        if not isinstance(sample, dict):
+            continue
+        try:
+            cleaned.append(tuple(_clamp(float(sample[name]), -JS_SAFE_INT, JS_SAFE_INT) for name in ('ts', *fields)))
+        except (KeyError, TypeError, ValueError, OverflowError):
+            continue
+    cleaned.sort()
+    return cleaned
+
+
+def _deltas(values, low, high):
+    previous, deltas = 0, []
+    for value in values:
+        value = _clamp(value, low, high)
+        deltas.append(value - previous)
+        previous = value
+    return deltas
+
+
+def encode_path_samples(mouse_movements, scroll_positions):
+    """
+    Pack client samples ({'x', 'y', 'ts'} / {'y', 'ts'} dicts) into the binary format.
+
+    Returns:
+        bytes: Encoded samples, or None if there are no valid samples
+    """
+    mouse = clean_samples(mouse_movements, ('x', 'y'))
+    scroll = clean_samples(scroll_positions, ('y',))
+    if not mouse and not scroll:
+        return None
+
+    mouse_t0 = mouse[0][0] if mouse else 0
+    scroll_t0 = scroll[0][0] if scroll else 0
+    columns = {
+        'mouse_dt': _deltas([ts - mouse_t0 for ts, _, _ in mouse], 0, DT_MAX),
+        'scroll_dy': _deltas([y for _, y in scroll], 0, SCROLL_MAX),
+        'scroll_dt': _deltas([ts - scroll_t0 for ts, _ in scroll], 0, DT_MAX),
+        'mouse_dx': _deltas([x for _, x, _ in mouse], 0, MOUSE_COORD_MAX),
+        'mouse_dy': _deltas([y for _, _, y in mouse], 0, MOUSE_COORD_MAX),
+    }
+    parts = [HEADER.pack(PATH_SAMPLES_VERSION, len(mouse), len(scroll), mouse_t0, scroll_t0)]
+    for name, code, _ in COLUMNS:
+        column = array(code, columns[name])
+        if sys.byteorder == 'big':
+            column.byteswap()
+        parts.append(column.tobytes())
+    return b''.join(parts)
+
+
+def column_layout(blob):
+    """
+    Where each column lives in a blob.
+
+    Returns:
+        dict: name -> (offset, count, numpy dtype), plus 'mouse_t0' / 'scroll_t0'
+    """
+    version, mouse_count, scroll_count, mouse_t0, scroll_t0 = HEADER.unpack_from(blob)
+    if version != PATH_SAMPLES_VERSION:
+        raise ValueError(f"Unsupported path samples version: {version}")
+    counts = {'mouse': mouse_count, 'scroll': scroll_count}
+    layout, offset = {'mouse_t0': mouse_t0, 'scroll_t0': scroll_t0}, HEADER.size
+    for name, code, dtype in COLUMNS:
+        count = counts[name.split('_')[0]]
+        layout[name] = (offset, count, dtype)
+        offset += count * _SIZES[code]
+    if offset != len(blob):
+        raise ValueError(f"Path samples blob is {len(blob)} bytes, expected {offset}")
+    return layout
+
+
+def decode_columns(blob):
+    """
+    Absolute values of every column.
+
+    Returns:
+        dict: 'mouse_x', 'mouse_y', 'mouse_ts', 'scroll_y', 'scroll_ts' -> lists of ints
+    """
+    layout = column_layout(blob)
+    view = memoryview(blob)
+    raw = {}
+    for name, code, _ in COLUMNS:
+        offset, count, _ = layout[name]
+        column = array(code)
+        column.frombytes(view[offset:offset + count * _SIZES[code]])
+        if sys.byteorder == 'big':
+            column.byteswap()
+        raw[name] = column
+    return {
+        'mouse_x': list(accumulate(raw['mouse_dx'])),
+        'mouse_y': list(accumulate(raw['mouse_dy'])),
+        'mouse_ts': list(accumulate(raw['mouse_dt'], initial=layout['mouse_t0']))[1:],
+        'scroll_y': list(accumulate(raw['scroll_dy'])),
+        'scroll_ts': list(accumulate(raw['scroll_dt'], initial=layout['scroll_t0']))[1:],
+    }
+
+
+def decode_path_samples(blob):
+    """
+    Samples back in the client's shape, for the admin and JSON exports.
+
+    Returns:
+        dict: {'mouse_movements': [{'x', 'y', 'ts'}, ...], 'scroll_positions': [{'y', 'ts'}, ...]}
+    """
+    if not blob:
+        return {'mouse_movements': [], 'scroll_positions': []}
+    columns = decode_columns(bytes(blob))
+    return {
+        'mouse_movements': [
+            {'x': x, 'y': y, 'ts': ts}
+            for x, y, ts in zip(columns['mouse_x'], columns['mouse_y'], columns['mouse_ts'])
+        ],
+        'scroll_positions': [
+            {'y': y, 'ts': ts} for y, ts in zip(columns['scroll_y'], columns['scroll_ts'])
+        ],
+    }
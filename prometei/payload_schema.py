@@ -0,0 +1,177 @@
+"""
+Tracking Payload Schema
+
+Declarative cleaning of the JSON sent by the landing page tracking script.
+Known fields are coerced to their type, capped and filtered by character
+class; only free text goes through ``bleach.clean``, and only when it
+actually contains markup, so a typical payload never starts an HTML parser.
+
+    METADATA_SCHEMA.clean({'screen': {'w': '1920', 'h': 1080}, 'lang': 'uk-UA'})
+    -> {'screen': {'w': 1920, 'h': 1080}, 'lang': 'uk-UA'}
+
+Fields that fail validation are dropped instead of failing the request.
+"""
+
+import re
+
+import bleach
+
+# Символи, які bleach.clean змінює у звичайному тексті; без них результат ідентичний
+_MARKUP_RE = re.compile(r'[<>&\x00-\x08\x0b-\x1f\x7f]')
+
+INVALID = object()  # marker for a value that is dropped
+
+
+def clean_text(value, max_length):
+    """
+    Free text capped at ``max_length``, HTML-sanitized if it contains markup.
+
+    Returns exactly what ``bleach.clean`` would; plain text skips the parser.
+    """
+    if value is None:
+        return ''
+    value = str(value)[:max_length]
+    if _MARKUP_RE.search(value):
+        return bleach.clean(value)
+    return value
+
+
+class Field:
+    def clean(self, value):
+        """Cleaned value, or INVALID to drop it."""
+        raise NotImplementedError
+
+
+class Int(Field):
+    def __init__(self, min_value=0, max_value=2 ** 31 - 1):
+        self.min_value = min_value
+        self.max_value = max_value
+
+    def clean(self, value):
+        if isinstance(value, bool):
+            return INVALID
+        try:
+            value = int(float(value))
+        except (TypeError, ValueError, OverflowError):
+            return INVALID
+        return min(max(value, self.min_value), self.max_value)
+
+
+class Bool(Field):
+    def clean(self, value):
+        if isinstance(value, bool):
+            return value
+        if value in (0, 1, 'true', 'false'):
+            return value in (1, 'true')
+        return INVALID
+
+
+class Token(Field):
+    """Short identifier: characters outside ``charset`` are removed."""
+
+    def __init__(self, max_length, charset=r'A-Za-z0-9_\-'):
+        self.max_length = max_length
+        self._strip = re.compile(f'[^{charset}]')
+
+    def clean(self, value):
+        if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+            return INVALID
+        return self._strip.sub('', str(value)[:self.max_length]) or INVALID
+
+
+class Text(Field):
+    """Genuinely free text, sanitized with ``clean_text``."""
+
+    def __init__(self, max_length):
+        self.max_length = max_length
+
+    def clean(self, value):
+        if value is None or isinstance(value, (dict, list)):
+            return INVALID
+        return clean_text(value, self.max_length)
+
+
+class Struct(Field):
+    """Dict with known keys; unknown keys are handled by ``extra`` or dropped."""
+
+    def __init__(self, fields, extra=None, max_items=50):
+        self.fields = fields
+        self.extra = extra
+        self.max_items = max_items
+
+    def clean(self, value):
+        if not isinstance(value, dict):
+            return INVALID
+        cleaned = {}
+        for key, item in list(value.items())[:self.max_items]:
+            field = self.fields.get(key)
+            if field is None:
+                if self.extra is None:
+                    continue
+                key, item = self.extra(key, item)
+                if key is INVALID:
+                    continue
+            else:
+                item = field.clean(item)
+            if item is not INVALID:
+                cleaned[key] = item
+        return cleaned
+
+
+class Flags(Field):
+    """Dict of identifier -> bool, e.g. which cookies are present."""
+
+    def __init__(self, key, max_items=20):
+        self.key = key
+        self.max_items = max_items
+
+    def clean(self, value):
+        if not isinstance(value, dict):
+            return INVALID
+        flags = {}
+        for key, flag in list(value.items())[:self.max_items]:
+            key = self.key.clean(key)
+            if key is not INVALID and isinstance(flag, bool):
+                flags[key] = flag
+        return flags
+
+
+def clean_unknown(key, value):
+    """
+    Metadata keys the schema does not know (added to the script later):
+    the previous generic rules - text keys and values, short lists, flat dicts.
+    """
+    key = clean_text(key, 50)
+    if isinstance(value, (str, int, float, bool)):
+        return key, clean_text(value, 200)
+    if isinstance(value, list):
+        return key, [clean_text(item, 100) for item in value[:20]]
+    if isinstance(value, dict):
+        return key, {clean_text(k, 50): clean_text(v, 100) for k, v in list(value.items())[:20]}
+    return key, 'Unsupported data type'
+
+
+_SIZE = Struct({'w': Int(0, 100_000), 'h': Int(0, 100_000), 'cd': Int(0, 64)})
+
+# Поля extractMetadata() з _tracking_main_script.html
+METADATA_SCHEMA = Struct({
+    'screen': _SIZE,
+    'viewport': _SIZE,
+    'browser': Text(255),
+    'lang': Token(35),
+    'tz': Token(64, r'A-Za-z0-9_+\-/'),
+    'cookies': Bool(),
+    'cookieError': Bool(),
+    'fbCookies': Flags(Token(50)),
+}, extra=clean_unknown)
+
+ELEMENT_ID = Text(150)  # id, className або href елемента
+ELEMENT_TAG = Token(50)
+
+
+def clean_element(element_id, element_tag):
+    """(element_id, element_type) of an interaction, '' for missing or invalid values."""
+    element_id = ELEMENT_ID.clean(element_id) if element_id else ''
+    element_tag = ELEMENT_TAG.clean(element_tag) if element_tag else ''
+    return (element_id if element_id is not INVALID else '',
+            element_tag if element_tag is not INVALID else '')
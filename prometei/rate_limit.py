@@ -0,0 +1,321 @@
+"""
+Rate Limiting
+
+Sliding-window rate limiter shared by all worker processes. Every check is a
+single atomic increment of the counter for the current window plus a read of
+the previous window's counter; the estimate weights the previous window by how
+much of it still overlaps the sliding period.
+
+Backends:
+    SQLiteRateLimitBackend: file-backed store in WAL mode, shared by every
+        process on the host (default)
+    RedisRateLimitBackend: anything that speaks the Redis protocol
+    CacheRateLimitBackend: a Django cache alias (only shared if the cache is)
+
+Select one with the RATE_LIMIT_BACKEND setting ('sqlite', 'redis' or 'cache').
+"""
+
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from urllib.parse import unquote, urlparse
+
+from asgiref.sync import sync_to_async
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+}
+
+
+@lru_cache(maxsize=64)
+def parse_rate(limit_str):
+    """
+    Parse a rate string such as "5/minute".
+
+    Returns:
+        tuple: (limit, period_seconds)
+
+    Raises:
+        ValueError: If the string is malformed or the period is unknown
+    """
+    limit, period_name = limit_str.split('/')
+    if period_name not in PERIODS:
+        raise ValueError(f"Invalid rate limit period name: {period_name} in {limit_str}")
+    return int(limit), PERIODS[period_name]
+
+
+class CacheRateLimitBackend:
+    """Counters in a Django cache. ``add`` + ``incr`` is atomic on Redis/Memcached and LocMem."""
+
+    def __init__(self, alias='default'):
+        from django.core.cache import caches
+        self.cache = caches[alias]
+
+    def hit(self, key, window, period):
+        current_key = f"rl:{key}:{window}"
+        self.cache.add(current_key, 0, timeout=period * 2)
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:
+            # Expired between add() and incr()
+            self.cache.add(current_key, 1, timeout=period * 2)
+            current = 1
+        previous = self.cache.get(f"rl:{key}:{window - 1}", 0)
+        return current, previous
+
+
+class SQLiteRateLimitBackend:
+    """
+    Counters in a standalone SQLite file, one upsert per check.
+
+    The file is opened in WAL mode so concurrent workers do not block each
+    other's reads, and every process/thread keeps its own connection. The
+    upsert and the read of both windows share one write transaction, so the
+    count returned is the one this check produced. Plain UPSERT (SQLite 3.24)
+    is used instead of ``RETURNING``, which needs SQLite 3.35.
+    """
+
+    CLEANUP_EVERY = 1000
+
+    def __init__(self, path, busy_timeout_ms=2000):
+        self.path = str(path)
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._hits = 0
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limit ('
+                ' key TEXT NOT NULL, window INTEGER NOT NULL, count INTEGER NOT NULL, expires REAL NOT NULL,'
+                ' PRIMARY KEY (key, window)) WITHOUT ROWID'
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def hit(self, key, window, period):
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'INSERT INTO rate_limit (key, window, count, expires) VALUES (?, ?, 1, ?) '
+                'ON CONFLICT (key, window) DO UPDATE SET count = count + 1',
+                (key, window, now + period * 2),
+            )
+            counts = dict(conn.execute(
+                'SELECT window, count FROM rate_limit WHERE key = ? AND window IN (?, ?)', (key, window, window - 1)
+            ).fetchall())
+            conn.execute('COMMIT')
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+
+        self._hits += 1
+        if self._hits % self.CLEANUP_EVERY == 0:
+            conn.execute('DELETE FROM rate_limit WHERE expires < ?', (now,))
+        return counts[window], counts.get(window - 1, 0)
+
+
+class RedisProtocolError(Exception):
+    pass
+
+
+class RedisRateLimitBackend:
+    """
+    Counters in Redis (or any server speaking RESP), via a minimal built-in client.
+
+    Each check pipelines ``INCR`` / ``EXPIRE`` / ``GET`` in a single round trip.
+    A pipeline is never resent: once it went out, ``INCR`` may have run, so a
+    failure closes the connection and is raised. An idle connection the
+    server has dropped is noticed before sending and replaced.
+    """
+
+    def __init__(self, url='redis://127.0.0.1:6379/0', socket_timeout=0.5):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.socket_timeout = socket_timeout
+        self._local = threading.local()
+
+    @staticmethod
+    def _encode(*args):
+        out = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            arg = str(arg).encode('utf-8')
+            out.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(out)
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b'+':
+            return payload.decode()
+        if prefix == b'-':
+            raise RedisProtocolError(payload.decode())
+        if prefix == b':':
+            return int(payload)
+        if prefix == b'$':
+            length = int(payload)
+            if length == -1:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if prefix == b'*':
+            return [self._read_reply(reader) for _ in range(int(payload))]
+        raise RedisProtocolError(f"Unexpected reply: {line!r}")
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.socket_timeout)
+        reader = sock.makefile('rb')
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            setup = []
+            if self.password:
+                setup.append(('AUTH', self.password))
+            if self.db:
+                setup.append(('SELECT', self.db))
+            if setup:
+                sock.sendall(b''.join(self._encode(*cmd) for cmd in setup))
+                for _ in setup:
+                    self._read_reply(reader)
+        except BaseException:
+            reader.close()
+            sock.close()
+            raise
+        self._local.sock, self._local.reader, self._local.pid = sock, reader, os.getpid()
+
+    def _disconnect(self):
+        sock, self._local.sock = getattr(self._local, 'sock', None), None
+        if sock is not None:
+            self._local.reader.close()
+            sock.close()
+
+    def _is_stale(self, sock):
+        """True if an idle connection was closed by the server or has unread bytes."""
+        sock.settimeout(0)
+        try:
+            sock.recv(1, socket.MSG_PEEK)
+            return True  # EOF або залишок відповіді: з'єднання розсинхронізоване
+        except BlockingIOError:
+            return False
+        except OSError:
+            return True
+        finally:
+            sock.settimeout(self.socket_timeout)
+
+    def execute_pipeline(self, *commands):
+        """Send several commands in one write and return their replies in order."""
+        sock = getattr(self._local, 'sock', None)
+        # Після fork close() закриває лише копію дескриптора в дочірньому процесі
+        if sock is not None and (self._local.pid != os.getpid() or self._is_stale(sock)):
+            self._disconnect()
+        if getattr(self._local, 'sock', None) is None:
+            self._connect()
+        try:
+            self._local.sock.sendall(b''.join(self._encode(*cmd) for cmd in commands))
+            return [self._read_reply(self._local.reader) for _ in commands]
+        except (OSError, RedisProtocolError):
+            self._disconnect()
+            raise
+
+    def hit(self, key, window, period):
+        current_key = f"rl:{key}:{window}"
+        current, _expire, previous = self.execute_pipeline(
+            ('INCR', current_key),
+            ('EXPIRE', current_key, period * 2),
+            ('GET', f"rl:{key}:{window - 1}"),
+        )
+        return current, int(previous) if previous else 0
+
+
+class RateLimiter:
+    """Sliding-window counter limiter on top of an atomic counter backend."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def hit(self, key, limit, period, now=None):
+        """
+        Count one request for ``key`` and decide whether it is allowed.
+
+        Returns:
+            tuple: (allowed, estimated_count)
+        """
+        now = time.time() if now is None else now
+        window, offset = divmod(now, period)
+        current, previous = self.backend.hit(key, int(window), period)
+        estimate = previous * (1 - offset / period) + current
+        return estimate <= limit, estimate
+
+    async def ahit(self, key, limit, period, now=None):
+        """
+        Async hit() for async views.
+
+        The backend call runs in a worker thread. Django's cache backends have
+        no native async API (``BaseCache.aincr`` is a non-atomic get + set), and
+        the SQLite and Redis backends are blocking, so this keeps the atomic
+        increment without blocking the event loop.
+        """
+        now = time.time() if now is None else now
+        return await sync_to_async(self.hit, thread_sensitive=False)(key, limit, period, now)
+
+
+def build_backend(name, **options):
+    """Instantiate a backend by its RATE_LIMIT_BACKEND name."""
+    if name == 'sqlite':
+        return SQLiteRateLimitBackend(options['path'])
+    if name == 'redis':
+        return RedisRateLimitBackend(options.get('url', 'redis://127.0.0.1:6379/0'))
+    if name == 'cache':
+        return CacheRateLimitBackend(options.get('alias', 'default'))
+    raise ValueError(f"Unknown rate limit backend: {name}")
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Process-wide limiter configured from settings."""
+    global _limiter
+    if _limiter is None:
+        from django.conf import settings
+        with _limiter_lock:
+            if _limiter is None:
+                name = getattr(settings, 'RATE_LIMIT_BACKEND', 'cache')
+                _limiter = RateLimiter(build_backend(
+                    name,
+                    path=getattr(settings, 'RATE_LIMIT_SQLITE_PATH', None),
+                    url=getattr(settings, 'RATE_LIMIT_REDIS_URL', 'redis://127.0.0.1:6379/0'),
+                    alias=getattr(settings, 'RATE_LIMIT_CACHE_ALIAS', 'default'),
+                ))
+    return _limiter
+
+
+def reset_rate_limiter(**kwargs):
+    """Drop the configured limiter so the next check picks up changed settings."""
+    global _limiter
+    if kwargs.get('setting', 'RATE_LIMIT_BACKEND').startswith('RATE_LIMIT_'):
+        _limiter = None
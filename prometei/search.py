@@ -0,0 +1,176 @@
+"""
+Landing Page Search Index
+
+Full-text index over landing page title, slug and visible HTML text, so a
+search never has to read every ``html_content`` blob. The structure depends
+on the database vendor:
+
+    sqlite      FTS5 virtual table ``prometei_landingpage_fts`` (rowid = page id),
+                ranked with bm25()
+    postgresql  side table ``prometei_landingpage_search`` with a weighted
+                tsvector and a GIN index, ranked with ts_rank_cd()
+
+Other vendors fall back to ``icontains`` on title and slug. The index is kept
+in sync by the post_save/post_delete handlers in signals.py, and
+``rebuild_index()`` (``manage.py rebuild_landing_search_index``) repopulates it.
+
+A search joins the index table into the page query, so matching, ranking
+and paging (LIMIT/OFFSET or a keyset on ``search_rank``) happen in one SQL
+statement and every match can be paged through. ``search_rank`` is lower
+for better matches on every backend.
+"""
+
+import html
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import LandingPage
+
+FTS_TABLE = 'prometei_landingpage_fts'
+PG_TABLE = 'prometei_landingpage_search'
+BODY_MAX_LENGTH = 100_000  # characters of page text that are indexed
+
+# Column weights: title, slug, body
+SQLITE_WEIGHTS = (10.0, 5.0, 1.0)
+
+_INVISIBLE_RE = re.compile(r'<(script|style|noscript|template)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r'<!--.*?-->|<[^>]*>', re.DOTALL)
+_WHITESPACE_RE = re.compile(r'\s+')
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def backend():
+    """Index flavour for the default database, or None if unsupported."""
+    if connection.vendor in ('sqlite', 'postgresql'):
+        return connection.vendor
+    return None
+
+
+def page_text(html_content):
+    """Visible text of a page: markup, scripts and styles removed, whitespace collapsed."""
+    # Regex instead of strip_tags(): the text is only indexed, never rendered, and
+    # HTMLParser costs ~1 ms per KB, which dominated bulk page creation
+    text = _TAG_RE.sub(' ', _INVISIBLE_RE.sub(' ', html_content or ''))
+    return _WHITESPACE_RE.sub(' ', html.unescape(text)).strip()[:BODY_MAX_LENGTH]
+
+
+def search_terms(query):
+    """Lower-cased word terms of a user query."""
+    return [term.lower() for term in _TERM_RE.findall(query or '')][:16]
+
+
+def write_index_entry(cursor, vendor, page_id, title, slug, html_content):
+    """Insert or replace the index row of one page using an open cursor."""
+    title, slug, body = title or '', (slug or '').replace('-', ' '), page_text(html_content)
+    if vendor == 'sqlite':
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [page_id])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, slug, body) VALUES (%s, %s, %s, %s)',
+            [page_id, title, slug, body],
+        )
+    elif vendor == 'postgresql':
+        cursor.execute(
+            f"INSERT INTO {PG_TABLE} (landing_page_id, document) VALUES (%s, "
+            f"setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B') "
+            f"|| setweight(to_tsvector('simple', %s), 'D')) "
+            f"ON CONFLICT (landing_page_id) DO UPDATE SET document = EXCLUDED.document",
+            [page_id, title, slug, body],
+        )
+
+
+def index_landing_page(page):
+    """Insert or replace one page in the index."""
+    flavour = backend()
+    if flavour is None:
+        return
+    with connection.cursor() as cursor:
+        write_index_entry(cursor, flavour, page.id, page.title, page.slug, page.html_content)
+
+
+def index_landing_pages(pages):
+    """Insert or replace several pages in the index over one cursor (bulk-created pages send no post_save)."""
+    flavour = backend()
+    if flavour is None:
+        return
+    with connection.cursor() as cursor:
+        for page in pages:
+            write_index_entry(cursor, flavour, page.id, page.title, page.slug, page.html_content)
+
+
+def remove_landing_page(page_id):
+    """Drop a page from the index (the Postgres side table also cascades)."""
+    flavour = backend()
+    if flavour is None:
+        return
+    with connection.cursor() as cursor:
+        if flavour == 'sqlite':
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [page_id])
+        else:
+            cursor.execute(f'DELETE FROM {PG_TABLE} WHERE landing_page_id = %s', [page_id])
+
+
+def rebuild_index(batch_size=500):
+    """
+    Repopulate the index from scratch.
+
+    Returns:
+        int: Number of pages indexed
+    """
+    flavour = backend()
+    if flavour is None:
+        return 0
+    count = 0
+    pages = LandingPage.objects.only('id', 'title', 'slug', 'html_content').order_by('id')
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE if flavour == "sqlite" else PG_TABLE}')
+        for page in pages.iterator(chunk_size=batch_size):
+            write_index_entry(cursor, flavour, page.id, page.title, page.slug, page.html_content)
+            count += 1
+    return count
+
+
+def _match_expression(terms):
+    flavour = backend()
+    if flavour == 'sqlite':
+        # Every term must match, as a prefix; quoting keeps FTS5 operators out of user input.
+        return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+    return ' & '.join(f'{term}:*' for term in terms)
+
+
+def search_queryset(queryset, query):
+    """
+    Restrict a LandingPage queryset to the pages matching ``query``.
+
+    Matching pages are annotated with ``search_rank`` (lower is better);
+    order by it to get ranked results. The rank is computed by the joined
+    index in the same query (a per-row rank subquery would make bm25 re-read
+    the whole posting list for every row). An empty query matches nothing.
+    """
+    terms = search_terms(query)
+    flavour = backend()
+    if not terms:
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+    if flavour is None:
+        q = Q()
+        for term in terms:
+            q &= Q(title__icontains=term) | Q(slug__icontains=term)
+        return queryset.filter(q).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    match = _match_expression(terms)
+    page_id = f'"{LandingPage._meta.db_table}"."id"'
+    if flavour == 'sqlite':
+        weights = ', '.join(str(w) for w in SQLITE_WEIGHTS)
+        table = FTS_TABLE
+        where = [f'{FTS_TABLE} MATCH %s', f'{FTS_TABLE}.rowid = {page_id}']
+        rank = RawSQL(f'bm25({FTS_TABLE}, {weights})', [], output_field=FloatField())
+    else:
+        table = PG_TABLE
+        where = [f"{PG_TABLE}.document @@ to_tsquery('simple', %s)", f'{PG_TABLE}.landing_page_id = {page_id}']
+        # ts_rank_cd is higher for better matches
+        rank = RawSQL(f"-ts_rank_cd({PG_TABLE}.document, to_tsquery('simple', %s))", [match],
+                      output_field=FloatField())
+    return queryset.extra(tables=[table], where=where, params=[match]).annotate(search_rank=rank)
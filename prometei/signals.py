@@ -0,0 +1,56 @@
+import logging
+
+from django.core.signals import setting_changed
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.template.loader import TemplateDoesNotExist
+
+from .landing_cache import invalidate_landing_slugs
+from .landing_renderer import warm_landing_page_cache
+from .models import LandingPage
+from .rate_limit import reset_rate_limiter
+from .search import index_landing_page, remove_landing_page
+from .sqlite_tuning import configure_sqlite_connection
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=LandingPage)
+def landing_page_saved(sender, instance, **kwargs):
+    """Build the render artifact as soon as a page is published or edited."""
+    if not instance.is_active:
+        return
+    try:
+        warm_landing_page_cache(instance)
+    except TemplateDoesNotExist as e:
+        logger.error(f"Could not precompile landing page {instance.id}: {e}")
+
+
+@receiver(post_save, sender=LandingPage)
+def landing_page_indexed(sender, instance, **kwargs):
+    """Keep the full-text search index in step with the page."""
+    index_landing_page(instance)
+
+
+@receiver(post_delete, sender=LandingPage)
+def landing_page_unindexed(sender, instance, **kwargs):
+    remove_landing_page(instance.id)
+
+
+@receiver(post_save, sender=LandingPage)
+@receiver(post_delete, sender=LandingPage)
+def landing_page_slug_changed(sender, instance, **kwargs):
+    """Drop cached slug lookups of the page, including the slug it was loaded with."""
+    invalidate_landing_slugs([instance.slug, getattr(instance, '_loaded_slug', None)])
+    instance._loaded_slug = instance.slug
+
+
+@receiver(connection_created)
+def sqlite_connection_created(sender, connection, **kwargs):
+    """WAL, busy timeout and cache pragmas on every new SQLite connection (prometei.sqlite_tuning)."""
+    configure_sqlite_connection(connection)
+
+
+setting_changed.connect(reset_rate_limiter)
+
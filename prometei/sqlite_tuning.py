@@ -0,0 +1,161 @@
+"""
+SQLite Tuning
+
+The site runs on SQLite in production for now (see DATABASES in
+config/settings.py). Out of the box that means a rollback journal, where
+every writer blocks every reader, and a lock wait of up to five seconds. With
+several workers writing visits, requests then block or fail with
+"database is locked".
+
+Every new SQLite connection is configured from the connection_created signal
+(see signals.py):
+
+    journal_mode=WAL      readers no longer block the writer, or the writer them
+    synchronous=NORMAL    fsync at checkpoints, not on every commit (safe in WAL)
+    busy_timeout          SQLITE_BUSY_TIMEOUT ms of waiting for the write lock
+    cache_size            SQLITE_CACHE_SIZE (negative: KiB) of page cache
+    mmap_size             SQLITE_MMAP_SIZE bytes of memory-mapped reads
+    temp_store=MEMORY     sorts and temporary indexes stay off disk
+
+Set SQLITE_TUNING = False to leave connections alone. In-memory databases
+(tests) keep their journal mode.
+
+SQLite admits one writer at a time anyway. ``db_writer`` funnels the
+tracking hot path (ingest queue batches, summary flushes, events beacons)
+through one writer per process, so its threads queue on a lock instead of
+on SQLite. Each write runs in its own ``immediate_atomic()`` transaction:
+BEGIN IMMEDIATE takes the write lock up front and waits busy_timeout for
+it, where a deferred transaction that reads first can fail at once when
+it starts to write. Other transactions stay DEFERRED, so reads never queue
+for the write lock. A write that still hits "database is locked", because
+another process holds the lock past busy_timeout, is retried with backoff.
+Writes inside an outer transaction are not retried, because only that
+transaction could be.
+"""
+
+import functools
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connection, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+SQLITE_BUSY_TIMEOUT = getattr(settings, 'SQLITE_BUSY_TIMEOUT', 5000)  # ms
+SQLITE_CACHE_SIZE = getattr(settings, 'SQLITE_CACHE_SIZE', -20000)  # 20 MB
+SQLITE_MMAP_SIZE = getattr(settings, 'SQLITE_MMAP_SIZE', 128 * 1024 * 1024)
+SQLITE_WRITE_RETRIES = getattr(settings, 'SQLITE_WRITE_RETRIES', 5)
+SQLITE_WRITE_RETRY_DELAY = getattr(settings, 'SQLITE_WRITE_RETRY_DELAY', 0.05)  # seconds, doubled per retry
+
+
+def configure_sqlite_connection(db_connection):
+    """Apply the pragmas above to a new SQLite connection (no-op for other backends)."""
+    if db_connection.vendor != 'sqlite' or not getattr(settings, 'SQLITE_TUNING', True):
+        return
+    pragmas = [
+        f'PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT)}',
+        'PRAGMA synchronous=NORMAL',
+        f'PRAGMA cache_size={int(SQLITE_CACHE_SIZE)}',
+        f'PRAGMA mmap_size={int(SQLITE_MMAP_SIZE)}',
+        'PRAGMA temp_store=MEMORY',
+    ]
+    if not db_connection.is_in_memory_db():
+        # WAL зберігається у файлі БД; повторне ввімкнення нічого не коштує
+        pragmas.insert(0, 'PRAGMA journal_mode=WAL')
+    with db_connection.cursor() as cursor:
+        for pragma in pragmas:
+            cursor.execute(pragma)
+
+
+@contextmanager
+def immediate_atomic(using=DEFAULT_DB_ALIAS):
+    """
+    transaction.atomic() whose outermost transaction is opened with BEGIN IMMEDIATE on SQLite.
+
+    Nested blocks are plain savepoints; other backends get transaction.atomic().
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite' or db.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+    # transaction_mode читається з OPTIONS при підключенні, тож спершу підключаємось
+    db.ensure_connection()
+    previous = db.transaction_mode
+    db.transaction_mode = 'IMMEDIATE'
+    try:
+        with transaction.atomic(using=using):
+            db.transaction_mode = previous
+            yield
+    finally:
+        db.transaction_mode = previous
+
+
+def is_lock_error(error):
+    return isinstance(error, OperationalError) and 'locked' in str(error)
+
+
+class SerializedWriter:
+    """One writer at a time per process, with retries of "database is locked"."""
+
+    def __init__(self, retries=SQLITE_WRITE_RETRIES, retry_delay=SQLITE_WRITE_RETRY_DELAY):
+        self.retries = retries
+        self.retry_delay = retry_delay
+        # Реентерабельний: записи всередині записів (флеш черги візитів) не блокують самі себе
+        self.lock = threading.RLock()
+        self._stats_lock = threading.Lock()
+        self._stats = {'writes': 0, 'retries': 0, 'lock_errors': 0}
+
+    def run(self, func, *args, **kwargs):
+        """
+        Call ``func(*args, **kwargs)`` holding the writer lock, in an
+        immediate_atomic() transaction unless one is already open.
+
+        Raises:
+            OperationalError: If the database stays locked after all retries
+        """
+        attempt = 0
+        while True:
+            try:
+                with self.lock:
+                    if connection.in_atomic_block:
+                        result = func(*args, **kwargs)
+                    else:
+                        with immediate_atomic():
+                            result = func(*args, **kwargs)
+                self._count('writes')
+                return result
+            except OperationalError as e:
+                if not is_lock_error(e) or connection.in_atomic_block or attempt >= self.retries:
+                    if is_lock_error(e):
+                        self._count('lock_errors')
+                    raise
+                attempt += 1
+                self._count('retries')
+                # The lock was released above; callers must not hold it across run()
+                delay = self.retry_delay * 2 ** (attempt - 1)
+                logger.warning(f"Database locked, retrying write {attempt}/{self.retries} in {delay:.2f}s")
+                time.sleep(delay * random.uniform(0.5, 1.5))
+
+    def metrics(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+
+db_writer = SerializedWriter()
+
+
+def serialized_write(func):
+    """Decorator: run ``func`` through ``db_writer``."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return db_writer.run(func, *args, **kwargs)
+    return wrapper
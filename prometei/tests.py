@@ -1,3 +1,1267 @@
-from django.test import TestCase
+import asyncio
+import base64
+import gzip
+import json
+import re
+import socket
+import socketserver
+import tempfile
+import threading
+import time as time_module
+import uuid
+from datetime import datetime, time, timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import brotli
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from . import email_outbox, views, visit_ingest
+from .beacon_lane import BeaconFastLane
+from .email_service import EmailService
+from .checks import check_slug_cache_is_shared
+from .landing_cache import SlugCache, slug_cache
+from .landing_page_generator import create_landing_pages_from_template, find_landing_pages
+from .landing_renderer import inject_tracking, minify_html, negotiate_encoding
+from .landing_templates import TemplateVariableError, compile_template, get_compiled_template
+from .landing_stats import STATS_FIELDS, annotate_visit_totals, rollup_landing_stats
+from .payload_schema import METADATA_SCHEMA, clean_element, clean_text
+from .path_samples import column_layout, decode_path_samples, encode_path_samples
+from .rate_limit import RateLimiter, RedisRateLimitBackend, SQLiteRateLimitBackend, parse_rate
+from .search import rebuild_index
+from .sqlite_tuning import SerializedWriter, immediate_atomic
+from .user_agent_cache import UserAgentCache
+from .views import cap_metadata
+from .visit_archive import ArchiveNotReady, archive_cutoff, archive_visits, archived_daily_stats, iter_archived_visits
+from .visit_ingest import InteractionIngestQueue, SnowflakeIdGenerator, VisitIngestQueue, VisitSummaryBuffer
+from .visit_tokens import InvalidVisitToken, sign_visit_token, verify_visit_token
+from .models import (ContactRequest, LandingPage, LandingPageDailyStats, LandingPageInteraction, LandingPageTemplate,
+                     LandingPageVisit, OutboundEmail)
+
+
+@override_settings(LANDING_VISIT_INGEST_ASYNC=False, RATE_LIMIT_BACKEND='cache')
+class LandingPageViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.landing_page = LandingPage.objects.create(
+            title='Тестовий лендінг',
+            slug='lp-test',
+            html_content='<html><head><title>T</title></head><body class="main"><h1>Привіт</h1></body></html>',
+            google_pixel_id='GTM-TEST',
+            facebook_pixel_id='123456',
+        )
+        self.url = self.landing_page.get_absolute_url()
+
+    def test_tracking_is_injected(self):
+        """Сторінка отримує robots, пікселі та скрипт відстеження у правильних місцях"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        html = response.content.decode()
+        visit = LandingPageVisit.objects.get(landing_page=self.landing_page)
+
+        self.assertLess(html.index('<meta name="robots"'), html.index('</head>'))
+        self.assertLess(html.index("'GTM-TEST'"), html.index('</head>'))
+        self.assertLess(html.index('<body class="main">'), html.index('<noscript>'))
+        self.assertLess(html.index(f'visitId: "{visit.id}",'), html.index('</body>'))
+        self.assertIn("fbq('init', '123456')", html)
+        self.assertNotIn('__LP_SLOT_', html)
+
+    def test_each_visit_gets_own_values(self):
+        """Кожен візит отримує власний visit_id з одного скомпільованого артефакту"""
+        first = self.client.get(self.url).content.decode()
+        second = self.client.get(self.url).content.decode()
+        first_id, second_id = LandingPageVisit.objects.order_by('id').values_list('id', flat=True)
+        self.assertIn(f'visitId: "{first_id}",', first)
+        self.assertIn(f'visitId: "{second_id}",', second)
+
+    def test_saved_changes_are_served(self):
+        """Збереження сторінки змінює ключ кешу і нова версія одразу віддається"""
+        self.client.get(self.url)
+        self.landing_page.html_content = '<html><head></head><body><h1>Оновлено</h1></body></html>'
+        self.landing_page.save()
+        self.assertContains(self.client.get(self.url), 'Оновлено')
+
+    def page_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            status = self.client.get(url).status_code
+        return status, [q['sql'] for q in queries if 'FROM "prometei_landingpage"' in q['sql']]
+
+    def test_slug_lookups_are_cached(self):
+        """Повторні візити й невідомі slug не читають prometei_landingpage"""
+        self.assertEqual(self.page_queries(self.url)[0], 200)
+        self.assertEqual(self.page_queries(self.url), (200, []))
+        unknown = reverse('prometei:landing_page', kwargs={'slug': 'wp-admin'})
+        status, queries = self.page_queries(unknown)
+        self.assertEqual((status, len(queries)), (404, 1))
+        self.assertNotIn('html_content', queries[0])
+        self.assertEqual(self.page_queries(unknown), (404, []))
+        slug_cache.clear()
+        # LocMemCache is per process: no shared level to fall back on
+        self.assertEqual(len(self.page_queries(unknown)[1]), 1)
+        with override_settings(LANDING_SLUG_CACHE_SHARED=True):
+            slug_cache.clear()
+            self.page_queries(unknown)
+            slug_cache.clear()
+            self.assertEqual(self.page_queries(unknown), (404, []))  # зі спільного кешу
+
+    def test_deactivation_reaches_other_processes(self):
+        """Два воркери з власними LRU: другий бачить деактивацію не пізніше за локальний TTL"""
+        this_worker, other_worker = SlugCache(local_ttl=0.05), SlugCache(local_ttl=0.05)
+        self.assertEqual(this_worker.get('lp-test').id, self.landing_page.id)
+        self.assertEqual(other_worker.get('lp-test').id, self.landing_page.id)
+
+        LandingPage.objects.filter(id=self.landing_page.id).update(is_active=False)
+        this_worker.invalidate(['lp-test'])  # лише кеші цього процесу
+        self.assertIsNone(this_worker.get('lp-test'))
+        time_module.sleep(0.06)
+        self.assertIsNone(other_worker.get('lp-test'))
+        self.assertEqual(other_worker.stats()['shared_hits'], 0)
+
+    def test_forced_shared_level_over_locmem_fails_check(self):
+        with override_settings(LANDING_SLUG_CACHE_SHARED=True):
+            self.assertEqual([e.id for e in check_slug_cache_is_shared(None)], ['prometei.E001'])
+        self.assertEqual(check_slug_cache_is_shared(None), [])
+
+    def test_slug_cache_follows_link_and_status_changes(self):
+        self.client.get(self.url)
+        old_url = self.url
+        new_url = LandingPage.objects.get(id=self.landing_page.id).generate_new_link()
+        self.assertEqual(self.client.get(old_url).status_code, 404)
+        self.assertEqual(self.client.get(new_url).status_code, 200)
+
+        self.client.force_login(get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass'))
+        self.client.post(reverse('admin:prometei_landingpage_changelist'),
+                         {'action': 'deactivate_pages', '_selected_action': [self.landing_page.id]})
+        self.assertEqual(self.client.get(new_url).status_code, 404)
+        self.client.post(reverse('admin:prometei_landingpage_changelist'),
+                         {'action': 'activate_pages', '_selected_action': [self.landing_page.id]})
+        self.assertEqual(self.client.get(new_url).status_code, 200)
+
+    def test_compressed_responses_match_identity(self):
+        """br та gzip — стиснений при збереженні префікс плюс нестиснений хвіст із значеннями візиту"""
+        identity = self.client.get(self.url)
+        self.assertNotIn('Content-Encoding', identity)
+        self.assertIn('Accept-Encoding', identity['Vary'])
+        visit_values = re.compile(r'(visitId|visitToken|csrfToken): "[\w-]+"')  # CSRF-токен маскується щоразу інакше
+        identity_html = visit_values.sub('', identity.content.decode())
+        for accept, coding, decompress in (('gzip, deflate, br', 'br', brotli.decompress),
+                                           ('gzip;q=1.0, br;q=0', 'gzip', gzip.decompress)):
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING=accept)
+            self.assertEqual(response['Content-Encoding'], coding)
+            self.assertLess(len(response.content), len(identity.content) / 2)
+            visit_id = LandingPageVisit.objects.order_by('-id').values_list('id', flat=True).first()
+            html = decompress(response.content).decode()
+            self.assertIn(f'visitId: "{visit_id}",', html)
+            self.assertEqual(visit_values.sub('', html), identity_html)
+
+    def test_negotiate_encoding_and_minify(self):
+        self.assertEqual(negotiate_encoding('gzip, deflate, br, zstd'), 'br')
+        self.assertEqual(negotiate_encoding('br;q=0.5, gzip'), 'gzip')
+        self.assertIsNone(negotiate_encoding('identity'))
+        self.assertIsNone(negotiate_encoding('*;q=0'))
+        self.assertEqual(
+            minify_html('<div>\n  <!-- x -->\n  <b>a  b</b>  <i>c</i><pre>\n  d\n</pre>\n</div>'),
+            '<div>\n<b>a  b</b> <i>c</i><pre>\n  d\n</pre>\n</div>',
+        )
+
+    def test_inject_tracking_without_document_tags(self):
+        html = inject_tracking('<p>Фрагмент</p>', 'HEAD', 'NOSCRIPT', 'SCRIPT')
+        self.assertEqual(html, '<body>\nNOSCRIPT\n<head>\nHEAD\n</head>\n<p>Фрагмент</p>\nSCRIPT\n</body>')
+
+
+@override_settings(LANDING_VISIT_INGEST_ASYNC=False, RATE_LIMIT_BACKEND='cache')
+class LandingEventsViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.landing_page = LandingPage.objects.create(
+            title='Лендінг', slug='lp-events', html_content='<html><body></body></html>'
+        )
+        self.visit = LandingPageVisit.objects.create(landing_page=self.landing_page)
+        self.url = reverse('prometei:landing_events')
+
+    def post(self, payload, url=None):
+        return self.client.post(url or self.url, json.dumps(payload), content_type='application/json')
+
+    def token(self, visit_id=None, **kwargs):
+        return sign_visit_token(visit_id or self.visit.id, self.landing_page.id, self.landing_page.slug, **kwargs)
+
+    def test_batch_is_written_in_one_pass(self):
+        payload = {
+            'visit_id': str(self.visit.id),
+            'visit_token': self.token(),
+            'sent_at': 10000,
+            'interactions': [
+                {'type': 'click', 'element_id': 'cta', 'element_tag': 'BUTTON', 'ts': 4000},
+                {'type': 'scroll_deep', 'element_id': 'page_bottom', 'element_tag': 'DOCUMENT', 'ts': 9000},
+                {'type': 'bogus', 'element_id': '<script>x</script>', 'ts': 9500},
+            ],
+            'summary': {'time_on_page': 42, 'metadata': {'lang': 'uk'}},
+        }
+        # visit update and bulk insert (plus savepoint bookkeeping); nothing is read
+        with self.assertNumQueries(4):
+            response = self.post(payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['accepted'], 3)
+
+        interactions = list(LandingPageInteraction.objects.filter(visit=self.visit).order_by('timestamp'))
+        self.assertEqual([i.interaction_type for i in interactions], ['click', 'scroll_deep', 'click'])
+        self.assertNotIn('<script>', interactions[2].element_id)
+        # Client ages are preserved relative to sent_at
+        gap = (interactions[1].timestamp - interactions[0].timestamp).total_seconds()
+        self.assertAlmostEqual(gap, 5, places=2)
+
+        self.visit.refresh_from_db()
+        self.assertEqual(self.visit.time_spent, 42)
+        self.assertEqual(self.visit.meta_data, {'lang': 'uk'})
+
+    def test_rejects_oversized_batch_and_unknown_visit(self):
+        too_many = [{'type': 'click'}] * 101
+        self.assertEqual(self.post({'visit_token': self.token(), 'interactions': too_many}).status_code, 400)
+        self.assertEqual(self.post({'visit_token': self.token(self.visit.id + 1),
+                                    'summary': {'time_on_page': 1}}).status_code, 404)
+        self.assertFalse(LandingPageInteraction.objects.exists())
+
+    def test_rejects_missing_forged_and_expired_tokens(self):
+        """Без підписаного токена маяк нічого не пише, навіть із правильним visit_id"""
+        token = self.token()
+        forged = sign_visit_token(self.visit.id + 1, self.landing_page.id, self.landing_page.slug)[:-4] + token[-4:]
+        expired = self.token(issued_at=int(timezone.now().timestamp()) - 2 * 24 * 60 * 60)
+        for payload, status in (({'visit_id': self.visit.id}, 400),
+                                ({'visit_token': forged}, 403),
+                                ({'visit_token': expired}, 403),
+                                ({'visit_token': token[:20]}, 403),
+                                ({'visit_token': '%%%'}, 403)):
+            for url in (self.url, reverse('prometei:landing_track'), reverse('prometei:landing_interaction')):
+                self.assertEqual(self.post(dict(payload, type='click', time_on_page=3), url).status_code, status)
+        self.assertFalse(LandingPageInteraction.objects.exists())
+        self.visit.refresh_from_db()
+        self.assertEqual(self.visit.time_spent, 0)
+
+        with self.assertRaises(InvalidVisitToken):
+            verify_visit_token(token, max_age=-1)
+        with override_settings(SECRET_KEY='rotated', SECRET_KEY_FALLBACKS=[settings.SECRET_KEY]):
+            self.assertEqual(verify_visit_token(token).visit_id, self.visit.id)
+        with override_settings(SECRET_KEY='rotated'):
+            self.assertRaises(InvalidVisitToken, verify_visit_token, token)
+
+    def test_page_token_is_accepted_by_every_beacon(self):
+        html = self.client.get(self.landing_page.get_absolute_url()).content.decode()
+        visit = LandingPageVisit.objects.exclude(id=self.visit.id).get()
+        token = re.search(r'visitToken: "([\w-]+)"', html).group(1)
+        self.assertEqual(verify_visit_token(token).slug, 'lp-events')
+
+        with self.assertNumQueries(1):  # one UPDATE, no SELECT
+            self.assertEqual(self.post({'visit_token': token, 'time_on_page': 7},
+                                       reverse('prometei:landing_track')).status_code, 200)
+        self.assertEqual(self.post({'visit_token': token, 'type': 'click', 'element_id': 'cta'},
+                                   reverse('prometei:landing_interaction')).status_code, 200)
+        visit.refresh_from_db()
+        self.assertEqual(visit.time_spent, 7)
+        self.assertEqual(visit.interactions.get().element_id, 'cta')
+
+    def test_form_submission_is_stored_with_interaction_and_email(self):
+        payload = {'landing_page_id': self.landing_page.id, 'visit_id': str(self.visit.id), 'form_id': 'lead',
+                   'name': 'Олена', 'contact': '+380000000000', 'message': 'Передзвоніть'}
+        response = self.post(payload, reverse('prometei:landing_submit_form'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("'Лендінг'", ContactRequest.objects.get().message)
+        self.assertEqual(self.visit.interactions.get().element_id, 'lead')
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+
+        self.assertEqual(self.post(dict(payload, name=''), reverse('prometei:landing_submit_form')).status_code, 400)
+        self.assertEqual(self.post(dict(payload, landing_page_id=10 ** 9), reverse('prometei:landing_submit_form')).status_code, 404)
+        self.assertEqual(ContactRequest.objects.count(), 1)
+
+    def test_fixed_landing_paths_are_not_shadowed_by_slug_route(self):
+        response = self.client.post(
+            reverse('prometei:landing_track'),
+            json.dumps({'visit_token': self.token(), 'time_on_page': 7}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class AdminChangelistQueryBudgetTest(TestCase):
+    """Кількість запитів у списках адмінки не повинна залежати від кількості рядків"""
+
+    QUERY_BUDGET = 12  # session, user, count(s), list_filter choices, page, ...
+
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass'))
+
+    def add_rows(self, count):
+        offset = LandingPage.objects.count()
+        for i in range(offset, offset + count):
+            page = LandingPage.objects.create(title=f'Сторінка {i}', slug=f'lp-budget-{i}',
+                                              html_content='<html><body></body></html>')
+            for _ in range(2):
+                visit = LandingPageVisit.objects.create(landing_page=page)
+                LandingPageInteraction.objects.create(visit=visit, element_id='cta')
+
+    def changelist_queries(self, url_name):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+
+    def test_changelists_stay_within_query_budget(self):
+        for url_name in ('admin:prometei_landingpage_changelist',
+                         'admin:prometei_landingpagevisit_changelist',
+                         'admin:prometei_landingpageinteraction_changelist'):
+            with self.subTest(url_name):
+                self.add_rows(3)
+                small = self.changelist_queries(url_name)
+                self.add_rows(20)
+                large = self.changelist_queries(url_name)
+                self.assertLessEqual(large, self.QUERY_BUDGET)
+                self.assertEqual(small, large)
+
+    def test_annotated_columns_are_sortable(self):
+        self.add_rows(2)
+        busy = LandingPage.objects.first()
+        LandingPageVisit.objects.create(landing_page=busy)
+        # Колонка 'Візити' (5-та у list_display) за спаданням
+        response = self.client.get(reverse('admin:prometei_landingpage_changelist') + '?o=-5')
+        self.assertEqual(response.context['cl'].result_list[0], busy)
+        self.assertEqual(response.context['cl'].result_list[0].visit_total, 3)
+
+
+class LandingPageListApiTest(TestCase):
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_superuser('api', 'api@example.com', 'pass'))
+        self.url = reverse('prometei:api_list_landing_pages')
+        for i in range(5):
+            page = LandingPage.objects.create(title=f'Сторінка {i}', slug=f'lp-api-{i}',
+                                              html_content='<html><body></body></html>')
+            for _ in range(i):
+                LandingPageVisit.objects.create(landing_page=page)
+        # Однаковий created_at у двох сторінок: курсор має розрізняти їх за id
+        LandingPage.objects.filter(slug__in=['lp-api-1', 'lp-api-2']).update(
+            created_at=LandingPage.objects.get(slug='lp-api-3').created_at
+        )
+
+    def test_cursor_pagination_walks_every_page_once(self):
+        seen, params = [], {'limit': 2}
+        while True:
+            data = self.client.get(self.url, params).json()
+            self.assertLessEqual(data['count'], 2)
+            seen.extend(data['landing_pages'])
+            if not data['has_more']:
+                break
+            params['cursor'] = data['next_cursor']
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len({p['id'] for p in seen}), 5)
+        self.assertEqual({p['slug']: p['visit_count'] for p in seen}['lp-api-4'], 4)
+
+    def test_listing_query_is_bounded_and_skips_html(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url, {'limit': 3})
+        listing = [q['sql'] for q in ctx.captured_queries if 'prometei_landingpage' in q['sql']]
+        self.assertEqual(len(listing), 2)  # ETag validator and the page
+        self.assertNotIn('html_content', listing[1])
+
+    def test_etag_short_circuit(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        LandingPageVisit.objects.create(landing_page=LandingPage.objects.first())
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertNotEqual(self.client.get(self.url, {'limit': 2}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_not_modified_skips_the_listing(self):
+        etag = self.client.get(self.url)['ETag']
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        pages = [q['sql'] for q in ctx.captured_queries if 'prometei_landingpage"' in q['sql']]
+        self.assertEqual(len(pages), 1)
+        self.assertIn('MAX(', pages[0])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'not-a-cursor'}).status_code, 400)
+
+
+class LandingPageSearchTest(TestCase):
+    def setUp(self):
+        self.body_match = LandingPage.objects.create(
+            title='Курси англійської', slug='lp-search-body',
+            html_content='<html><body><p>Підготовка до іспиту: математика</p></body></html>')
+        self.title_match = LandingPage.objects.create(
+            title='Математика для школярів', slug='lp-search-title',
+            html_content='<html><body><p>Заняття онлайн</p></body></html>')
+        self.script_only = LandingPage.objects.create(
+            title='Програмування', slug='lp-search-script',
+            html_content='<html><body><script>var математика = 1;</script></body></html>')
+
+    def test_title_matches_rank_first(self):
+        results = list(find_landing_pages('математика'))
+        self.assertEqual(results, [self.title_match, self.body_match])
+
+    def test_prefix_and_multi_term_queries(self):
+        self.assertEqual(list(find_landing_pages('матем онлайн')), [self.title_match])
+        self.assertEqual(list(find_landing_pages('"OR*')), [])
+        self.assertEqual(list(find_landing_pages('!!!')), [])
+
+    def test_index_follows_save_and_delete(self):
+        self.title_match.title = 'Фізика для школярів'
+        self.title_match.save()
+        self.assertEqual(list(find_landing_pages('фізика')), [self.title_match])
+        self.title_match.delete()
+        self.assertEqual(list(find_landing_pages('фізика')), [])
+
+    def test_search_query_skips_html(self):
+        with CaptureQueriesContext(connection) as ctx:
+            list(find_landing_pages('математика').only('id', 'title'))
+        self.assertNotIn('html_content', ctx.captured_queries[-1]['sql'])
+
+    def test_api_search_paginates_by_rank(self):
+        self.client.force_login(get_user_model().objects.create_superuser('api', 'api@example.com', 'pass'))
+        url = reverse('prometei:api_list_landing_pages')
+        first = self.client.get(url, {'search': 'математика', 'limit': 1}).json()
+        self.assertEqual(first['landing_pages'][0]['slug'], 'lp-search-title')
+        second = self.client.get(url, {'search': 'математика', 'limit': 1, 'cursor': first['next_cursor']}).json()
+        self.assertEqual([p['slug'] for p in second['landing_pages']], ['lp-search-body'])
+        self.assertFalse(second['has_more'])
+
+    def test_search_pages_through_every_match(self):
+        LandingPage.objects.bulk_create([
+            LandingPage(title=f'Математика {i}', slug=f'lp-search-{i}', html_content='<html></html>') for i in range(5)
+        ])
+        rebuild_index()
+        self.client.force_login(get_user_model().objects.create_superuser('api', 'api@example.com', 'pass'))
+        seen, params = [], {'search': 'математика', 'limit': 2}
+        while True:
+            data = self.client.get(reverse('prometei:api_list_landing_pages'), params).json()
+            seen.extend(p['slug'] for p in data['landing_pages'])
+            if not data['has_more']:
+                break
+            params['cursor'] = data['next_cursor']
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+        self.assertEqual(seen[-1], 'lp-search-body')
+
+    def test_admin_search_uses_index(self):
+        self.client.force_login(get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass'))
+        response = self.client.get(reverse('admin:prometei_landingpage_changelist'), {'q': 'математика'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.title_match, self.body_match])
+
+
+class LandingTemplateCompileTest(TestCase):
+    def setUp(self):
+        self.template = LandingPageTemplate.objects.create(
+            name='Шаблон', html_template='<h1>{{heading}}</h1><p>{{ heading }} {{heading}}, {{назва}}</p>',
+            available_variables={'heading': 'Заголовок', 'назва': 'Назва', 'footer': 'Підвал'},
+        )
+
+    def test_render_substitutes_in_one_pass(self):
+        compiled = compile_template(self.template.html_template)
+        self.assertEqual(compiled.segments[1::2], ('heading', 'heading', 'heading', 'назва'))
+        self.assertEqual(compiled.render({'heading': '{{назва}}', 'назва': 'X'}),
+                         '<h1>{{назва}}</h1><p>{{назва}} {{назва}}, X</p>')
+
+    def test_missing_and_unknown_variables_are_reported(self):
+        compiled = get_compiled_template(self.template)
+        self.assertEqual(compiled.check({'heading': 'a', 'footer': 'b', 'extra': 'c'}),
+                         {'missing': ['назва'], 'unknown': ['extra']})
+        with self.assertRaises(TemplateVariableError) as error:
+            self.template.create_landing_page(title='T', variables={'heading': 'a'}, strict=True)
+        self.assertEqual(error.exception.missing, ['назва'])
+        self.assertFalse(LandingPage.objects.exists())
+
+        page, _ = self.template.create_landing_page(title='T', variables={'heading': 'a'})
+        self.assertEqual(page.html_content, '<h1>a</h1><p>a a, {{назва}}</p>')
+
+    def test_literal_braces_survive_rendering(self):
+        html = ('<div id="app">{{message}} {{ user.name }}</div>'
+                '<script type="text/x-handlebars">{{#each items}}{{this}}{{/each}}</script>'
+                '<script>var cfg = {"a": {"b": 1}};</script><h1>{{heading}}</h1>')
+        rendered = compile_template(html).render({'heading': 'Вебінар'})
+        self.assertEqual(rendered, html.replace('{{heading}}', 'Вебінар'))
+
+    def test_any_placeholder_text_is_a_variable(self):
+        compiled = compile_template('<h1>{{ first name }}</h1><p>{{hero-title}} {{ }} {{#each items}}</p>')
+        self.assertEqual(compiled.variables, {'first name', 'hero-title', '#each items'})
+        self.assertEqual(compiled.render({'first name': 'Оля', 'hero-title': 'Курс'}),
+                         '<h1>Оля</h1><p>Курс {{ }} {{#each items}}</p>')
+        with self.assertRaises(TemplateVariableError) as error:
+            compiled.render({'hero-title': 'Курс'}, strict=True)
+        self.assertEqual(error.exception.missing, ['#each items', 'first name'])
+
+    def test_compiled_template_follows_updates(self):
+        get_compiled_template(self.template)
+        self.template.html_template = '<p>{{footer}}</p>'
+        self.template.save()
+        page, _ = self.template.create_landing_page(title='T', variables={'footer': 'Підвал'})
+        self.assertEqual(page.html_content, '<p>Підвал</p>')
+
+    def test_api_reports_missing_variables(self):
+        self.client.force_login(get_user_model().objects.create_superuser('api', 'api@example.com', 'pass'))
+        url = reverse('prometei:api_create_landing_page_from_template')
+        response = self.client.post(url, json.dumps({'template_id': self.template.id, 'title': 'T', 'strict': True,
+                                                     'variables': {'heading': 'a'}}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['missing_variables'], ['назва'])
+        response = self.client.post(url, json.dumps({'template_id': self.template.id, 'title': 'T',
+                                                     'variables': {'heading': 'a'}}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['missing_variables'], ['назва'])
+        response = self.client.post(url, json.dumps({'template_id': self.template.id, 'title': 'T',
+                                                     'variables': {'heading': 'a', 'назва': 'b', 'x': 1}}),
+                                    content_type='application/json')
+        self.assertEqual(response.json()['unknown_variables'], ['x'])
+
+
+class BulkLandingPageCreateTest(TestCase):
+    def setUp(self):
+        self.template = LandingPageTemplate.objects.create(
+            name='Кампанія', html_template='<html><body><h1>{{heading}}</h1></body></html>',
+            css_content='h1{color:red}', available_variables={'heading': 'Заголовок'},
+        )
+
+    def test_generator_creates_indexed_pages_in_order(self):
+        created = create_landing_pages_from_template(self.template, [
+            {'title': f'Сторінка {i}', 'variables': {'heading': f'Вебінар {i}'}, 'facebook_pixel_id': '123'}
+            for i in range(5)
+        ])
+        self.assertEqual([page.title for page, _ in created], [f'Сторінка {i}' for i in range(5)])
+        self.assertEqual(len({page.slug for page, _ in created}), 5)
+        self.assertEqual(created[2][1], reverse('prometei:landing_page', kwargs={'slug': created[2][0].slug}))
+        page = LandingPage.objects.get(id=created[3][0].id)
+        self.assertEqual((page.html_content, page.css_content, page.facebook_pixel_id),
+                         ('<html><body><h1>Вебінар 3</h1></body></html>', 'h1{color:red}', '123'))
+        self.assertEqual(set(find_landing_pages('вебінар')), set(LandingPage.objects.all()))
+
+    def test_api_is_all_or_nothing(self):
+        self.client.force_login(get_user_model().objects.create_superuser('api', 'api@example.com', 'pass'))
+        url = reverse('prometei:api_create_landing_pages_from_template')
+        pages = [{'title': 'A', 'variables': {'heading': 'a'}}, {'title': 'B', 'variables': {}}]
+        response = self.client.post(url, json.dumps({'template_id': self.template.id, 'pages': pages, 'strict': True}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((response.json()['row'], response.json()['missing_variables']), (1, ['heading']))
+        self.assertFalse(LandingPage.objects.exists())
+
+        pages[1]['variables'] = {'heading': 'b'}
+        response = self.client.post(url, json.dumps({'template_id': self.template.id, 'pages': pages}),
+                                    content_type='application/json')
+        data = response.json()
+        self.assertEqual(data['count'], 2)
+        self.assertEqual([p['title'] for p in data['landing_pages']], ['A', 'B'])
+        self.assertEqual(LandingPage.objects.count(), 2)
+
+
+    def test_is_active_must_be_bool_like(self):
+        created = create_landing_pages_from_template(self.template, [
+            {'title': 'A', 'variables': {'heading': 'a'}, 'is_active': 'false'},
+            {'title': 'B', 'variables': {'heading': 'b'}, 'is_active': 1},
+        ])
+        self.assertEqual([page.is_active for page, _ in created], [False, True])
+
+        self.client.force_login(get_user_model().objects.create_superuser('api', 'api@example.com', 'pass'))
+        pages = [{'title': 'C', 'variables': {'heading': 'c'}, 'is_active': 'no'}]
+        response = self.client.post(reverse('prometei:api_create_landing_pages_from_template'),
+                                    json.dumps({'template_id': self.template.id, 'pages': pages}),
+                                    content_type='application/json')
+        self.assertEqual((response.status_code, response.json()['row']), (400, 0))
+        self.assertEqual(LandingPage.objects.count(), 2)
+
+    def test_slugs_taken_in_the_database_are_regenerated(self):
+        LandingPage.objects.create(title='Стара', slug=f"lp-{'a' * 12}", html_content='<html></html>')
+        hexes = iter(['a' * 32, 'a' * 32, 'b' * 32, 'c' * 32])
+        with mock.patch('prometei.landing_page_generator.uuid.uuid4', side_effect=lambda: uuid.UUID(next(hexes))):
+            created = create_landing_pages_from_template(self.template, [
+                {'title': 'A', 'variables': {'heading': 'a'}}, {'title': 'B', 'variables': {'heading': 'b'}},
+            ])
+        self.assertEqual(sorted(page.slug for page, _ in created), [f"lp-{'b' * 12}", f"lp-{'c' * 12}"])
+
+
+class LandingStatsRollupTest(TestCase):
+    def setUp(self):
+        self.page = LandingPage.objects.create(title='Stats', slug='lp-stats',
+                                               html_content='<html><body></body></html>')
+        self.day = timezone.localdate() - timedelta(days=2)
+        self.noon = timezone.make_aware(datetime.combine(self.day, time(12)))
+        for i, seconds in enumerate([10, 20, 30, 40, 100]):
+            visit = LandingPageVisit.objects.create(landing_page=self.page, visit_time=self.noon,
+                                                    ip_address=f'10.0.0.{i % 3}', time_spent=seconds)
+            LandingPageInteraction.objects.create(visit=visit, interaction_type='click', timestamp=self.noon)
+        LandingPageInteraction.objects.create(visit=visit, interaction_type='submit', timestamp=self.noon)
+
+    def test_rollup_aggregates_a_day(self):
+        rollup_landing_stats()
+        stats = LandingPageDailyStats.objects.get(landing_page=self.page, date=self.day)
+        self.assertEqual((stats.visits, stats.unique_ips, stats.submits), (5, 3, 1))
+        self.assertEqual((stats.time_spent_avg, stats.time_spent_p50, stats.time_spent_p90), (40, 30, 100))
+        self.assertEqual(stats.interactions, {'click': 5, 'submit': 1})
+
+    def test_incremental_run_only_touches_new_days(self):
+        rollup_landing_stats()
+        self.assertEqual(rollup_landing_stats(), {'days': 0, 'rows': 0})
+
+        visit = LandingPageVisit.objects.create(landing_page=self.page, time_spent=5)
+        LandingPageInteraction.objects.create(visit=visit, interaction_type='submit')
+        self.assertEqual(rollup_landing_stats(), {'days': 1, 'rows': 1})
+        today = LandingPageDailyStats.objects.get(landing_page=self.page, date=timezone.localdate(visit.visit_time))
+        self.assertEqual((today.visits, today.submits), (1, 1))
+
+    def test_visit_totals_combine_rollup_and_recent_visits(self):
+        def total():
+            return annotate_visit_totals(LandingPage.objects.filter(id=self.page.id)).get().visit_total
+
+        self.assertEqual(total(), 5)
+        rollup_landing_stats()
+        LandingPageVisit.objects.create(landing_page=self.page)
+        self.assertEqual(total(), 6)
+        with CaptureQueriesContext(connection) as ctx:
+            total()
+        # Сирі візити рахуються лише після watermark
+        self.assertIn('"visit_time" >=', ctx.captured_queries[-1]['sql'])
+
+    def test_stats_api(self):
+        rollup_landing_stats()
+        self.client.force_login(get_user_model().objects.create_superuser('api', 'api@example.com', 'pass'))
+        url = reverse('prometei:api_landing_page_stats', args=[self.page.id])
+        data = self.client.get(url).json()
+        self.assertEqual([day['date'] for day in data['days']], [self.day.isoformat()])
+        self.assertEqual(data['totals']['visits'], 5)
+        self.assertEqual(data['totals']['interactions'], {'click': 5, 'submit': 1})
+        self.assertEqual(self.client.get(url, {'from': 'yesterday'}).status_code, 400)
+
+
+class VisitArchiveTest(TestCase):
+    def setUp(self):
+        self.archive_dir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.page = LandingPage.objects.create(title='Archive', slug='lp-archive',
+                                               html_content='<html><body></body></html>')
+        self.old_day = timezone.localdate() - timedelta(days=200)
+        old_time = timezone.make_aware(datetime.combine(self.old_day, time(9)))
+        for i in range(3):
+            visit = LandingPageVisit.objects.create(landing_page=self.page, visit_time=old_time, time_spent=10 * i,
+                                                    ip_address='10.0.0.1', path_data={'scroll': [i]},
+                                                    path_samples=encode_path_samples([], [{'y': i, 'ts': 1}]))
+            LandingPageInteraction.objects.create(visit=visit, interaction_type='submit', timestamp=old_time)
+        self.recent = LandingPageVisit.objects.create(landing_page=self.page)
+
+    def test_archive_requires_rollup(self):
+        with self.assertRaises(ArchiveNotReady):
+            archive_cutoff(180)
+
+    def test_archive_moves_old_rows_and_keeps_stats_answerable(self):
+        rollup_landing_stats()
+        totals = archive_visits(archive_cutoff(180), archive_dir=self.archive_dir, delete_batch=2)
+        self.assertEqual(totals, {'archived': 3, 'deleted': 3, 'files': 1})
+        self.assertEqual(list(LandingPageVisit.objects.all()), [self.recent])
+        self.assertFalse(LandingPageInteraction.objects.exists())
+        self.assertEqual(len(list(self.archive_dir.glob('month=*/page=*/part-*.jsonl.gz'))), 1)
+
+        records = list(iter_archived_visits(self.page.id, archive_dir=self.archive_dir))
+        self.assertEqual([r['path_data'] for r in records], [{'scroll': [0]}, {'scroll': [1]}, {'scroll': [2]}])
+        self.assertEqual(records[0]['interactions'][0]['interaction_type'], 'submit')
+        self.assertEqual(decode_path_samples(base64.b64decode(records[2]['path_samples']))['scroll_positions'],
+                         [{'y': 2, 'ts': 1}])
+
+        archived = archived_daily_stats(self.page.id, self.old_day, self.old_day, archive_dir=self.archive_dir)
+        rolled_up = LandingPageDailyStats.objects.filter(date=self.old_day).values('date', *STATS_FIELDS).get()
+        self.assertEqual(archived, [rolled_up])
+        self.assertEqual(archive_visits(archive_cutoff(180), archive_dir=self.archive_dir)['archived'], 0)
+
+
+@override_settings(RATE_LIMIT_BACKEND='cache')
+class PathSamplesTest(TestCase):
+    def setUp(self):
+        self.mouse = [{'x': 100 + i * 3, 'y': 400 - i, 'ts': 1_700_000_000_000 + i * 50} for i in range(200)]
+        self.scroll = [{'y': i * 120, 'ts': 1_700_000_000_000 + i * 200} for i in range(200)]
+
+    def test_round_trip_is_compact(self):
+        blob = encode_path_samples(self.mouse, self.scroll)
+        self.assertEqual(decode_path_samples(blob), {'mouse_movements': self.mouse, 'scroll_positions': self.scroll})
+        self.assertLess(len(blob) * 4, len(json.dumps({'mouse_movements': self.mouse,
+                                                       'scroll_positions': self.scroll})))
+        layout = column_layout(blob)
+        self.assertEqual(layout['mouse_dt'], (24, 200, '<u4'))
+        self.assertEqual(layout['mouse_dy'][0] + 400, len(blob))
+
+    def test_invalid_samples_are_dropped(self):
+        self.assertIsNone(encode_path_samples('junk', [{'y': 'x', 'ts': 1}, None]))
+        blob = encode_path_samples([{'x': 10 ** 6, 'y': -5, 'ts': 2}, {'x': 1, 'y': 2, 'ts': 1}], None)
+        self.assertEqual(decode_path_samples(blob)['mouse_movements'],
+                         [{'x': 1, 'y': 2, 'ts': 1}, {'x': 32767, 'y': 0, 'ts': 2}])
+
+    @override_settings(LANDING_VISIT_INGEST_ASYNC=False)
+    def test_track_stores_samples_outside_metadata(self):
+        page = LandingPage.objects.create(title='Samples', slug='lp-samples', html_content='<html><body></body></html>')
+        visit = LandingPageVisit.objects.create(landing_page=page)
+        response = self.client.post(reverse('prometei:landing_track'), json.dumps({
+            'visit_token': sign_visit_token(visit.id, page.id, page.slug), 'time_spent': 5, 'mouse_movements': self.mouse[:3],
+            'metadata': {'scroll_positions': self.scroll[:2], 'screen': '1x1'},
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        visit.refresh_from_db()
+        self.assertEqual(decode_path_samples(visit.path_samples),
+                         {'mouse_movements': self.mouse[:3], 'scroll_positions': self.scroll[:2]})
+        self.assertNotIn('scroll_positions', visit.meta_data)
+
+
+class PayloadSchemaTest(SimpleTestCase):
+    def test_metadata_fields_are_coerced_and_filtered(self):
+        cleaned = METADATA_SCHEMA.clean({
+            'screen': {'w': '1920', 'h': 1080.7, 'cd': 'deep'},
+            'lang': 'uk-UA<script>', 'tz': 'Europe/Kyiv', 'cookies': 'yes',
+            'fbCookies': {'_fbp': True, '<b>': True, '_fbc': 'x'},
+            'browser': 'Mozilla/5.0 <script>x</script>',
+            'custom': ['a&b', 1],
+        })
+        self.assertEqual(cleaned, {
+            'screen': {'w': 1920, 'h': 1080},
+            'lang': 'uk-UAscript', 'tz': 'Europe/Kyiv',
+            'fbCookies': {'_fbp': True, 'b': True},
+            'browser': 'Mozilla/5.0 &lt;script&gt;x&lt;/script&gt;',
+            'custom': ['a&amp;b', '1'],
+        })
+
+    def test_clean_text_matches_bleach(self):
+        import bleach
+        for text in ('plain text', 'a>b & c', '<script>x</script>', 'line\r\nbreak', 'ctl\x00', 'лапки "так"'):
+            self.assertEqual(clean_text(text, 100), bleach.clean(text))
+        self.assertEqual(clean_element({'id': 1}, 'BUTTON<'), ('', 'BUTTON'))
+
+
+class UserAgentCacheTest(SimpleTestCase):
+    CHROME = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36'
+    IPHONE = ('Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 '
+              '(KHTML, like Gecko) Version/17.5 Mobile/15E148 Safari/604.1')
+
+    def test_lru_hits_and_evictions(self):
+        ua_cache = UserAgentCache(maxsize=1, shared=False)
+        self.assertEqual(ua_cache.get(self.CHROME), ('Chrome', 'Windows', 'Other'))
+        with mock.patch('prometei.user_agent_cache.ua_parse') as ua_parse:
+            self.assertEqual(ua_cache.get(self.CHROME), ('Chrome', 'Windows', 'Other'))
+        ua_parse.assert_not_called()
+        self.assertEqual(ua_cache.get(self.IPHONE), ('Mobile Safari', 'iOS', 'iPhone'))
+        ua_cache.get(self.CHROME)
+        stats = ua_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions'], stats['size']), (1, 3, 2, 1))
+        self.assertEqual(stats['hit_rate'], 0.25)
+
+    def test_shared_cache_backs_new_processes(self):
+        cache.clear()
+        UserAgentCache(shared=True).get(self.CHROME)
+        fresh = UserAgentCache(shared=True)
+        with mock.patch('prometei.user_agent_cache.ua_parse') as ua_parse:
+            self.assertEqual(fresh.get(self.CHROME), ('Chrome', 'Windows', 'Other'))
+        ua_parse.assert_not_called()
+        self.assertEqual(fresh.stats()['shared_hits'], 1)
+
+
+class VisitIngestQueueTest(TestCase):
+    def setUp(self):
+        self.landing_page = LandingPage.objects.create(
+            title='Лендінг', slug='lp-ingest', html_content='<html><body></body></html>'
+        )
+        self.generator = SnowflakeIdGenerator(worker_id=7)
+
+    def test_snowflake_ids_are_unique_and_ordered(self):
+        ids = [self.generator.next_id() for _ in range(5000)]
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(ids, sorted(ids))
+        self.assertLess(max(ids), 2 ** 63)
+
+    def test_generators_claim_distinct_worker_ids(self):
+        with tempfile.TemporaryDirectory() as lock_dir, \
+                mock.patch('prometei.visit_ingest.WORKER_LOCK_DIR', lock_dir):
+            first, second = SnowflakeIdGenerator(), SnowflakeIdGenerator()
+            first.next_id(), second.next_id()
+            self.assertNotEqual(first._worker_id, second._worker_id)
+            first._lock_file.close()
+            second._lock_file.close()
+
+    def test_colliding_visit_id_is_reissued(self):
+        taken = LandingPageVisit.objects.create(id=self.generator.next_id(), landing_page=self.landing_page)
+        ingest = VisitIngestQueue(autostart=False)
+        ingest.submit(LandingPageVisit(id=taken.id, landing_page=self.landing_page))
+        ingest.submit(LandingPageVisit(id=self.generator.next_id(), landing_page=self.landing_page))
+
+        self.assertEqual(ingest.flush(), 2)
+        self.assertEqual(LandingPageVisit.objects.count(), 3)
+        self.assertEqual((ingest.metrics()['reissued_ids'], ingest.metrics()['failed']), (1, 0))
+
+    def test_flush_writes_queued_visits_in_batches(self):
+        ingest = VisitIngestQueue(maxsize=10, batch_size=4, autostart=False)
+        for _ in range(6):
+            ingest.submit(LandingPageVisit(id=self.generator.next_id(), landing_page=self.landing_page))
+        self.assertEqual(LandingPageVisit.objects.count(), 0)
+
+        self.assertEqual(ingest.flush(), 6)
+        self.assertEqual(LandingPageVisit.objects.count(), 6)
+        metrics = ingest.metrics()
+        self.assertEqual((metrics['enqueued'], metrics['written'], metrics['batches']), (6, 6, 2))
+
+    def test_full_queue_falls_back_to_synchronous_write(self):
+        ingest = VisitIngestQueue(maxsize=1, autostart=False)
+        ingest.submit(LandingPageVisit(id=self.generator.next_id(), landing_page=self.landing_page))
+        ingest.submit(LandingPageVisit(id=self.generator.next_id(), landing_page=self.landing_page))
+        self.assertEqual(LandingPageVisit.objects.count(), 1)
+        self.assertEqual(ingest.metrics()['overflow_sync_writes'], 1)
+
+    def test_heartbeats_are_coalesced(self):
+        """Із кількох пакетів одного візиту записуються лише останні значення, одним UPDATE"""
+        ingest = VisitIngestQueue(autostart=False)
+        summaries = VisitSummaryBuffer(ingest, autostart=False)
+        queued = LandingPageVisit(id=self.generator.next_id(), landing_page=self.landing_page)
+        ingest.submit(queued)
+        for seconds in (5, 10, 15):
+            summaries.submit(queued.id, {'time_spent': seconds, 'meta_data': {'tick': seconds}})
+        summaries.submit(queued.id, {'time_spent': 20})
+        self.assertEqual(summaries.metrics()['coalesced'], 3)
+
+        with self.assertNumQueries(9):  # UPDATE of 0 rows, ingest flush, UPDATE, each in a savepoint
+            self.assertEqual(summaries.flush(), 1)
+        queued.refresh_from_db()
+        self.assertEqual((queued.time_spent, queued.meta_data), (20, {'tick': 15}))
+
+        summaries.submit(queued.id, {'time_spent': 25})
+        summaries.discard(queued.id)
+        self.assertEqual((summaries.flush(), summaries.metrics()['pending']), (0, 0))
+
+    def test_track_heartbeats_are_buffered(self):
+        visit = LandingPageVisit.objects.create(landing_page=self.landing_page)
+        token = sign_visit_token(visit.id, self.landing_page.id, self.landing_page.slug)
+        with override_settings(RATE_LIMIT_BACKEND='cache'), \
+                mock.patch.object(visit_ingest.summary_buffer, 'autostart', False), \
+                mock.patch.object(visit_ingest.summary_buffer, '_pending', {}):
+            for seconds in (5, 10):
+                response = self.client.post(reverse('prometei:landing_track'), json.dumps(
+                    {'visit_token': token, 'time_on_page': seconds}), content_type='application/json')
+                self.assertEqual(response.status_code, 200)
+            visit.refresh_from_db()
+            self.assertEqual(visit.time_spent, 0)
+            visit_ingest.summary_buffer.flush()
+        visit.refresh_from_db()
+        self.assertEqual(visit.time_spent, 10)
+
+    def test_interactions_are_written_after_their_visit(self):
+        ingest = VisitIngestQueue(autostart=False)
+        interactions = InteractionIngestQueue(ingest, batch_size=2, autostart=False)
+        queued = LandingPageVisit(id=self.generator.next_id(), landing_page=self.landing_page)
+        ingest.submit(queued)
+        for element_id in ('cta', 'menu', 'footer'):
+            interactions.submit(LandingPageInteraction(visit_id=queued.id, element_id=element_id))
+
+        self.assertEqual(interactions.flush(), 3)
+        self.assertEqual(ingest.metrics()['written'], 1)
+        self.assertEqual(LandingPageInteraction.objects.filter(visit=queued).count(), 3)
+        self.assertEqual(interactions.metrics()['batches'], 2)
+
+    def test_oversized_metadata_keeps_whole_entries(self):
+        metadata = {'lang': 'uk', 'blob': 'x' * 2000, 'tz': 'Europe/Kyiv'}
+        capped = cap_metadata(metadata, max_length=100)
+        self.assertEqual(capped, {'lang': 'uk', '_truncated': True})  # записи після першого зайвого теж відкидаються
+        self.assertLessEqual(len(json.dumps(capped)), 100)
+        self.assertIs(cap_metadata(capped, max_length=100), capped)
+        self.assertEqual(len(json.dumps(cap_metadata({'a': 'b' * 7}, max_length=len('{"a": "bbbbbbb"}')))), 16)
+
+
+
+class CrossWorkerIngestTest(TransactionTestCase):
+    """Візит ще в черзі іншого воркера: FK перевіряється на COMMIT, тому без обгортки TestCase"""
+
+    def setUp(self):
+        self.landing_page = LandingPage.objects.create(
+            title='Лендінг', slug='lp-cross-worker', html_content='<html><body></body></html>'
+        )
+        self.visit_id = SnowflakeIdGenerator(worker_id=8).next_id()
+
+    def test_interactions_wait_for_a_visit_of_another_worker(self):
+        interactions = InteractionIngestQueue(VisitIngestQueue(autostart=False), autostart=False)
+        interactions.submit(LandingPageInteraction(visit_id=self.visit_id, element_id='cta'))
+        self.assertEqual(interactions.flush(), 0)
+        metrics = interactions.metrics()
+        self.assertEqual((metrics['deferred'], metrics['deferred_depth'], metrics['failed']), (1, 1, 0))
+
+        LandingPageVisit.objects.create(id=self.visit_id, landing_page=self.landing_page)
+        self.assertEqual(interactions.flush(), 1)
+        self.assertEqual(interactions.metrics()['deferred_depth'], 0)
+        self.assertTrue(LandingPageInteraction.objects.filter(visit_id=self.visit_id, element_id='cta').exists())
+
+    def test_interactions_of_unknown_visits_are_dropped_after_the_retry_window(self):
+        interactions = InteractionIngestQueue(VisitIngestQueue(autostart=False), retry_window=0,
+                                              flush_interval=0, autostart=False)
+        interactions.submit(LandingPageInteraction(visit_id=self.visit_id, element_id='cta'))
+        self.assertEqual((interactions.flush(), interactions.flush()), (0, 0))
+        metrics = interactions.metrics()
+        self.assertEqual((metrics['deferred'], metrics['deferred_depth'], metrics['failed']), (1, 0, 1))
+        self.assertEqual(interactions.flush(), 0)
+        self.assertFalse(LandingPageInteraction.objects.exists())
+
+    def test_summaries_wait_for_a_visit_of_another_worker(self):
+        summaries = VisitSummaryBuffer(VisitIngestQueue(autostart=False), autostart=False)
+        summaries.submit(self.visit_id, {'time_spent': 5, 'meta_data': {'tick': 5}})
+        self.assertEqual(summaries.flush(), 0)
+        summaries.submit(self.visit_id, {'time_spent': 10})
+        self.assertEqual(summaries.metrics()['pending'], 1)
+
+        LandingPageVisit.objects.create(id=self.visit_id, landing_page=self.landing_page)
+        self.assertEqual(summaries.flush(), 1)
+        visit = LandingPageVisit.objects.get(id=self.visit_id)
+        self.assertEqual((visit.time_spent, visit.meta_data), (10, {'tick': 5}))
+        metrics = summaries.metrics()
+        self.assertEqual((metrics['deferred'], metrics['missing'], metrics['pending']), (1, 0, 0))
+
+    def test_summaries_of_unknown_visits_are_dropped_after_the_retry_window(self):
+        summaries = VisitSummaryBuffer(VisitIngestQueue(autostart=False), window=0, retry_window=0, autostart=False)
+        summaries.submit(self.visit_id, {'time_spent': 5})
+        self.assertEqual((summaries.flush(), summaries.flush()), (0, 0))
+        metrics = summaries.metrics()
+        self.assertEqual((metrics['deferred'], metrics['missing'], metrics['pending']), (1, 1, 0))
+
+@override_settings(LANDING_VISIT_INGEST_ASYNC=True, RATE_LIMIT_BACKEND='cache')
+class BeaconFastLaneTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.landing_page = LandingPage.objects.create(
+            title='Лендінг', slug='lp-fast-lane', html_content='<html><body></body></html>'
+        )
+        self.visit = LandingPageVisit.objects.create(landing_page=self.landing_page)
+        self.token = sign_visit_token(self.visit.id, self.landing_page.id, self.landing_page.slug)
+        self.passed_through = []
+
+        async def django_app(scope, receive, send):
+            self.passed_through.append(scope['path'])
+            await send({'type': 'http.response.start', 'status': 204, 'headers': []})
+            await send({'type': 'http.response.body', 'body': b''})
+
+        self.lane = BeaconFastLane(django_app)
+        self.interactions = InteractionIngestQueue(visit_ingest.visit_queue, autostart=False)
+        for patcher in (mock.patch.object(visit_ingest, 'interaction_queue', self.interactions),
+                        mock.patch.object(visit_ingest.summary_buffer, 'autostart', False),
+                        mock.patch.object(visit_ingest.summary_buffer, '_pending', {})):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def call(self, url_name, payload, method='POST', headers=()):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        headers = [(b'content-type', b'application/json'), *headers]
+        if not any(name == b'host' for name, _ in headers):
+            headers.append((b'host', b'testserver'))
+        scope = {'type': 'http', 'method': method, 'path': reverse(url_name), 'root_path': '',
+                 'headers': headers, 'client': ('203.0.113.5', 50000)}
+        messages = [{'type': 'http.request', 'body': body[:10], 'more_body': True},
+                    {'type': 'http.request', 'body': body[10:], 'more_body': False}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.lane(scope, receive, send))
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        return sent[0]['status'], json.loads(body) if body else None
+
+    def test_beacons_are_queued_without_django(self):
+        self.assertEqual(self.call('prometei:landing_track', {'visit_token': self.token, 'time_on_page': 30}),
+                         (200, {'status': 'success'}))
+        self.assertEqual(self.call('prometei:landing_interaction', {
+            'visit_token': self.token, 'type': 'bogus', 'element_id': '<script>x</script>', 'element_tag': 'BUTTON'}),
+            (200, {'status': 'success'}))
+        self.assertEqual(self.call('prometei:landing_events', {
+            'visit_token': self.token, 'sent_at': 10000,
+            'interactions': [{'type': 'scroll_deep', 'ts': 4000}, {'type': 'click', 'ts': 9000}],
+            'summary': {'time_on_page': 42, 'metadata': {'lang': 'uk'}},
+        }), (200, {'status': 'success', 'accepted': 2}))
+        self.assertEqual(self.passed_through, [])
+        self.assertFalse(LandingPageInteraction.objects.exists())
+
+        self.assertEqual(self.interactions.flush(), 3)
+        visit_ingest.summary_buffer.flush()
+        self.visit.refresh_from_db()
+        self.assertEqual((self.visit.time_spent, self.visit.meta_data), (42, {'lang': 'uk'}))
+        first = LandingPageInteraction.objects.filter(visit=self.visit).earliest('timestamp')
+        self.assertEqual((first.interaction_type, first.element_type), ('scroll_deep', ''))
+        self.assertFalse(LandingPageInteraction.objects.filter(element_id__contains='<script>').exists())
+
+    def test_rejected_beacons_match_the_views(self):
+        forged = self.token[:-2] + ('AA' if not self.token.endswith('AA') else 'BB')
+        cases = [
+            ('prometei:landing_track', b'{not json', 400),
+            ('prometei:landing_track', [1, 2], 400),
+            ('prometei:landing_track', {'time_on_page': 1}, 400),
+            ('prometei:landing_track', {'visit_token': forged, 'time_on_page': 1}, 403),
+            ('prometei:landing_interaction', {'visit_token': self.token}, 400),
+            ('prometei:landing_events', {'visit_token': self.token, 'interactions': [{}] * 101}, 400),
+        ]
+        for url_name, payload, status in cases:
+            self.assertEqual(self.call(url_name, payload)[0], status, payload)
+
+        with mock.patch('prometei.views.RATE_LIMIT_TRACK_LP', '1/minute'):
+            self.assertEqual(self.call('prometei:landing_track', {'visit_token': self.token})[0], 200)
+            self.assertEqual(self.call('prometei:landing_track', {'visit_token': self.token}),
+                             (429, {'status': 'error', 'message': 'Rate limit exceeded.'}))
+        self.assertEqual(self.passed_through, [])
+
+    def test_spoofed_forwarded_for_does_not_reset_the_limit(self):
+        with mock.patch('prometei.views.RATE_LIMIT_TRACK_LP', '1/minute'):
+            statuses = [
+                self.call('prometei:landing_track', {'visit_token': self.token},
+                          headers=[(b'x-forwarded-for', f'198.51.100.{i}, 192.0.2.7'.encode())])[0]
+                for i in range(3)
+            ]
+        self.assertEqual(statuses, [200, 429, 429])
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='198.51.100.1, 192.0.2.7', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(views.get_client_ip(request), '192.0.2.7')
+
+    def test_disallowed_host_goes_to_django(self):
+        self.assertEqual(self.call('prometei:landing_track', {'visit_token': self.token},
+                                   headers=[(b'host', b'evil.example')])[0], 204)
+        self.assertEqual(len(self.passed_through), 1)
+
+    def test_other_requests_go_to_django(self):
+        self.assertEqual(self.call('prometei:landing_submit_form', {})[0], 204)
+        self.assertEqual(self.call('prometei:landing_track', b'', method='GET')[0], 204)
+        with override_settings(LANDING_BEACON_FAST_LANE=False):
+            self.assertEqual(self.call('prometei:landing_track', {'visit_token': self.token})[0], 204)
+        with override_settings(LANDING_VISIT_INGEST_ASYNC=False):
+            self.assertEqual(self.call('prometei:landing_interaction', {'visit_token': self.token})[0], 204)
+        self.assertEqual(len(self.passed_through), 4)
+
+
+@override_settings(EMAIL_OUTBOX_INLINE_WORKER=False)
+class EmailOutboxTest(TestCase):
+    def setUp(self):
+        self.contact_request = ContactRequest.objects.create(
+            name='Олена', contact_method='olena@example.com', message='Привіт', request_type='contact'
+        )
+
+    def test_service_queues_instead_of_sending(self):
+        self.assertTrue(EmailService.send_contact_email(self.contact_request))
+        self.assertTrue(EmailService.send_confirmation_to_user(self.contact_request))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.STATUS_PENDING).count(), 2)
+
+        self.assertEqual(email_outbox.process_outbox(), {'sent': 2, 'retried': 0, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 2)
+        notification = next(m for m in mail.outbox if m.reply_to)
+        self.assertEqual(notification.reply_to, ['olena@example.com'])
+        self.assertEqual(notification.alternatives[0][1], 'text/html')
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.STATUS_SENT).exists())
+
+    def test_failed_send_is_retried_with_backoff(self):
+        EmailService.send_confirmation_to_user(self.contact_request)
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('down')):
+            self.assertEqual(email_outbox.process_outbox(), {'sent': 0, 'retried': 1, 'failed': 0})
+        email = OutboundEmail.objects.get()
+        self.assertEqual((email.status, email.attempts, email.last_error), ('pending', 1, 'down'))
+        self.assertGreater(email.next_attempt_at, email.created_at)
+
+        # Not due yet
+        self.assertEqual(email_outbox.process_outbox()['sent'], 0)
+        OutboundEmail.objects.update(next_attempt_at=email.created_at)
+        self.assertEqual(email_outbox.process_outbox()['sent'], 1)
+
+    def test_claimed_rows_are_not_sent_twice(self):
+        EmailService.send_confirmation_to_user(self.contact_request)
+        first = email_outbox.claim_batch()
+        self.assertEqual(len(first), 1)
+        self.assertEqual(email_outbox.claim_batch(), [])
+
+
+class _RespStandInHandler(socketserver.StreamRequestHandler):
+    """Just enough of the Redis protocol for the rate limiter: INCR, EXPIRE, GET."""
+
+    def handle(self):
+        store = self.server.store
+        self.server.connections.append(self.connection)
+        while True:
+            header = self.rfile.readline()
+            if not header:
+                return
+            args = []
+            for _ in range(int(header[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2].decode())
+            command = args[0].upper()
+            with self.server.lock:
+                if command == 'INCR':
+                    store[args[1]] = store.get(args[1], 0) + 1
+                    reply = b':%d\r\n' % store[args[1]]
+                elif command == 'EXPIRE':
+                    reply = b':1\r\n'
+                elif command == 'GET' and args[1] in store:
+                    value = str(store[args[1]]).encode()
+                    reply = b'$%d\r\n%s\r\n' % (len(value), value)
+                elif command == 'GET':
+                    reply = b'$-1\r\n'
+                else:
+                    reply = b'-ERR unknown command\r\n'
+                if self.server.hang_up_after_incr and command == 'INCR':
+                    return
+            self.wfile.write(reply)
+
+
+class RateLimiterTest(SimpleTestCase):
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('5/minute'), (5, 60))
+        with self.assertRaises(ValueError):
+            parse_rate('5/fortnight')
+
+    def test_sliding_window_weights_previous_window(self):
+        limiter = RateLimiter(SQLiteRateLimitBackend(':memory:'))
+        for i in range(10):
+            self.assertTrue(limiter.hit('ip', 10, 60, now=60 + i)[0])
+        self.assertFalse(limiter.hit('ip', 10, 60, now=75)[0])
+        # 5 s into the next window 55/60 of the previous window still counts
+        allowed, estimate = limiter.hit('ip', 10, 60, now=125)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(estimate, 11 * 55 / 60 + 1)
+        self.assertTrue(limiter.hit('ip', 10, 60, now=175)[0])
+
+    def test_async_hit_keeps_counts_atomic(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            limiter = RateLimiter(SQLiteRateLimitBackend(Path(tmp) / 'rl.sqlite3'))
+
+            async def burst():
+                return await asyncio.gather(*(limiter.ahit('ip', 5, 60, now=60) for _ in range(8)))
+
+            results = asyncio.run(burst())
+        self.assertEqual(sorted(allowed for allowed, _count in results), [False] * 3 + [True] * 5)
+
+    def test_sqlite_backend_is_shared_and_atomic(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'rl.sqlite3'
+            backends = [SQLiteRateLimitBackend(path) for _ in range(4)]
+            results = []
+
+            def worker(backend):
+                for _ in range(50):
+                    results.append(backend.hit('shared', 1, 60)[0])
+
+            threads = [threading.Thread(target=worker, args=(b,)) for b in backends]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual(sorted(results), list(range(1, 201)))
+
+    def resp_stand_in(self):
+        server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _RespStandInHandler)
+        server.daemon_threads = True
+        server.store, server.lock, server.connections = {'rl:ip:0': 7}, threading.Lock(), []
+        server.hang_up_after_incr = False
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server, RedisRateLimitBackend(f'redis://127.0.0.1:{server.server_address[1]}/0')
+
+    def test_redis_backend_against_stand_in(self):
+        server, backend = self.resp_stand_in()
+        self.assertEqual(backend.hit('ip', 1, 60), (1, 7))
+        self.assertEqual(backend.hit('ip', 1, 60), (2, 7))
+
+    def test_redis_backend_replaces_a_dropped_idle_connection(self):
+        server, backend = self.resp_stand_in()
+        self.assertEqual(backend.hit('ip', 1, 60), (1, 7))
+        server.connections[0].shutdown(socket.SHUT_RDWR)
+        time_module.sleep(0.05)
+        self.assertEqual(backend.hit('ip', 1, 60), (2, 7))
+        self.assertEqual(len(server.connections), 2)
+
+    def test_redis_backend_does_not_resend_a_sent_pipeline(self):
+        server, backend = self.resp_stand_in()
+        server.hang_up_after_incr = True
+        with self.assertRaises(ConnectionError):
+            backend.hit('ip', 1, 60)
+        self.assertEqual((server.store['rl:ip:1'], len(server.connections)), (1, 1))
+        self.assertIsNone(backend._local.sock)
+
+
+class SQLiteTuningTest(SimpleTestCase):
+    databases = {'default'}  # db_writer opens its own transactions
+
+    def test_new_file_connections_are_tuned(self):
+        from django.db.backends.sqlite3.base import DatabaseWrapper
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseWrapper({**connection.settings_dict, 'NAME': str(Path(tmp) / 'tuned.sqlite3')}, 'tuned')
+            try:
+                with db.cursor() as cursor:
+                    pragmas = {}
+                    for name in ('journal_mode', 'synchronous', 'busy_timeout', 'temp_store'):
+                        cursor.execute(f'PRAGMA {name}')
+                        pragmas[name] = cursor.fetchone()[0]
+            finally:
+                db.close()
+        self.assertEqual(pragmas, {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000, 'temp_store': 2})
+
+    def test_immediate_atomic_takes_the_write_lock_up_front(self):
+        import sqlite3
+        from django.db.backends.sqlite3.base import DatabaseWrapper
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / 'immediate.sqlite3')
+            db = DatabaseWrapper({**connection.settings_dict, 'NAME': path}, 'immediate')
+            other = sqlite3.connect(path, timeout=0)
+            try:
+                with mock.patch('prometei.sqlite_tuning.connections', {'immediate': db}), \
+                        mock.patch('django.db.transaction.connections', {'immediate': db}):
+                    with immediate_atomic('immediate'):
+                        with self.assertRaisesRegex(sqlite3.OperationalError, 'locked'):
+                            other.execute('BEGIN IMMEDIATE')
+                self.assertIsNone(db.transaction_mode)
+                other.execute('BEGIN IMMEDIATE')
+                other.rollback()
+            finally:
+                other.close()
+                db.close()
+
+    def test_writer_sleeps_without_the_lock(self):
+        from django.db import OperationalError
+        writer = SerializedWriter(retries=1, retry_delay=0)
+        outcomes = [OperationalError('database is locked'), 'stored']
+        free_while_sleeping = []
+
+        def write():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        def try_lock():
+            if writer.lock.acquire(blocking=False):
+                writer.lock.release()
+                free_while_sleeping.append(True)
+
+        def sleep(_delay):
+            thread = threading.Thread(target=try_lock)
+            thread.start()
+            thread.join()
+
+        with mock.patch('prometei.sqlite_tuning.time.sleep', sleep):
+            self.assertEqual(writer.run(write), 'stored')
+        self.assertEqual(free_while_sleeping, [True])
+
+    def test_writer_retries_lock_errors_only(self):
+        from django.db import OperationalError
+        writer = SerializedWriter(retries=2, retry_delay=0)
+        outcomes = [OperationalError('database is locked'), OperationalError('database is locked'), 'stored']
+
+        def write():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        self.assertEqual(writer.run(write), 'stored')
+        outcomes[:] = [OperationalError('database is locked')] * 3
+        with self.assertRaises(OperationalError):
+            writer.run(write)
+        outcomes[:] = [OperationalError('no such table: x'), 'stored']
+        with self.assertRaises(OperationalError):
+            writer.run(write)
+        self.assertEqual(writer.metrics(), {'writes': 1, 'retries': 4, 'lock_errors': 1})
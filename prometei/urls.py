@@ -15,6 +15,7 @@ from .views import (
     LandingPageView,
     landing_track_view,
     landing_interaction_view,
+    landing_events_view,
     landing_submit_form_view,
     landing_generate_link_view,
     # New API endpoints for automated landing page creation
@@ -23,7 +24,10 @@ from .views import (
     api_generate_new_link,
     api_change_landing_page_status,
     api_list_landing_pages,
+    api_landing_ingest_stats,
+    api_landing_page_stats,
     api_create_landing_page_from_template,
+    api_create_landing_pages_from_template,
     api_list_landing_page_templates,
     # New PROmin landing page view
     ProminLandingPageView,
@@ -69,18 +73,23 @@ urlpatterns = [
     path('terms_of_use/', TermsOfUseView.as_view(), name='terms_of_use'),
     
     # Landing Pages
-    path('landing/<slug:slug>/', LandingPageView.as_view(), name='landing_page'),
     path('landing/track/', landing_track_view, name='landing_track'),
     path('landing/interaction/', landing_interaction_view, name='landing_interaction'),
+    path('landing/events/', landing_events_view, name='landing_events'),
     path('landing/submit-form/', landing_submit_form_view, name='landing_submit_form'),
     path('landing/generate-link/<int:landing_id>/', landing_generate_link_view, name='landing_generate_link'),
+    # Slug route last so it does not swallow the fixed paths above
+    path('landing/<slug:slug>/', LandingPageView.as_view(), name='landing_page'),
     
     # API endpoints for automated landing page creation
     path('api/landing-pages/', api_list_landing_pages, name='api_list_landing_pages'),
+    path('api/landing-pages/ingest-stats/', api_landing_ingest_stats, name='api_landing_ingest_stats'),
     path('api/landing-pages/create/', api_create_landing_page, name='api_create_landing_page'),
     path('api/landing-pages/<int:landing_page_id>/update/', api_update_landing_page, name='api_update_landing_page'),
     path('api/landing-pages/<int:landing_page_id>/generate-link/', api_generate_new_link, name='api_generate_new_link'),
     path('api/landing-pages/<int:landing_page_id>/status/', api_change_landing_page_status, name='api_change_landing_page_status'),
+    path('api/landing-pages/<int:landing_page_id>/stats/', api_landing_page_stats, name='api_landing_page_stats'),
     path('api/landing-page-templates/', api_list_landing_page_templates, name='api_list_landing_page_templates'),
     path('api/landing-page-templates/create-page/', api_create_landing_page_from_template, name='api_create_landing_page_from_template'),
+    path('api/landing-page-templates/create-pages/', api_create_landing_pages_from_template, name='api_create_landing_pages_from_template'),
 ] 
\ No newline at end of file
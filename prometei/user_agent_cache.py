@@ -0,0 +1,123 @@
+"""
+User-Agent Parsing Cache
+
+``user_agents.parse`` runs the ua-parser regex cascade, one of the most
+expensive steps of a landing page view, while real traffic only has a few
+hundred distinct User-Agent strings. ``parse_user_agent()`` memoizes the
+(browser, os, device) families in a bounded per-process LRU keyed by a hash of
+the string. With LANDING_UA_SHARED_CACHE enabled, misses are looked up in the
+Django cache first, so a freshly forked worker does not re-parse what the
+others already have.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from user_agents import parse as ua_parse
+
+UA_CACHE_SIZE = getattr(settings, 'LANDING_UA_CACHE_SIZE', 4096)
+UA_SHARED_CACHE = getattr(settings, 'LANDING_UA_SHARED_CACHE', False)
+UA_SHARED_CACHE_TIMEOUT = getattr(settings, 'LANDING_UA_SHARED_CACHE_TIMEOUT', 24 * 60 * 60)
+UA_FAMILY_MAX_LENGTH = 100  # довжина полів у meta_data візиту
+
+
+def parse_families(user_agent):
+    """Uncached (browser, os, device) families of a User-Agent string."""
+    parsed = ua_parse(user_agent)
+    return (
+        parsed.browser.family[:UA_FAMILY_MAX_LENGTH],
+        parsed.os.family[:UA_FAMILY_MAX_LENGTH],
+        parsed.device.family[:UA_FAMILY_MAX_LENGTH],
+    )
+
+
+class UserAgentCache:
+    """
+    Bounded LRU of parsed User-Agent families.
+
+    Keys are 16-byte blake2b digests, so long or hostile User-Agent strings
+    do not pin memory.
+    """
+
+    def __init__(self, maxsize=UA_CACHE_SIZE, shared=UA_SHARED_CACHE, shared_timeout=UA_SHARED_CACHE_TIMEOUT):
+        self.maxsize = maxsize
+        self.shared = shared
+        self.shared_timeout = shared_timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'shared_hits': 0, 'misses': 0, 'evictions': 0}
+
+    @staticmethod
+    def key(user_agent):
+        return hashlib.blake2b(user_agent.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+    def get(self, user_agent):
+        """
+        (browser, os, device) families of ``user_agent``.
+
+        Returns:
+            tuple: Family names, each cut to UA_FAMILY_MAX_LENGTH characters
+        """
+        key = self.key(user_agent or '')
+        with self._lock:
+            families = self._entries.get(key)
+            if families is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return families
+
+        # Парсинг поза блокуванням: інші потоки не чекають на regex
+        families = self._shared_get(key)
+        counter = 'shared_hits'
+        if families is None:
+            families = parse_families(user_agent or '')
+            counter = 'misses'
+            self._shared_set(key, families)
+        self._store(key, families, counter)
+        return families
+
+    def _store(self, key, families, counter):
+        with self._lock:
+            self._stats[counter] += 1
+            self._entries[key] = families
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _shared_get(self, key):
+        if not self.shared:
+            return None
+        families = cache.get(f'ua:{key.hex()}')
+        return tuple(families) if families else None
+
+    def _shared_set(self, key, families):
+        if self.shared:
+            cache.set(f'ua:{key.hex()}', families, timeout=self.shared_timeout)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for name in self._stats:
+                self._stats[name] = 0
+
+    def stats(self):
+        """Snapshot of the hit/miss counters, current size and hit rate."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        stats['maxsize'] = self.maxsize
+        lookups = stats['hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['shared_hits']) / lookups if lookups else 0.0
+        return stats
+
+
+user_agent_cache = UserAgentCache()
+
+
+def parse_user_agent(user_agent):
+    """(browser, os, device) families of a User-Agent string, via the process-wide cache."""
+    return user_agent_cache.get(user_agent)
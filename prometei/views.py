@@ -1,22 +1,31 @@
+import base64
+import hashlib
+import itertools
 import json
 import logging
+import os
 import uuid # Added from flawless, though not directly used in the final version of views below
+from asgiref.sync import sync_to_async
 from datetime import timedelta # Added from flawless
 # from datetime import datetime # datetime from datetime was in flawless, but timezone.now is used
 
 from django.conf import settings
 from django.core.cache import cache
 from django.core.mail import send_mail
-from django.db import transaction
-from django.http import JsonResponse, HttpResponse, Http404, HttpResponseBadRequest, HttpResponseForbidden
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import JsonResponse, HttpResponse, Http404, HttpResponseBadRequest, HttpResponseForbidden, HttpResponseNotModified
 from django.shortcuts import render, get_object_or_404, redirect # Added redirect
 from django.template.loader import render_to_string, TemplateDoesNotExist
 from django.urls import reverse as django_reverse, reverse_lazy # Added reverse_lazy
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.dateparse import parse_date, parse_datetime
 from django.utils.crypto import get_random_string
 from django.utils.decorators import method_decorator
 from django.utils.html import strip_tags, escape
 from django.utils.translation import gettext as _ # Add missing translation function
+from django.utils.translation import get_language
 from django.views import View
 from django.views.generic import TemplateView, FormView # Added for existing views
 from django.views.decorators.csrf import csrf_protect, ensure_csrf_cookie, csrf_exempt
@@ -27,8 +36,6 @@ from django.views.decorators.cache import never_cache # Added for existing/new v
 from django.middleware.csrf import get_token # Added for existing LP view logic
 from django.contrib.auth.decorators import user_passes_test # Added user_passes_test
 
-import bleach # Already present
-from user_agents import parse as ua_parse # Already present
 
 from .models import (
     LandingPage,
@@ -37,16 +44,29 @@ from .models import (
     ContactRequest,
     LandingPageTemplate
 )
+from . import visit_ingest
 from .email_service import EmailService
+from .landing_cache import resolve_landing_slug, slug_cache
+from .landing_renderer import get_compiled_landing_page, negotiate_encoding
+from .landing_stats import annotate_visit_totals, get_watermark, page_stats, visit_totals_version
+from .landing_templates import TemplateVariableError, get_compiled_template
+from .path_samples import encode_path_samples
+from .payload_schema import INVALID, METADATA_SCHEMA, clean_element, clean_text
+from .rate_limit import get_rate_limiter, parse_rate
+from .sqlite_tuning import db_writer
+from .user_agent_cache import parse_user_agent, user_agent_cache
+from .visit_tokens import InvalidVisitToken, sign_visit_token, verify_visit_token
 from .forms import ContactForm, BuilderRequestForm, ProminRequestForm # Existing forms
 from payment.models import PaymentLink  # Додаємо імпорт для платіжних посилань
 from .landing_page_generator import (
+    coerce_bool,
     create_landing_page, 
     update_landing_page,
     generate_new_link,
     deactivate_landing_page,
     activate_landing_page,
-    find_landing_pages
+    find_landing_pages,
+    create_landing_pages_from_template
 )
 
 logger = logging.getLogger(__name__)
@@ -58,6 +78,14 @@ RATE_LIMIT_SUBMIT_LP = getattr(settings, 'LANDING_PAGE_RATE_LIMIT_SUBMIT', '5/mi
 RATE_LIMIT_TRACK_LP = getattr(settings, 'LANDING_PAGE_RATE_LIMIT_TRACK', '100/minute') # Renamed
 RATE_LIMIT_INTERACT_LP = getattr(settings, 'LANDING_PAGE_RATE_LIMIT_INTERACT', '200/minute') # Renamed
 RATE_LIMIT_VIEW_LP = getattr(settings, 'LANDING_PAGE_RATE_LIMIT_VIEW', '60/minute') # Renamed
+RATE_LIMIT_EVENTS_LP = getattr(settings, 'LANDING_PAGE_RATE_LIMIT_EVENTS', '60/minute')
+MAX_EVENTS_PER_BATCH = getattr(settings, 'LANDING_PAGE_MAX_EVENTS_PER_BATCH', 100)
+MAX_EVENT_AGE_SECONDS = getattr(settings, 'LANDING_PAGE_MAX_EVENT_AGE', 60 * 60)
+API_PAGE_SIZE = getattr(settings, 'LANDING_PAGE_API_PAGE_SIZE', 50)
+API_MAX_PAGE_SIZE = getattr(settings, 'LANDING_PAGE_API_MAX_PAGE_SIZE', 200)
+API_STATS_DEFAULT_DAYS = getattr(settings, 'LANDING_PAGE_API_STATS_DEFAULT_DAYS', 30)
+API_BULK_MAX_PAGES = getattr(settings, 'LANDING_PAGE_API_BULK_MAX_PAGES', 1000)
+TRUSTED_PROXY_COUNT = getattr(settings, 'TRUSTED_PROXY_COUNT', 1)  # reverse proxies in front of the app (Render: 1)
 VALID_INTERACTION_TYPES = [item[0] for item in LandingPageInteraction.INTERACTION_TYPES]
 
 
@@ -66,41 +94,248 @@ class RateLimitExceeded(Exception): # Already present in existing code, but used
     pass
 
 # --- Helper Functions (from flawless implementation, adapted) ---
-def get_client_ip(request): # Already present, ensure it's robust
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0].strip()
+def client_ip_from(forwarded_for, remote_addr):
+    """
+    Client address behind TRUSTED_PROXY_COUNT reverse proxies.
+
+    Every proxy appends the address it was connected from to X-Forwarded-For,
+    so the client is that many entries from the end. Entries before it come
+    from the client itself and are ignored, or a spoofed header would pick
+    the rate limit key.
+    """
+    hops = [hop.strip() for hop in (forwarded_for or '').split(',') if hop.strip()]
+    if TRUSTED_PROXY_COUNT <= 0 or not hops:
+        return remote_addr or ''
+    return hops[-min(TRUSTED_PROXY_COUNT, len(hops))]
+
+def get_client_ip(request):
+    return client_ip_from(request.META.get('HTTP_X_FORWARDED_FOR'), request.META.get('REMOTE_ADDR'))
+
+def get_landing_visit(visit_id, queryset=None, **lookup):
+    """Load a visit, flushing this process' ingest queue once if it has not been written yet."""
+    if queryset is None:
+        queryset = LandingPageVisit.objects.all()
+    try:
+        return queryset.get(id=visit_id, **lookup)
+    except LandingPageVisit.DoesNotExist:
+        if not visit_ingest.visit_queue.flush():
+            raise
+        return queryset.get(id=visit_id, **lookup)
+
+def read_visit_token(request, data):
+    """
+    Verify the signed visit token of a tracking payload (no database access).
+
+    Returns:
+        tuple: (VisitToken, None), or (None, JsonResponse) with the error to return
+    """
+    token = data.get('visit_token')
+    if not token:
+        return None, JsonResponse({'status': 'error', 'message': 'Missing visit_token.'}, status=400)
+    try:
+        return verify_visit_token(token), None
+    except InvalidVisitToken as e:
+        logger.warning(f"Rejected tracking beacon from IP {get_client_ip(request)}: {e}")
+        return None, JsonResponse({'status': 'error', 'message': 'Invalid or expired visit_token.'}, status=403)
+
+def write_visit_events(visit, update_fields=(), interactions=()):
+    """
+    Write a visit's summary fields and new interactions without reading the visit first.
+
+    The visit is only known from its signed token, so a missing row means it is
+    still in an ingest queue (this process' queue is flushed and the write
+    retried once) or has been deleted.
+
+    Returns:
+        bool: False if the visit does not exist
+    """
+    values = {name: getattr(visit, name) for name in update_fields}
+    for attempt in range(2):
+        try:
+            # Зовнішній ключ перевіряється при коміті транзакції db_writer
+            db_writer.run(_write_visit_events, visit.id, values, interactions)
+            return True
+        except (LandingPageVisit.DoesNotExist, IntegrityError):
+            for interaction in interactions:
+                interaction.pk = None
+            # Флеш черги поза db_writer.run: замок черги береться раніше за замок записувача
+            if attempt or not visit_ingest.visit_queue.flush():
+                return False
+
+def _write_visit_events(visit_id, values, interactions):
+    with transaction.atomic():
+        # UPDATE ... WHERE id = %s
+        if values and not LandingPageVisit.objects.filter(id=visit_id).update(**values):
+            raise LandingPageVisit.DoesNotExist
+        if interactions:
+            LandingPageInteraction.objects.bulk_create(interactions)
+
+def build_batch_interactions(visit_id, events, sent_at):
+    """
+    Unsaved interactions of a batched beacon, cleaned like single interactions.
+
+    Timestamps are rebuilt from each event's ``ts`` relative to the client's
+    ``sent_at`` (both in ms), capped at MAX_EVENT_AGE_SECONDS.
+    """
+    now = timezone.now()
+    try:
+        sent_at = float(sent_at)
+    except (TypeError, ValueError):
+        sent_at = None
+
+    interactions = []
+    for event in events:
+        if not isinstance(event, dict):
+            continue
+        interaction_type = event.get('type')
+        if interaction_type not in VALID_INTERACTION_TYPES:
+            interaction_type = 'click'
+        element_id, element_tag = clean_element(event.get('element_id'), event.get('element_tag'))
+
+        timestamp = now
+        if sent_at is not None:
+            try:
+                age = (sent_at - float(event.get('ts'))) / 1000
+                timestamp = now - timedelta(seconds=min(max(age, 0), MAX_EVENT_AGE_SECONDS))
+            except (TypeError, ValueError):
+                pass
+
+        interactions.append(LandingPageInteraction(
+            visit_id=visit_id,
+            interaction_type=interaction_type,
+            element_id=element_id,
+            element_type=element_tag,
+            timestamp=timestamp,
+        ))
+    return interactions
+
+async def acreate_visit_interaction(**fields):
+    """
+    INSERT one interaction of a visit known only from its signed token (async ORM).
+
+    Returns:
+        LandingPageInteraction: Or None if the visit does not exist
+    """
+    for attempt in range(2):
+        try:
+            return await LandingPageInteraction.objects.acreate(**fields)
+        except IntegrityError:
+            if attempt or not await sync_to_async(visit_ingest.visit_queue.flush)():
+                return None
+
+def apply_visit_summary(visit, data):
+    """
+    Copy the client's visit summary (time on page, path samples, metadata) onto a visit.
+
+    Returns:
+        list: Names of the fields that were set, for ``save(update_fields=...)``
+    """
+    visit_id = visit.id
+    updated_fields = []
+    time_on_page_seconds = data.get('time_on_page')
+    if time_on_page_seconds is not None:
+        try:
+            visit.time_spent = int(time_on_page_seconds)
+            updated_fields.append('time_spent')
+        except (ValueError, TypeError):
+            logger.warning(f"Invalid time_on_page value: {time_on_page_seconds} for visit {visit_id}")
+
+    # Handle 'metadata' from client
+    raw_additional_data = data.get('metadata', {})
+    mouse_movements, scroll_positions = data.get('mouse_movements'), data.get('scroll_positions')
+    if isinstance(raw_additional_data, dict):
+        # Older clients nest the samples in metadata; they are not part of METADATA_SCHEMA
+        raw_additional_data = dict(raw_additional_data)
+        legacy_mouse = raw_additional_data.pop('mouse_movements', None)
+        legacy_scroll = raw_additional_data.pop('scroll_positions', None)
+        mouse_movements = legacy_mouse if mouse_movements is None else mouse_movements
+        scroll_positions = legacy_scroll if scroll_positions is None else scroll_positions
+
+    # Mouse movements and scroll positions, packed by prometei.path_samples
+    if mouse_movements is not None or scroll_positions is not None:
+        visit.path_samples = encode_path_samples(mouse_movements, scroll_positions)
+        updated_fields.append('path_samples')
+
+    clean_additional_data = METADATA_SCHEMA.clean(raw_additional_data)
+    if clean_additional_data is INVALID:
+        clean_additional_data = {}
+
+    # Process remaining metadata
+    visit.meta_data = cap_metadata(clean_additional_data)
+    if visit.meta_data is not clean_additional_data:
+        logger.warning(f"Additional metadata for visit {visit_id} too large. Truncating.")
+    updated_fields.append('meta_data')
+    return updated_fields
+
+def cap_metadata(metadata, max_length=None):
+    """
+    Keep the leading metadata entries, in order, while their JSON fits METADATA_MAX_LENGTH bytes.
+
+    Each entry is encoded once (``json.dumps`` output is ASCII, as the
+    JSONField stores it) and its size serves both the fit check and the cut.
+    Entries from the first one that does not fit onwards are dropped and
+    flagged with ``"_truncated": true``.
+
+    Returns:
+        dict: ``metadata`` itself if it fits, otherwise a shortened copy
+    """
+    max_length = METADATA_MAX_LENGTH if max_length is None else max_length
+    limit = max_length - len(', "_truncated": true')
+    size = 2
+    fits = None  # кількість записів, що вміщаються разом із позначкою обрізання
+    for count, (key, value) in enumerate(metadata.items()):
+        size += len(json.dumps(key)) + 2 + len(json.dumps(value)) + (2 if count else 0)
+        if fits is None and size > limit:
+            fits = count
+        if size > max_length:
+            break
     else:
-        ip = request.META.get('REMOTE_ADDR', '') # Ensure default for safety
-    return ip
+        return metadata
+
+    kept = dict(itertools.islice(metadata.items(), fits))
+    kept['_truncated'] = True
+    return kept
 
 def check_rate_limit_flawless(request, key_prefix: str, limit_str: str): # Renamed from check_rate_limit to avoid conflict
     try:
-        limit, period_name = limit_str.split('/')
-        limit = int(limit)
-        if period_name == 'second': period_seconds = 1
-        elif period_name == 'minute': period_seconds = 60
-        elif period_name == 'hour': period_seconds = 3600
-        elif period_name == 'day': period_seconds = 86400
-        else:
-            logger.warning(f"Invalid rate limit period name: {period_name} in {limit_str}")
-            return True # Fail open if misconfigured
+        limit, period_seconds = parse_rate(limit_str)
     except ValueError:
         logger.error(f"Invalid rate limit string format: {limit_str}")
         return True # Fail open
 
     ip = get_client_ip(request)
-    cache_key = f"rl::{key_prefix}::{ip}"
-    count = cache.get(cache_key, 0)
+    try:
+        allowed, count = get_rate_limiter().hit(f"{key_prefix}::{ip}", limit, period_seconds)
+    except Exception as e:
+        logger.error(f"Rate limiter backend unavailable, allowing request: {e}")
+        return True # Fail open
 
-    if count >= limit:
-        logger.warning(f"Rate limit exceeded for {key_prefix} by IP {ip}. Limit: {limit_str}, Count: {count}")
+    if not allowed:
+        logger.warning(f"Rate limit exceeded for {key_prefix} by IP {ip}. Limit: {limit_str}, Count: {count:.1f}")
         raise RateLimitExceeded(f"Rate limit for {key_prefix} exceeded.")
+    return True
 
-    if count == 0:
-        cache.set(cache_key, 1, timeout=period_seconds)
-    else:
-        cache.incr(cache_key)
+async def acheck_rate_limit_flawless(request, key_prefix: str, limit_str: str):
+    """check_rate_limit_flawless() for the async views; the limiter backend runs off the event loop."""
+    return await acheck_rate_limit_for_ip(get_client_ip(request), key_prefix, limit_str)
+
+async def acheck_rate_limit_for_ip(ip, key_prefix: str, limit_str: str):
+    """acheck_rate_limit_flawless() for callers without an HttpRequest (prometei.beacon_lane)."""
+    try:
+        limit, period_seconds = parse_rate(limit_str)
+    except ValueError:
+        logger.error(f"Invalid rate limit string format: {limit_str}")
+        return True # Fail open
+
+    try:
+        allowed, count = await get_rate_limiter().ahit(f"{key_prefix}::{ip}", limit, period_seconds)
+    except Exception as e:
+        logger.error(f"Rate limiter backend unavailable, allowing request: {e}")
+        return True # Fail open
+
+    if not allowed:
+        logger.warning(f"Rate limit exceeded for {key_prefix} by IP {ip}. Limit: {limit_str}, Count: {count:.1f}")
+        raise RateLimitExceeded(f"Rate limit for {key_prefix} exceeded.")
     return True
 
 # --- Existing Views (Keep them) ---
@@ -416,74 +651,50 @@ class LandingPageView(View):
             logger.warning(f"Rate limit for LP view exceeded for IP {get_client_ip(request)} on slug {slug}")
             return HttpResponseForbidden("Rate limit exceeded.")
 
-        try:
-            # Using slug field instead of unique_link_id
-            landing_page = get_object_or_404(LandingPage, slug=slug, is_active=True)
-        except Http404:
+        # id/slug/updated_at only, from the slug cache; the HTML comes from the render cache
+        landing_page = resolve_landing_slug(slug)
+        if landing_page is None:
             logger.warning(f"Active landing page with slug {slug} not found.")
             return HttpResponse("Page not found or is inactive.", status=404)
 
         ip_address = get_client_ip(request)
         user_agent_str = request.META.get('HTTP_USER_AGENT', '')
-        user_agent_parsed = ua_parse(user_agent_str)
-
-        with transaction.atomic():
-            visit = LandingPageVisit.objects.create(
-                landing_page=landing_page,
-                ip_address=ip_address,
-                user_agent=user_agent_str[:255],
-                referrer=request.META.get('HTTP_REFERER', '')[:2048],
-                meta_data={
-                    'browser': user_agent_parsed.browser.family[:100],
-                    'os': user_agent_parsed.os.family[:100],
-                    'device': user_agent_parsed.device.family[:100]
-                }
-            )
-
-        tracking_context = {
-            'landing_page_id': landing_page.id,
-            'slug': landing_page.slug, # Using slug instead of unique_link_id
-            'visit_id': visit.id,
-            'google_pixel_id': landing_page.google_pixel_id,
-            'meta_pixel_id': landing_page.facebook_pixel_id, # Use the correct field from model
-            'track_url': django_reverse('prometei:landing_track'),
-            'interaction_url': django_reverse('prometei:landing_interaction'),
-            'form_submit_url': django_reverse('prometei:landing_submit_form'),
-        }
+        browser, os_family, device = parse_user_agent(user_agent_str)
+
+        # The visit is written by the ingest flusher; the page does not wait for the INSERT
+        visit = LandingPageVisit(
+            id=visit_ingest.next_visit_id(),
+            landing_page_id=landing_page.id,
+            ip_address=ip_address,
+            user_agent=user_agent_str[:255],
+            referrer=request.META.get('HTTP_REFERER', '')[:2048],
+            meta_data={
+                'browser': browser,
+                'os': os_family,
+                'device': device
+            }
+        )
+        visit_ingest.visit_queue.submit(visit)
 
         try:
-            pixel_scripts = render_to_string('prometei/landing_partials/_tracking_pixels.html', tracking_context)
-            pixel_noscript = render_to_string('prometei/landing_partials/_tracking_noscript.html', tracking_context)
-            main_tracking_script_content = render_to_string('prometei/landing_partials/_tracking_main_script.html', tracking_context)
+            compiled_page = get_compiled_landing_page(landing_page)
         except TemplateDoesNotExist as e:
             logger.error(f"Tracking template missing: {e}")
             return HttpResponse("Server configuration error: Essential tracking components missing.", status=500)
 
-        meta_robots_tag = f'<meta name="robots" content="{escape(landing_page.meta_robots)}">'
-        html_content = landing_page.html_content
-
-        # Inject meta_robots and pixel_scripts into <head>
-        if '</head>' in html_content.lower():
-            html_content = html_content.replace('</head>', f'{meta_robots_tag}\n{pixel_scripts}\n</head>', 1)
-        else:
-            html_content = f'<head>\n{meta_robots_tag}\n{pixel_scripts}\n</head>\n{html_content}'
-
-        # Inject pixel_noscript after <body> and main_tracking_script before </body>
-        body_tag_present = '<body>' in html_content.lower()
-        body_closing_tag_present = '</body>' in html_content.lower()
-
-        if body_closing_tag_present:
-            html_content = html_content.replace('</body>', f'{main_tracking_script_content}\n</body>', 1)
-            if body_tag_present:
-                 html_content = html_content.replace('<body>', f'<body>\n{pixel_noscript}', 1)
-            else:
-                 html_content = pixel_noscript + html_content
-        elif body_tag_present:
-            html_content = html_content.replace('<body>', f'<body>\n{pixel_noscript}', 1) + f'\n{main_tracking_script_content}'
+        # Static prefix is compressed at save time; only the per-visit tail is appended here
+        coding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        page_values = {
+            'visit_id': visit.id,
+            'visit_token': sign_visit_token(visit.id, landing_page.id, landing_page.slug),
+            'csrf_token': get_token(request),
+        }
+        if coding in compiled_page.compressed:
+            response = HttpResponse(compiled_page.render_encoded(coding, **page_values))
+            response['Content-Encoding'] = coding
         else:
-            html_content = f'<body>\n{pixel_noscript}\n{html_content}\n{main_tracking_script_content}\n</body>'
-
-        response = HttpResponse(html_content)
+            response = HttpResponse(compiled_page.render(**page_values))
+        patch_vary_headers(response, ['Accept-Encoding'])
         response['X-Frame-Options'] = 'DENY'
         response['X-Content-Type-Options'] = 'nosniff'
         csp_policy_parts = [
@@ -504,65 +715,28 @@ class LandingPageView(View):
 @csrf_protect
 @require_POST
 @never_cache
-def landing_track_view(request):
+async def landing_track_view(request):
     try:
         data = json.loads(request.body)
-        visit_id = data.get('visit_id')
-        time_on_page_seconds = data.get('time_on_page')
+        if not isinstance(data, dict):
+            return JsonResponse({'status': 'error', 'message': 'Invalid payload.'}, status=400)
 
-        if not visit_id:
-            return JsonResponse({'status': 'error', 'message': 'Missing visit_id.'}, status=400)
-
-        # Ensure the visit exists
-        try:
-            visit = LandingPageVisit.objects.get(id=visit_id)
-        except LandingPageVisit.DoesNotExist:
-            return JsonResponse({'status': 'error', 'message': 'Visit not found.'}, status=404)
+        # Visit ID and slug come from the signed token, not from the database
+        token, error = read_visit_token(request, data)
+        if error:
+            return error
 
         # Rate limit per IP for access to this endpoint
         try:
-            check_rate_limit_flawless(request, f"lp_track:{visit.landing_page.slug}", RATE_LIMIT_TRACK_LP)
+            await acheck_rate_limit_flawless(request, f"lp_track:{token.slug}", RATE_LIMIT_TRACK_LP)
         except RateLimitExceeded:
             return JsonResponse({'status': 'error', 'message': 'Rate limit exceeded.'}, status=429)
 
-        if time_on_page_seconds is not None:
-            try:
-                visit.time_spent = int(time_on_page_seconds)
-            except (ValueError, TypeError):
-                logger.warning(f"Invalid time_on_page value: {time_on_page_seconds} for visit {visit_id}")
-
-        # Handle 'metadata' from client
-        raw_additional_data = data.get('metadata', {})
-        clean_additional_data = {}
-        if isinstance(raw_additional_data, dict):
-            for k, v in raw_additional_data.items():
-                clean_key = bleach.clean(str(k)[:50])
-                if isinstance(v, (str, int, float, bool)):
-                    clean_value = bleach.clean(str(v)[:200])
-                elif isinstance(v, list):
-                    clean_value = [bleach.clean(str(i)[:100]) for i in v[:20]]
-                elif isinstance(v, dict):
-                    clean_value = {bleach.clean(str(sk)[:50]): bleach.clean(str(sv)[:100]) for sk, sv in v.items()}
-                else:
-                    clean_value = "Unsupported data type"
-                clean_additional_data[clean_key] = clean_value
-
-        # Process mouse movements and scroll positions
-        if 'mouse_movements' in clean_additional_data or 'scroll_positions' in clean_additional_data:
-            visit.path_data = {
-                'mouse_movements': clean_additional_data.pop('mouse_movements', [])[:200],
-                'scroll_positions': clean_additional_data.pop('scroll_positions', [])[:200]
-            }
-        
-        # Process remaining metadata
-        meta_json_string = json.dumps(clean_additional_data)
-        if len(meta_json_string) > METADATA_MAX_LENGTH:
-            logger.warning(f"Additional metadata for visit {visit_id} too large. Truncating.")
-            meta_json_string = meta_json_string[:METADATA_MAX_LENGTH -3] + "..."
-
-        visit.meta_data = json.loads(meta_json_string)
-
-        visit.save()
+        # Only the cleaned summary fields; heartbeats of a visit are coalesced before the UPDATE
+        visit = LandingPageVisit(id=token.visit_id)
+        values = {name: getattr(visit, name) for name in apply_visit_summary(visit, data)}
+        if not await visit_ingest.summary_buffer.asubmit(visit.id, values):
+            return JsonResponse({'status': 'error', 'message': 'Visit not found.'}, status=404)
         return JsonResponse({'status': 'success'})
 
     except json.JSONDecodeError:
@@ -575,45 +749,45 @@ def landing_track_view(request):
 @csrf_protect
 @require_POST
 @never_cache
-def landing_interaction_view(request):
+async def landing_interaction_view(request):
     try:
         data = json.loads(request.body)
-        visit_id = data.get('visit_id')
+        if not isinstance(data, dict):
+            return JsonResponse({'status': 'error', 'message': 'Invalid payload.'}, status=400)
         interaction_type = data.get('type')  # 'type' from client JS
         element_id = data.get('element_id')
         element_tag = data.get('element_tag')  # Maps to element_type in model
         
-        if not all([visit_id, interaction_type]):  # element_id or tag might be optional
-            return JsonResponse({'status': 'error', 'message': 'Missing required interaction data (visit_id, type).'}, status=400)
+        if not interaction_type:  # element_id or tag might be optional
+            return JsonResponse({'status': 'error', 'message': 'Missing required interaction data (visit_token, type).'}, status=400)
 
-        # Check if visit exists
-        try:
-            visit = LandingPageVisit.objects.get(id=visit_id)
-        except LandingPageVisit.DoesNotExist:
-            return JsonResponse({'status': 'error', 'message': 'Visit not found.'}, status=404)
+        token, error = read_visit_token(request, data)
+        if error:
+            return error
 
         # Rate limit per IP for this landing page's interactions
         try:
-            check_rate_limit_flawless(request, f"lp_interact:{visit.landing_page.slug}", RATE_LIMIT_INTERACT_LP)
+            await acheck_rate_limit_flawless(request, f"lp_interact:{token.slug}", RATE_LIMIT_INTERACT_LP)
         except RateLimitExceeded:
             return JsonResponse({'status': 'error', 'message': 'Rate limit exceeded.'}, status=429)
 
         # Validate interaction type
         if interaction_type not in VALID_INTERACTION_TYPES:
-            logger.warning(f"Invalid interaction type: {interaction_type} for visit {visit_id}. Defaulting to 'click'.")
+            logger.warning(f"Invalid interaction type: {interaction_type} for visit {token.visit_id}. Defaulting to 'click'.")
             interaction_type = 'click'  # Default to click for invalid types
 
         # Sanitize inputs
-        clean_element_id = bleach.clean(str(element_id)[:150]) if element_id else None
-        clean_element_tag = bleach.clean(str(element_tag)[:50]) if element_tag else None
+        clean_element_id, clean_element_tag = clean_element(element_id, element_tag)
 
         # Create the interaction record - using correct field name 'interaction_type'
-        LandingPageInteraction.objects.create(
-            visit=visit,
+        interaction = await acreate_visit_interaction(
+            visit_id=token.visit_id,
             interaction_type=interaction_type,  # Using correct field name in model
             element_id=clean_element_id,
             element_type=clean_element_tag  # Maps to element_type in model
         )
+        if interaction is None:
+            return JsonResponse({'status': 'error', 'message': 'Visit not found.'}, status=404)
         
         return JsonResponse({'status': 'success'})
 
@@ -624,10 +798,116 @@ def landing_interaction_view(request):
         return JsonResponse({'status': 'error', 'message': 'Server error.'}, status=500)
 
 @csrf_protect
+@require_POST
+@never_cache
+def landing_events_view(request):
+    """
+    Batched tracking beacon: a list of buffered interactions plus an optional visit summary.
+
+    Payload::
+
+        {"visit_id": ..., "sent_at": <client ms>,
+         "interactions": [{"type": ..., "element_id": ..., "element_tag": ..., "ts": <client ms>}, ...],
+         "summary": {"time_on_page": ..., "metadata": {...}}}
+
+    Interaction timestamps are rebuilt from their age relative to ``sent_at``,
+    so a skewed client clock does not shift them.
+    """
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            return JsonResponse({'status': 'error', 'message': 'Invalid payload.'}, status=400)
+        events = data.get('interactions') or []
+        summary = data.get('summary')
+
+        if not isinstance(events, list) or len(events) > MAX_EVENTS_PER_BATCH:
+            return JsonResponse({'status': 'error', 'message': f'Expected at most {MAX_EVENTS_PER_BATCH} interactions.'}, status=400)
+        if summary is not None and not isinstance(summary, dict):
+            return JsonResponse({'status': 'error', 'message': 'Invalid summary.'}, status=400)
+
+        # Visit ID and slug from the signed token: no query before the writes
+        token, error = read_visit_token(request, data)
+        if error:
+            return error
+
+        # One rate-limit hit per batch
+        try:
+            check_rate_limit_flawless(request, f"lp_events:{token.slug}", RATE_LIMIT_EVENTS_LP)
+        except RateLimitExceeded:
+            return JsonResponse({'status': 'error', 'message': 'Rate limit exceeded.'}, status=429)
+
+        interactions = build_batch_interactions(token.visit_id, events, data.get('sent_at'))
+        visit = LandingPageVisit(id=token.visit_id)
+        update_fields = apply_visit_summary(visit, summary) if summary else ()
+        if update_fields:
+            # Buffered heartbeats are older than this summary
+            visit_ingest.summary_buffer.discard(visit.id)
+        if not write_visit_events(visit, update_fields, interactions):
+            return JsonResponse({'status': 'error', 'message': 'Visit not found.'}, status=404)
+
+        return JsonResponse({'status': 'success', 'accepted': len(interactions)})
+
+    except json.JSONDecodeError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid JSON.'}, status=400)
+    except Exception as e:
+        logger.error(f"Error in landing_events_view: {e}", exc_info=True)
+        return JsonResponse({'status': 'error', 'message': 'Server error.'}, status=500)
+
 @transaction.atomic
+def save_landing_form_submission(landing_page, name, contact_info, message_text, form_data):
+    """
+    Store a landing page form submission in one transaction: the ContactRequest,
+    the visit's 'submit' interaction and the queued notification email.
+
+    Returns:
+        bool: False if the notification email could not be queued
+    """
+    # Create a contact request entry
+    full_message_for_contact_request = (
+        f"Заявка зі спеціального лендінгу: '{landing_page.title}' (Slug: {landing_page.slug})\n"
+        f"--------------------------------------------------\n"
+        f"{message_text}"
+    )
+    contact_request_entry = ContactRequest.objects.create(
+        name=name,
+        contact_method=contact_info,
+        message=full_message_for_contact_request,
+        request_type='contact',
+    )
+    logger.info(f"Created ContactRequest ID {contact_request_entry.id} from LP {landing_page.slug}")
+
+    # Log submission as an interaction if visit_id is provided
+    visit_id = form_data.get('visit_id')
+    if visit_id:
+        try:
+            visit = get_landing_visit(visit_id, landing_page=landing_page)
+            LandingPageInteraction.objects.create(
+                visit=visit,
+                interaction_type='submit',
+                element_id=form_data.get('form_id', 'form'),
+                element_type='FORM'
+            )
+        except LandingPageVisit.DoesNotExist:
+            logger.warning(f"Visit ID {visit_id} not found for form submission on LP {landing_page.slug}")
+        except Exception as e_interaction:
+            logger.error(f"Error creating form_submission interaction for LP {landing_page.slug}: {e_interaction}", exc_info=True)
+    else:
+        logger.warning(f"No visit_id provided for form submission on LP {landing_page.slug}")
+
+    # Send email notification
+    try:
+        # We pass the contact_request_entry directly to EmailService
+        EmailService.send_contact_email(contact_request_entry)
+        logger.info(f"Successfully sent form submission email for landing page {landing_page.slug}")
+        return True
+    except Exception as e_email:
+        logger.error(f"Failed to send email for landing page {landing_page.slug} submission: {e_email}", exc_info=True)
+        return False
+
+@csrf_protect
 @require_POST
 @never_cache
-def landing_submit_form_view(request):
+async def landing_submit_form_view(request):
     try:
         form_data = json.loads(request.body)
         landing_page_id = form_data.get('landing_page_id')
@@ -636,67 +916,28 @@ def landing_submit_form_view(request):
             return JsonResponse({'status': 'error', 'message': 'Missing landing_page_id'}, status=400)
         
         try:
-            landing_page = LandingPage.objects.get(id=landing_page_id, is_active=True)
-        except LandingPage.DoesNotExist:
+            landing_page = await LandingPage.objects.only('id', 'title', 'slug').aget(id=landing_page_id, is_active=True)
+        except (LandingPage.DoesNotExist, ValueError):
             return JsonResponse({'status': 'error', 'message': 'Landing page not found or inactive.'}, status=404)
 
         # Rate limit check
         try:
-            check_rate_limit_flawless(request, f"lp_submit:{landing_page.slug}", RATE_LIMIT_SUBMIT_LP)
+            await acheck_rate_limit_flawless(request, f"lp_submit:{landing_page.slug}", RATE_LIMIT_SUBMIT_LP)
         except RateLimitExceeded:
             return JsonResponse({'status': 'error', 'message': 'Rate limit exceeded. Please try again later.'}, status=429)
 
         # Sanitize and validate form data
-        name = bleach.clean(form_data.get('name', '')[:100])
-        contact_info = bleach.clean(form_data.get('contact', '')[:100])  # 'contact' from client JS
-        message_text = bleach.clean(form_data.get('message', '')[:2000])
+        name = clean_text(form_data.get('name', ''), 100)
+        contact_info = clean_text(form_data.get('contact', ''), 100)  # 'contact' from client JS
+        message_text = clean_text(form_data.get('message', ''), 2000)
 
         if not all([name, contact_info, message_text]):
             return JsonResponse({'status': 'error', 'message': 'All fields are required.', 'fields': {'name': not name, 'contact': not contact_info, 'message': not message_text}}, status=400)
 
-        # Create a contact request entry
-        full_message_for_contact_request = (
-            f"Заявка зі спеціального лендінгу: '{landing_page.title}' (Slug: {landing_page.slug})\n"
-            f"--------------------------------------------------\n"
-            f"{message_text}"
-        )
-        contact_request_entry = ContactRequest.objects.create(
-            name=name,
-            contact_method=contact_info,
-            message=full_message_for_contact_request,
-            request_type='contact',
-        )
-        logger.info(f"Created ContactRequest ID {contact_request_entry.id} from LP {landing_page.slug}")
-
-        # Log submission as an interaction if visit_id is provided
-        visit_id = form_data.get('visit_id')
-        if visit_id:
-            try:
-                visit = LandingPageVisit.objects.get(id=visit_id, landing_page=landing_page)
-                LandingPageInteraction.objects.create(
-                    visit=visit,
-                    interaction_type='submit',
-                    element_id=form_data.get('form_id', 'form'),
-                    element_type='FORM'
-                )
-            except LandingPageVisit.DoesNotExist:
-                logger.warning(f"Visit ID {visit_id} not found for form submission on LP {landing_page.slug}")
-            except Exception as e_interaction:
-                logger.error(f"Error creating form_submission interaction for LP {landing_page.slug}: {e_interaction}", exc_info=True)
-        else:
-            logger.warning(f"No visit_id provided for form submission on LP {landing_page.slug}")
-
-        # Send email notification
-        try:
-            # Using EmailService for consistent email sending
-            email_subject = f"Нова заявка з лендінгу: {landing_page.title}"
-            # We pass the contact_request_entry directly to EmailService
-            EmailService.send_contact_email(contact_request_entry)
-            logger.info(f"Successfully sent form submission email for landing page {landing_page.slug}")
+        # Transactions are not available to the async ORM: the writes run together in one thread hop
+        if await sync_to_async(save_landing_form_submission)(landing_page, name, contact_info, message_text, form_data):
             return JsonResponse({'status': 'success', 'message': 'Ваше повідомлення успішно надіслано!'})
-        except Exception as e_email:
-            logger.error(f"Failed to send email for landing page {landing_page.slug} submission: {e_email}", exc_info=True)
-            return JsonResponse({'status': 'error', 'message': 'Ваше повідомлення отримано, але виникла проблема з нашим сповіщенням. Ми зв\'яжемося з вами.'}, status=500)
+        return JsonResponse({'status': 'error', 'message': 'Ваше повідомлення отримано, але виникла проблема з нашим сповіщенням. Ми зв\'яжемося з вами.'}, status=500)
 
     except json.JSONDecodeError:
         return JsonResponse({'status': 'error', 'message': 'Invalid JSON data in request body.'}, status=400)
@@ -775,7 +1016,10 @@ def api_create_landing_page(request):
         google_pixel_id = data.get('google_pixel_id', '')
         facebook_pixel_id = data.get('facebook_pixel_id', '')
         meta_robots = data.get('meta_robots', 'noindex, nofollow')
-        is_active = data.get('is_active', True)
+        try:
+            is_active = coerce_bool(data.get('is_active', True))
+        except ValueError as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
         
         # Create the landing page
         landing_page, url = create_landing_page(
@@ -835,6 +1079,11 @@ def api_update_landing_page(request, landing_page_id):
         
         if not update_fields:
             return JsonResponse({'status': 'error', 'message': 'No valid fields to update'}, status=400)
+        if 'is_active' in update_fields:
+            try:
+                update_fields['is_active'] = coerce_bool(update_fields['is_active'])
+            except ValueError as e:
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
         
         # Update the landing page
         landing_page = update_landing_page(landing_page_id, **update_fields)
@@ -932,11 +1181,30 @@ def api_change_landing_page_status(request, landing_page_id):
 
 @user_passes_test(lambda u: u.is_staff)
 def api_list_landing_pages(request):
-    """API endpoint to list landing pages with optional filtering."""
+    """
+    API endpoint to list landing pages with optional filtering.
+
+    Results are ordered newest first (best match first when ``search`` is
+    given) and paginated with a keyset cursor on ``(created_at, id)`` or
+    ``(search_rank, id)``: pass ``next_cursor`` from a response as ``cursor``
+    to get the following page. ``limit`` defaults to LANDING_PAGE_API_PAGE_SIZE.
+    Responses carry an ETag built from the query string and
+    visit_totals_version(); a matching ``If-None-Match`` gets a 304 before
+    the listing is queried.
+    """
     if request.method != 'GET':
         return JsonResponse({'status': 'error', 'message': 'Only GET method is allowed'}, status=405)
     
     try:
+        version = visit_totals_version(LandingPage.objects.all())
+        etag_source = f"{request.get_full_path()}|{get_language()}|{version}"
+        etag = f'"{hashlib.md5(etag_source.encode(), usedforsecurity=False).hexdigest()}"'
+        if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            patch_vary_headers(response, ['Cookie'])
+            return response
+
         # Get query parameters
         search_query = request.GET.get('search', None)
         is_active_param = request.GET.get('is_active', None)
@@ -945,35 +1213,160 @@ def api_list_landing_pages(request):
         is_active = None
         if is_active_param is not None:
             is_active = is_active_param.lower() in ['true', '1', 'yes']
-        
+
+        try:
+            limit = min(max(int(request.GET.get('limit', API_PAGE_SIZE)), 1), API_MAX_PAGE_SIZE)
+        except ValueError:
+            return JsonResponse({'status': 'error', 'message': 'Invalid limit.'}, status=400)
+
         # Find landing pages
-        landing_pages = find_landing_pages(search_query, is_active)
+        landing_pages = (
+            annotate_visit_totals(
+                find_landing_pages(search_query, is_active)
+                .only('id', 'title', 'slug', 'is_active', 'created_at', 'updated_at'),
+                name='visit_count',
+            )
+        )
+        ranked = bool(search_query)
+        if ranked:
+            landing_pages = landing_pages.order_by('search_rank', '-id')
+        else:
+            landing_pages = landing_pages.order_by('-created_at', '-id')
+
+        cursor = request.GET.get('cursor')
+        if cursor:
+            try:
+                cursor_key, cursor_id = decode_list_cursor(cursor, ranked=ranked)
+            except ValueError:
+                return JsonResponse({'status': 'error', 'message': 'Invalid cursor.'}, status=400)
+            if ranked:
+                landing_pages = landing_pages.filter(
+                    Q(search_rank__gt=cursor_key) | Q(search_rank=cursor_key, id__lt=cursor_id)
+                )
+            else:
+                landing_pages = landing_pages.filter(
+                    Q(created_at__lt=cursor_key) | Q(created_at=cursor_key, id__lt=cursor_id)
+                )
+
+        page = list(landing_pages[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
         
         # Prepare response data
         response_data = []
-        for page in landing_pages:
+        for landing_page in page:
             response_data.append({
-                'id': page.id,
-                'title': page.title,
-                'slug': page.slug,
-                'url': page.get_absolute_url(),
-                'is_active': page.is_active,
-                'created_at': page.created_at.isoformat(),
-                'updated_at': page.updated_at.isoformat(),
-                'visit_count': page.visits.count()
+                'id': landing_page.id,
+                'title': landing_page.title,
+                'slug': landing_page.slug,
+                'url': landing_page.get_absolute_url(),
+                'is_active': landing_page.is_active,
+                'created_at': landing_page.created_at.isoformat(),
+                'updated_at': landing_page.updated_at.isoformat(),
+                'visit_count': landing_page.visit_count
             })
         
-        return JsonResponse({
+        response = JsonResponse({
             'status': 'success',
             'count': len(response_data),
-            'landing_pages': response_data
+            'landing_pages': response_data,
+            'has_more': has_more,
+            'next_cursor': encode_list_cursor(
+                page[-1].search_rank if ranked else page[-1].created_at, page[-1].id
+            ) if has_more else None,
         })
+
+        response['ETag'] = etag
+        patch_vary_headers(response, ['Cookie'])
+        return response
         
     except Exception as e:
         logger.error(f"Error in api_list_landing_pages: {str(e)}", exc_info=True)
         return JsonResponse({'status': 'error', 'message': f'Server error: {str(e)}'}, status=500)
 
 
+def encode_list_cursor(key, page_id):
+    """Opaque keyset cursor for api_list_landing_pages; ``key`` is created_at or a search rank."""
+    key = key.isoformat() if hasattr(key, 'isoformat') else repr(float(key))
+    return base64.urlsafe_b64encode(f"{key}|{page_id}".encode()).decode().rstrip('=')
+
+
+def decode_list_cursor(cursor, ranked=False):
+    """
+    Returns:
+        tuple: (created_at, id), or (search_rank, id) if ``ranked``
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        key, page_id = raw.rsplit('|', 1)
+        page_id = int(page_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Malformed cursor: {cursor}") from e
+    if ranked:
+        return float(key), page_id
+    created_at = parse_datetime(key)
+    if created_at is None:
+        raise ValueError(f"Malformed cursor: {cursor}")
+    return created_at, page_id
+
+
+@user_passes_test(lambda u: u.is_staff)
+def api_landing_ingest_stats(request):
+    """API endpoint exposing visit ingest queue and lookup cache metrics of the serving process."""
+    if request.method != 'GET':
+        return JsonResponse({'status': 'error', 'message': 'Only GET method is allowed'}, status=405)
+
+    return JsonResponse({
+        'status': 'success',
+        'pid': os.getpid(),
+        'visit_ingest': visit_ingest.visit_queue.metrics(),
+        'interaction_ingest': visit_ingest.interaction_queue.metrics(),
+        'db_writer': db_writer.metrics(),
+        'visit_summaries': visit_ingest.summary_buffer.metrics(),
+        'user_agent_cache': user_agent_cache.stats(),
+        'slug_cache': slug_cache.stats(),
+    })
+
+
+@user_passes_test(lambda u: u.is_staff)
+def api_landing_page_stats(request, landing_page_id):
+    """
+    API endpoint with the daily analytics of a landing page.
+
+    Reads LandingPageDailyStats only; ``from`` / ``to`` (YYYY-MM-DD, inclusive)
+    default to the last LANDING_PAGE_API_STATS_DEFAULT_DAYS days. ``as_of`` is
+    the rollup watermark: visits after it are not included yet.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'status': 'error', 'message': 'Only GET method is allowed'}, status=405)
+
+    landing_page = get_object_or_404(LandingPage.objects.only('id', 'title'), id=landing_page_id)
+    try:
+        date_to = parse_date(request.GET['to']) if 'to' in request.GET else timezone.localdate()
+        date_from = (parse_date(request.GET['from']) if 'from' in request.GET
+                     else date_to - timedelta(days=API_STATS_DEFAULT_DAYS - 1))
+    except ValueError:
+        date_to = date_from = None
+    if date_from is None or date_to is None or date_from > date_to:
+        return JsonResponse({'status': 'error', 'message': 'Invalid date range.'}, status=400)
+
+    stats = page_stats(landing_page.id, date_from, date_to)
+    watermark = get_watermark()
+    return JsonResponse({
+        'status': 'success',
+        'landing_page_id': landing_page.id,
+        'title': landing_page.title,
+        'from': date_from.isoformat(),
+        'to': date_to.isoformat(),
+        'as_of': watermark.isoformat() if watermark else None,
+        'days': [{**day, 'date': day['date'].isoformat()} for day in stats['days']],
+        'totals': stats['totals'],
+    })
+
+
 @csrf_exempt
 @user_passes_test(lambda u: u.is_staff)
 def api_create_landing_page_from_template(request):
@@ -1001,17 +1394,35 @@ def api_create_landing_page_from_template(request):
             return JsonResponse({'status': 'error', 'message': f'Template with ID {template_id} not found'}, status=404)
         
         # Get template variables from request
-        variables = data.get('variables', {})
+        variables = data.get('variables') or {}
+        if not isinstance(variables, dict):
+            return JsonResponse({'status': 'error', 'message': 'variables must be an object'}, status=400)
         
         # Optional landing page parameters
         lp_params = {}
         for param in ['google_pixel_id', 'facebook_pixel_id', 'meta_robots', 'is_active']:
             if param in data:
                 lp_params[param] = data[param]
+        if 'is_active' in lp_params:
+            try:
+                lp_params['is_active'] = coerce_bool(lp_params['is_active'])
+            except ValueError as e:
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
         
         # Create landing page from template
-        landing_page, url = template.create_landing_page(title=title, variables=variables, **lp_params)
+        try:
+            landing_page, url = template.create_landing_page(
+                title=title, variables=variables, strict=data.get('strict') is True, **lp_params
+            )
+        except TemplateVariableError as e:
+            return JsonResponse({
+                'status': 'error',
+                'message': str(e),
+                'missing_variables': e.missing,
+                'unknown_variables': e.unknown,
+            }, status=400)
         
+        report = get_compiled_template(template).check(variables)
         return JsonResponse({
             'status': 'success',
             'message': 'Landing page created successfully from template',
@@ -1020,7 +1431,9 @@ def api_create_landing_page_from_template(request):
             'url': url,
             'slug': landing_page.slug,
             'is_active': landing_page.is_active,
-            'template_name': template.name
+            'template_name': template.name,
+            'missing_variables': report['missing'],
+            'unknown_variables': report['unknown'],
         })
         
     except json.JSONDecodeError:
@@ -1030,6 +1443,89 @@ def api_create_landing_page_from_template(request):
         return JsonResponse({'status': 'error', 'message': f'Server error: {str(e)}'}, status=500)
 
 
+@csrf_exempt
+@user_passes_test(lambda u: u.is_staff)
+def api_create_landing_pages_from_template(request):
+    """
+    API endpoint to create many landing pages from one template in one call.
+
+    Body: {"template_id": 1, "pages": [{"title": ..., "variables": {...},
+    "google_pixel_id": ..., "facebook_pixel_id": ..., "meta_robots": ..., "is_active": ...}, ...],
+    "strict": false}. All pages are created or none; with "strict": true a page
+    that leaves a placeholder without a value rejects the whole request.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'Only POST method is allowed'}, status=405)
+
+    try:
+        data = json.loads(request.body)
+        template_id = data.get('template_id')
+        rows = data.get('pages')
+
+        if not template_id or not isinstance(rows, list) or not rows:
+            return JsonResponse(
+                {'status': 'error', 'message': 'Missing required fields: template_id and a non-empty pages list are required'},
+                status=400
+            )
+        if len(rows) > API_BULK_MAX_PAGES:
+            return JsonResponse({'status': 'error', 'message': f'At most {API_BULK_MAX_PAGES} pages per request'}, status=400)
+
+        for index, row in enumerate(rows):
+            if not isinstance(row, dict) or not row.get('title'):
+                return JsonResponse({'status': 'error', 'message': f'Page {index}: title is required', 'row': index}, status=400)
+            if not isinstance(row.get('variables') or {}, dict):
+                return JsonResponse({'status': 'error', 'message': f'Page {index}: variables must be an object', 'row': index}, status=400)
+            try:
+                coerce_bool(row.get('is_active', True))
+            except ValueError as e:
+                return JsonResponse({'status': 'error', 'message': f'Page {index}: {e}', 'row': index}, status=400)
+
+        try:
+            template = LandingPageTemplate.objects.get(id=template_id)
+        except LandingPageTemplate.DoesNotExist:
+            return JsonResponse({'status': 'error', 'message': f'Template with ID {template_id} not found'}, status=404)
+
+        try:
+            created = create_landing_pages_from_template(template, rows, strict=data.get('strict') is True)
+        except TemplateVariableError as e:
+            return JsonResponse({
+                'status': 'error',
+                'message': f'Page {e.row}: {e}',
+                'row': e.row,
+                'missing_variables': e.missing,
+                'unknown_variables': e.unknown,
+            }, status=400)
+
+        compiled = get_compiled_template(template)
+        reports = [compiled.check(row.get('variables') or {}) for row in rows]
+        missing = sorted({name for report in reports for name in report['missing']})
+        unknown = sorted({name for report in reports for name in report['unknown']})
+        return JsonResponse({
+            'status': 'success',
+            'message': f'{len(created)} landing pages created successfully from template',
+            'count': len(created),
+            'template_name': template.name,
+            'missing_variables': missing,
+            'unknown_variables': unknown,
+            'landing_pages': [
+                {
+                    'landing_page_id': landing_page.id,
+                    'title': landing_page.title,
+                    'url': url,
+                    'slug': landing_page.slug,
+                    'is_active': landing_page.is_active,
+                }
+                for landing_page, url in created
+            ],
+        })
+
+    except json.JSONDecodeError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid JSON'}, status=400)
+    except Exception as e:
+        logger.error(f"Error in api_create_landing_pages_from_template: {str(e)}", exc_info=True)
+        return JsonResponse({'status': 'error', 'message': f'Server error: {str(e)}'}, status=500)
+
+
 @user_passes_test(lambda u: u.is_staff)
 def api_list_landing_page_templates(request):
     """API endpoint to list available landing page templates."""
@@ -0,0 +1,249 @@
+"""
+Landing Visit Archive
+
+Old LandingPageVisit rows (with their interactions) are moved out of the
+database into gzip-compressed JSON Lines files, partitioned by month and page:
+
+    <LANDING_VISIT_ARCHIVE_DIR>/month=2025-03/page=17/part-<run>.jsonl.gz
+
+One line per visit, interactions nested under ``interactions`` and the
+binary ``path_samples`` as base64. Each run
+writes new ``part-*`` files (temporary name, then rename), and only once all
+of them are on disk deletes the archived rows in short batches, so the
+tracking writers are never blocked for long. Rows are only archived once LandingPageDailyStats covers
+their day, so dashboards keep working from the rollups; ``archived_daily_stats``
+recomputes the same figures from the files when the raw data is needed.
+"""
+
+import base64
+import gzip
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import TextField
+from django.db.models.functions import Cast
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .landing_stats import STATS_LOOKBACK, get_watermark, summarize_day
+from .models import LandingPageInteraction, LandingPageVisit
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = Path(getattr(settings, 'LANDING_VISIT_ARCHIVE_DIR', settings.BASE_DIR / 'archive' / 'landing_visits'))
+ARCHIVE_AFTER_DAYS = getattr(settings, 'LANDING_VISIT_ARCHIVE_AFTER_DAYS', 180)
+ARCHIVE_CHUNK_SIZE = 2000  # visits per SELECT
+ARCHIVE_DELETE_BATCH = 500  # visits per DELETE transaction
+
+VISIT_FIELDS = ('id', 'landing_page_id', 'visit_time', 'ip_address', 'user_agent', 'referrer', 'time_spent')
+
+
+class ArchiveNotReady(Exception):
+    """Raised when the daily stats rollup has not caught up with the cutoff."""
+
+
+def partition_path(archive_dir, month, landing_page_id):
+    return Path(archive_dir) / f'month={month}' / f'page={landing_page_id}'
+
+
+def visit_line(row, path_json, meta_json, path_samples, interactions):
+    """
+    One JSONL line of a visit.
+
+    ``path_json`` / ``meta_json`` are the JSON columns as stored, spliced in
+    verbatim instead of being decoded and re-encoded.
+    """
+    record = dict(zip(VISIT_FIELDS, row))
+    record['visit_time'] = record['visit_time'].isoformat()
+    record['path_samples'] = base64.b64encode(path_samples).decode('ascii') if path_samples else None
+    record['interactions'] = interactions
+    head = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+    return f'{head[:-1]},"path_data":{path_json or "null"},"meta_data":{meta_json or "null"}}}\n'
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _PartWriter:
+    """gzip JSONL part file that only appears under its final name once closed."""
+
+    def __init__(self, directory, run_id):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.path = directory / f'part-{run_id}.jsonl.gz'
+        self.tmp_path = directory / f'.part-{run_id}.jsonl.gz.tmp'
+        self._file = gzip.open(self.tmp_path, 'wt', encoding='utf-8', compresslevel=6)
+        self.ids = []
+
+    def write(self, visit_id, line):
+        self._file.write(line)
+        self.ids.append(visit_id)
+
+    def close(self):
+        self._file.close()
+        with open(self.tmp_path, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(self.tmp_path, self.path)
+
+
+def archive_cutoff(days=ARCHIVE_AFTER_DAYS):
+    """
+    Visits before the returned time may be archived.
+
+    Raises:
+        ArchiveNotReady: If the rollup has not covered the cutoff yet
+    """
+    cutoff = timezone.localtime() - timedelta(days=days)
+    cutoff = cutoff.replace(hour=0, minute=0, second=0, microsecond=0)
+    watermark = get_watermark()
+    if watermark is None or watermark - timedelta(seconds=STATS_LOOKBACK) < cutoff:
+        raise ArchiveNotReady(
+            f"Daily stats are rolled up to {watermark}, run rollup_landing_stats before archiving to {cutoff}"
+        )
+    return cutoff
+
+
+def delete_archived(visit_ids, batch_size=ARCHIVE_DELETE_BATCH, pause=0.0):
+    """Delete archived visits and their interactions, one short transaction per batch."""
+    deleted = 0
+    for offset in range(0, len(visit_ids), batch_size):
+        batch = visit_ids[offset:offset + batch_size]
+        # only('id'): the delete collector loads the visits, their JSON columns are not needed
+        _, per_model = LandingPageVisit.objects.filter(id__in=batch).only('id').delete()
+        deleted += per_model.get(LandingPageVisit._meta.label, 0)
+        if pause:
+            time.sleep(pause)
+    return deleted
+
+
+def archive_visits(cutoff, archive_dir=ARCHIVE_DIR, chunk_size=ARCHIVE_CHUNK_SIZE,
+                   delete_batch=ARCHIVE_DELETE_BATCH, pause=0.0, delete=True):
+    """
+    Write visits older than ``cutoff`` to the archive and delete them from the database.
+
+    Returns:
+        dict: {'archived': visits written, 'deleted': visits deleted, 'files': part files written}
+    """
+    run_id = timezone.now().strftime('%Y%m%dT%H%M%S%f')
+    tz = timezone.get_current_timezone()
+    visits = (
+        LandingPageVisit.objects
+        .filter(visit_time__lt=cutoff)
+        .order_by('landing_page_id', 'visit_time', 'id')
+        .annotate(path_json=Cast('path_data', TextField()), meta_json=Cast('meta_data', TextField()))
+        .values_list(*VISIT_FIELDS, 'path_json', 'meta_json', 'path_samples')
+    )
+
+    totals = {'archived': 0, 'deleted': 0, 'files': 0}
+    archived_ids = []
+    writer, current = None, None
+
+    def finish(part):
+        part.close()
+        archived_ids.extend(part.ids)
+        totals['files'] += 1
+
+    # Впорядковано за (сторінка, час), тож одночасно відкритий лише один файл
+    for chunk in _chunks(visits.iterator(chunk_size=chunk_size), chunk_size):
+        interactions = defaultdict(list)
+        rows = (LandingPageInteraction.objects.filter(visit_id__in=[row[0] for row in chunk])
+                .order_by('timestamp')
+                .values_list('visit_id', 'element_id', 'element_type', 'interaction_type', 'timestamp'))
+        for visit_id, element_id, element_type, interaction_type, timestamp in rows:
+            interactions[visit_id].append({
+                'element_id': element_id,
+                'element_type': element_type,
+                'interaction_type': interaction_type,
+                'timestamp': timestamp.isoformat(),
+            })
+
+        for *row, path_json, meta_json, path_samples in chunk:
+            partition = (row[1], row[2].astimezone(tz).strftime('%Y-%m'))
+            if partition != current:
+                if writer is not None:
+                    finish(writer)
+                writer = _PartWriter(partition_path(archive_dir, partition[1], partition[0]), run_id)
+                current = partition
+            writer.write(row[0], visit_line(row, path_json, meta_json, path_samples, interactions[row[0]]))
+    if writer is not None:
+        finish(writer)
+
+    # Видаляємо лише після того, як усі файли записані й курсор закритий
+    totals['archived'] = len(archived_ids)
+    if delete:
+        totals['deleted'] = delete_archived(archived_ids, delete_batch, pause)
+    logger.info(f"Archived {totals['archived']} visits to {totals['files']} files, deleted {totals['deleted']}")
+    return totals
+
+
+def _months(date_from, date_to):
+    year, month = date_from.year, date_from.month
+    while (year, month) <= (date_to.year, date_to.month):
+        yield f'{year:04d}-{month:02d}'
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def iter_archived_visits(landing_page_id=None, date_from=None, date_to=None, archive_dir=ARCHIVE_DIR):
+    """
+    Yield archived visit records (dicts, ``visit_time`` parsed) in partition order.
+
+    Only the month/page partitions that can match are opened; a visit archived
+    twice (a run interrupted between writing and deleting) is yielded once.
+    """
+    archive_dir = Path(archive_dir)
+    if date_from and date_to:
+        month_dirs = [archive_dir / f'month={month}' for month in _months(date_from, date_to)]
+    else:
+        month_dirs = sorted(archive_dir.glob('month=*'))
+    page_glob = f'page={landing_page_id}' if landing_page_id is not None else 'page=*'
+
+    for month_dir in month_dirs:
+        for page_dir in sorted(month_dir.glob(page_glob)):
+            seen = set()
+            for part in sorted(page_dir.glob('part-*.jsonl.gz')):
+                with gzip.open(part, 'rt', encoding='utf-8') as f:
+                    for line in f:
+                        record = json.loads(line)
+                        if record['id'] in seen:
+                            continue
+                        seen.add(record['id'])
+                        record['visit_time'] = parse_datetime(record['visit_time'])
+                        day = timezone.localdate(record['visit_time'])
+                        if (date_from and day < date_from) or (date_to and day > date_to):
+                            continue
+                        yield record
+
+
+def archived_daily_stats(landing_page_id, date_from, date_to, archive_dir=ARCHIVE_DIR):
+    """
+    LandingPageDailyStats-shaped rows recomputed from the archive.
+
+    Returns:
+        list: Dicts with ``date`` and the STATS_FIELDS, ordered by date
+    """
+    time_spent, ips = defaultdict(list), defaultdict(set)
+    interactions = defaultdict(lambda: defaultdict(int))
+    for record in iter_archived_visits(landing_page_id, date_from, date_to, archive_dir):
+        day = timezone.localdate(record['visit_time'])
+        time_spent[day].append(record['time_spent'])
+        if record['ip_address']:
+            ips[day].add(record['ip_address'])
+        for interaction in record['interactions']:
+            interactions[day][interaction['interaction_type']] += 1
+    return [
+        {'date': day, **summarize_day(time_spent[day], ips[day], interactions[day])}
+        for day in sorted(time_spent)
+    ]
@@ -0,0 +1,572 @@
+"""
+Landing Page Visit Ingestion
+
+Decouples landing page responses from database writes. The view reserves a
+visit ID up front (a snowflake-style 63-bit integer, unique across worker
+processes) and hands the unsaved LandingPageVisit to an in-process bounded
+queue. A background flusher thread writes queued visits with ``bulk_create``
+in batches. When the queue is full the visit is written synchronously, so
+overload degrades to the old behaviour instead of losing data, and the
+overflow is counted in the backpressure metrics.
+
+Interactions posted through the beacon fast lane (prometei.beacon_lane) are
+buffered the same way by an InteractionIngestQueue, which writes pending
+visits before each batch so the foreign keys resolve. Interactions of visits
+that are still queued in another worker process are kept for up to
+LANDING_VISIT_INGEST_RETRY_WINDOW seconds and retried with later batches.
+
+Visit summaries from ``/landing/track/`` heartbeats go through a
+VisitSummaryBuffer: values for the same visit are merged in memory and only
+the last ones within LANDING_VISIT_SUMMARY_WINDOW seconds are written, with
+one ``UPDATE ... WHERE id=`` per visit and one transaction per flush. Values
+of visits not written yet by any worker stay pending for the same retry
+window as interactions.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, worker IDs fall back to the PID
+    fcntl = None
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+
+from .models import LandingPageInteraction, LandingPageVisit
+from .sqlite_tuning import db_writer
+
+logger = logging.getLogger(__name__)
+
+INGEST_QUEUE_SIZE = getattr(settings, 'LANDING_VISIT_INGEST_QUEUE_SIZE', 10000)
+INGEST_BATCH_SIZE = getattr(settings, 'LANDING_VISIT_INGEST_BATCH_SIZE', 200)
+INGEST_FLUSH_INTERVAL = getattr(settings, 'LANDING_VISIT_INGEST_FLUSH_INTERVAL', 0.5)  # seconds
+INGEST_RETRY_WINDOW = getattr(settings, 'LANDING_VISIT_INGEST_RETRY_WINDOW', 5.0)  # seconds
+SUMMARY_WINDOW = getattr(settings, 'LANDING_VISIT_SUMMARY_WINDOW', 2.0)  # seconds
+WORKER_LOCK_DIR = getattr(settings, 'LANDING_VISIT_WORKER_LOCK_DIR',
+                          os.path.join(tempfile.gettempdir(), 'prometei-visit-workers'))
+
+
+class SnowflakeIdGenerator:
+    """
+    Generate roughly time-ordered 63-bit IDs without touching the database.
+
+    Layout: 41 bits of milliseconds since EPOCH_MS, 10 bits of worker ID and a
+    12-bit per-millisecond sequence.
+
+    Each process claims a free worker ID by taking an exclusive ``flock`` on
+    ``WORKER_LOCK_DIR/<id>.lock``. The OS releases it when the process exits,
+    so live processes on the host never share an ID. PIDs cannot be used for
+    this, because two PIDs can match modulo 1024. LANDING_VISIT_WORKER_ID
+    pins the ID instead. Use it to give each host its own ID when several
+    hosts write to one database.
+    """
+
+    EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+    WORKER_BITS = 10
+    SEQUENCE_BITS = 12
+
+    def __init__(self, worker_id=None):
+        self._configured_worker_id = worker_id
+        self._lock = threading.Lock()
+        self._pid = None
+        self._worker_id = 0
+        self._lock_file = None
+        self._last_ms = -1
+        self._sequence = 0
+
+    def _reset_for_process(self):
+        self._pid = os.getpid()
+        if self._lock_file is not None:
+            # Копія дескриптора батьківського процесу: його слот лишається за батьком
+            self._lock_file.close()
+            self._lock_file = None
+        worker_id = self._configured_worker_id
+        if worker_id is None:
+            worker_id = getattr(settings, 'LANDING_VISIT_WORKER_ID', None)
+        if worker_id is None:
+            worker_id = self._claim_worker_id()
+        self._worker_id = worker_id & ((1 << self.WORKER_BITS) - 1)
+        self._last_ms = -1
+        self._sequence = 0
+
+    def _claim_worker_id(self):
+        """Lock the first free slot file in WORKER_LOCK_DIR and keep it open for the life of the process."""
+        if fcntl is None:
+            logger.warning("flock is unavailable; visit worker ID taken from the PID, set LANDING_VISIT_WORKER_ID")
+            return self._pid
+        os.makedirs(WORKER_LOCK_DIR, exist_ok=True)
+        for worker_id in range(1 << self.WORKER_BITS):
+            lock_file = open(os.path.join(WORKER_LOCK_DIR, f'{worker_id}.lock'), 'a')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                continue
+            self._lock_file = lock_file
+            return worker_id
+        raise RuntimeError(f"All {1 << self.WORKER_BITS} visit worker IDs in {WORKER_LOCK_DIR} are taken")
+
+    def next_id(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset_for_process()
+            now_ms = int(time.time() * 1000)
+            if now_ms < self._last_ms:
+                # Clock went backwards; keep issuing from the last timestamp.
+                now_ms = self._last_ms
+            if now_ms == self._last_ms:
+                self._sequence = (self._sequence + 1) & ((1 << self.SEQUENCE_BITS) - 1)
+                if self._sequence == 0:
+                    while now_ms <= self._last_ms:
+                        now_ms = int(time.time() * 1000)
+            else:
+                self._sequence = 0
+            self._last_ms = now_ms
+            return (
+                ((now_ms - self.EPOCH_MS) << (self.WORKER_BITS + self.SEQUENCE_BITS))
+                | (self._worker_id << self.SEQUENCE_BITS)
+                | self._sequence
+            )
+
+
+class VisitIngestQueue:
+    """Bounded in-process buffer of unsaved visits with a batching background flusher."""
+
+    model = LandingPageVisit
+    label = 'visit'
+    visit_field = 'id'
+    reissue_ids = True  # rows have snowflake IDs that can collide
+
+    def __init__(self, maxsize=INGEST_QUEUE_SIZE, batch_size=INGEST_BATCH_SIZE,
+                 flush_interval=INGEST_FLUSH_INTERVAL, autostart=True):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.autostart = autostart
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+        self._deferred = []  # (retry_until, row) of rows that wait for their visit
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'batches': 0,
+            'overflow_sync_writes': 0,
+            'failed': 0,
+            'deferred': 0,
+            'reissued_ids': 0,
+            'max_depth': 0,
+            'last_batch_size': 0,
+            'last_flush_ms': 0.0,
+        }
+
+    def submit(self, visit):
+        """
+        Queue an unsaved visit for writing.
+
+        The visit must already carry its reserved ``id``. With asynchronous
+        ingestion disabled (``LANDING_VISIT_INGEST_ASYNC = False``) the visit is
+        written immediately.
+        """
+        if not getattr(settings, 'LANDING_VISIT_INGEST_ASYNC', True):
+            visit.save(force_insert=True)
+            return
+        if self._enqueue(visit):
+            return
+        self._count('overflow_sync_writes')
+        logger.warning(f"{self.label.capitalize()} ingest queue full ({self.maxsize}); writing {self.label} "
+                       f"(visit {getattr(visit, self.visit_field)}) synchronously")
+        self._write([visit])
+
+    async def asubmit(self, row):
+        """
+        submit() for coroutines. Queueing does no I/O; only a synchronous
+        write (ingestion off or queue full) leaves the event loop.
+        """
+        if getattr(settings, 'LANDING_VISIT_INGEST_ASYNC', True) and self._enqueue(row):
+            return
+        await sync_to_async(self.submit)(row)
+
+    def flush(self):
+        """
+        Write everything currently queued from the calling thread.
+
+        Returns:
+            int: Number of rows written
+        """
+        written = 0
+        retry = bool(self._deferred)  # відкладені рядки — одна спроба за флеш
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch and not retry:
+                return written
+            retry = False
+            written += self._write(batch)
+
+    def metrics(self):
+        """Snapshot of ingestion counters plus the current queue depth."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['depth'] = self._queue.qsize()
+        stats['deferred_depth'] = len(self._deferred)
+        stats['capacity'] = self.maxsize
+        return stats
+
+    def _enqueue(self, row):
+        """Put ``row`` on the queue unless it is full; returns False if it was."""
+        if self.autostart:
+            self._ensure_worker()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            return False
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._stats['enqueued'] += 1
+            if depth > self._stats['max_depth']:
+                self._stats['max_depth'] = depth
+        return True
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        started = time.monotonic()
+        # Замок черги, потім записувача (всередині db_writer.run): записувач вільний,
+        # поки db_writer.run чекає перед повтором
+        with self._write_lock:
+            retry_until = {id(row): until for until, row in self._deferred}
+            batch, self._deferred = [row for _, row in self._deferred] + batch, []
+            if not batch:
+                return 0
+            try:
+                db_writer.run(self._bulk_insert, batch)
+                written = len(batch)
+            except Exception as e:
+                logger.error(f"Bulk {self.label} insert of {len(batch)} rows failed, retrying row by row: {e}", exc_info=True)
+                written = 0
+                for row in batch:
+                    try:
+                        self._save_row(row)
+                        written += 1
+                    except Exception as e_row:
+                        if self._defer(row, e_row, retry_until.get(id(row))):
+                            continue
+                        self._count('failed')
+                        logger.error(f"Could not store {self.label} (visit {getattr(row, self.visit_field)}): {e_row}")
+        with self._stats_lock:
+            self._stats['written'] += written
+            self._stats['batches'] += 1
+            self._stats['last_batch_size'] = len(batch)
+            self._stats['last_flush_ms'] = round((time.monotonic() - started) * 1000, 2)
+        return written
+
+    def _defer(self, row, error, retry_until):
+        """
+        Keep a row that failed to insert for the next batch.
+
+        Called with the write lock held. ``retry_until`` is the deadline of a
+        row that was deferred before, None on its first failure.
+
+        Returns:
+            bool: True if the row was deferred instead of dropped
+        """
+        return False
+
+    def _save_row(self, row):
+        """
+        Insert one row of a failed batch.
+
+        A visit whose ID is already taken gets a new ID and is inserted again.
+        Its visit token still names the old ID, so beacons of that visit are
+        lost, but the visit itself is kept.
+        """
+        try:
+            db_writer.run(self._insert, row)
+        except IntegrityError:
+            if not self.reissue_ids or not self.model.objects.filter(pk=row.pk).exists():
+                raise  # не дубль ключа (наприклад, видалений лендінг)
+            old_id, row.id = row.id, next_visit_id()
+            self._count('reissued_ids')
+            logger.warning(f"Visit ID {old_id} is already taken; storing the visit as {row.id}")
+            db_writer.run(self._insert, row)
+
+    # Власні savepoint-и: якщо db_writer.run приєднався до зовнішньої транзакції, збій вставки її не псує
+    def _bulk_insert(self, batch):
+        with transaction.atomic():
+            self.model.objects.bulk_create(batch, batch_size=self.batch_size)
+
+    @staticmethod
+    def _insert(row):
+        with transaction.atomic():
+            row.save(force_insert=True)
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+                return
+            self._worker_pid = os.getpid()
+            self._worker = threading.Thread(target=self._run, name=f'{self.label}-ingest-flusher', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            try:
+                # Із відкладеними рядками флешер прокидається щонайменше раз на flush_interval
+                batch = [self._queue.get(timeout=self.flush_interval if self._deferred else None)]
+            except queue.Empty:
+                batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while batch and len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            close_old_connections()
+            self._write(batch)
+
+
+class InteractionIngestQueue(VisitIngestQueue):
+    """
+    Bounded buffer of unsaved interactions for the beacon fast lane.
+
+    Each batch first flushes ``visit_queue``, so interactions never reach the
+    database before their visit. The queue only holds this process' visits:
+    an interaction whose visit is still queued in another worker fails the
+    foreign key check, is kept for ``retry_window`` seconds and goes out
+    again with later batches. Interactions of visits that never appear are
+    dropped after that.
+    """
+
+    model = LandingPageInteraction
+    label = 'interaction'
+    visit_field = 'visit_id'
+    reissue_ids = False
+
+    def __init__(self, visit_queue, retry_window=INGEST_RETRY_WINDOW, **kwargs):
+        super().__init__(**kwargs)
+        self.visit_queue = visit_queue
+        self.retry_window = retry_window
+
+    def _write(self, batch):
+        self.visit_queue.flush()
+        with self.visit_queue._write_lock:
+            pass  # batch the visit flusher thread is writing right now
+        return super()._write(batch)
+
+    def _defer(self, row, error, retry_until):
+        if not isinstance(error, IntegrityError) or LandingPageVisit.objects.filter(pk=row.visit_id).exists():
+            return False
+        now = time.monotonic()
+        if retry_until is None:
+            retry_until = now + max(self.retry_window, self.flush_interval)
+        elif now >= retry_until:
+            return False
+        self._deferred.append((retry_until, row))
+        self._count('deferred')
+        return True
+
+
+class VisitSummaryBuffer:
+    """Coalesces repeated summary updates of a visit; a background flusher writes the last values."""
+
+    def __init__(self, ingest_queue, window=SUMMARY_WINDOW, retry_window=INGEST_RETRY_WINDOW, autostart=True):
+        self.ingest_queue = ingest_queue
+        self.window = window
+        self.retry_window = retry_window
+        self.autostart = autostart
+        self._pending = {}
+        self._retry_until = {}  # visit_id -> deadline of values that wait for their visit
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+        self._stats = {'submitted': 0, 'coalesced': 0, 'written': 0, 'deferred': 0, 'missing': 0, 'flushes': 0}
+
+    def submit(self, visit_id, values):
+        """
+        Record new field values for a visit.
+
+        With asynchronous ingestion disabled (``LANDING_VISIT_INGEST_ASYNC =
+        False``) the values are written immediately.
+
+        Returns:
+            bool: False if an immediate write found no such visit
+        """
+        if not getattr(settings, 'LANDING_VISIT_INGEST_ASYNC', True):
+            with self._write_lock:
+                return self._write({visit_id: values}, defer=False) == 1
+        if self.autostart:
+            self._ensure_worker()
+        with self._lock:
+            self._stats['submitted'] += 1
+            pending = self._pending.get(visit_id)
+            if pending is None:
+                self._pending[visit_id] = dict(values)
+            else:
+                # Пізніші значення замінюють ранні; поля, яких у новому пакеті немає, лишаються
+                pending.update(values)
+                self._stats['coalesced'] += 1
+        return True
+
+    async def asubmit(self, visit_id, values):
+        """
+        Async submit() for async views.
+
+        Buffering does no I/O; an immediate write goes through the async ORM.
+        """
+        if getattr(settings, 'LANDING_VISIT_INGEST_ASYNC', True):
+            return self.submit(visit_id, values)
+        updated = await LandingPageVisit.objects.filter(id=visit_id).aupdate(**values)
+        if not updated and await sync_to_async(self.ingest_queue.flush)():
+            updated = await LandingPageVisit.objects.filter(id=visit_id).aupdate(**values)
+        with self._lock:
+            self._stats['submitted'] += 1
+            self._stats['written' if updated else 'missing'] += 1
+        return bool(updated)
+
+    def discard(self, visit_id):
+        """
+        Drop pending values of a visit that is about to be written directly.
+
+        Waits for a flush in progress, so older buffered values cannot land
+        after the caller's write.
+        """
+        with self._write_lock:
+            with self._lock:
+                self._pending.pop(visit_id, None)
+                self._retry_until.pop(visit_id, None)
+
+    def flush(self):
+        """
+        Write everything pending from the calling thread.
+
+        Returns:
+            int: Number of visits updated
+        """
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            return self._write(pending) if pending else 0
+
+    def metrics(self):
+        """Snapshot of the coalescing counters plus the number of visits pending."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+        stats['window'] = self.window
+        return stats
+
+    def _write(self, pending, defer=True):
+        """
+        UPDATE each visit in ``pending``.
+
+        Visits not written yet are flushed from this process' ingest queue and
+        retried. Visits still missing may sit in another worker's queue; with
+        ``defer`` their values go back to the buffer until ``retry_window``
+        runs out, then they are counted as missing.
+        """
+        try:
+            missing = db_writer.run(self._update, pending)
+            # Флеш черги поза db_writer.run: замок черги береться раніше за замок записувача
+            if missing and self.ingest_queue.flush():
+                missing = db_writer.run(self._update, {visit_id: pending[visit_id] for visit_id in missing})
+        except Exception as e:
+            logger.error(f"Could not write {len(pending)} visit summaries: {e}", exc_info=True)
+            with self._lock:
+                self._stats['flushes'] += 1
+            return 0
+        now = time.monotonic()
+        deferred = 0
+        with self._lock:
+            for visit_id in pending.keys() - set(missing):
+                self._retry_until.pop(visit_id, None)
+            for visit_id in missing:
+                retry_until = self._retry_until.pop(visit_id, None)
+                if not defer or (retry_until is not None and now >= retry_until):
+                    continue
+                if retry_until is None:
+                    retry_until = now + max(self.retry_window, self.window)
+                # Новіші значення, що надійшли під час запису, мають перевагу
+                values = dict(pending[visit_id])
+                values.update(self._pending.get(visit_id, {}))
+                self._pending[visit_id] = values
+                self._retry_until[visit_id] = retry_until
+                deferred += 1
+            self._stats['written'] += len(pending) - len(missing)
+            self._stats['deferred'] += deferred
+            self._stats['missing'] += len(missing) - deferred
+            self._stats['flushes'] += 1
+        return len(pending) - len(missing)
+
+    @staticmethod
+    @transaction.atomic
+    def _update(pending):
+        """UPDATE each visit in ``pending``; returns the IDs of visits not in the database."""
+        return [visit_id for visit_id, values in pending.items()
+                if not LandingPageVisit.objects.filter(id=visit_id).update(**values)]
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+                return
+            self._worker_pid = os.getpid()
+            self._worker = threading.Thread(target=self._run, name='visit-summary-flusher', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.window)
+            if self._pending:
+                close_old_connections()
+                self.flush()
+
+
+visit_id_generator = SnowflakeIdGenerator()
+visit_queue = VisitIngestQueue()
+interaction_queue = InteractionIngestQueue(visit_queue)
+summary_buffer = VisitSummaryBuffer(visit_queue)
+
+
+def next_visit_id():
+    """Reserve an ID for a visit that has not been written yet."""
+    return visit_id_generator.next_id()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        visit_queue.flush()
+        interaction_queue.flush()
+        summary_buffer.flush()
+    except Exception as e:
+        logger.error(f"Could not flush visit ingest queue on exit: {e}")
@@ -0,0 +1,122 @@
+"""
+Signed Visit Tokens
+
+LandingPageView hands every visit a compact HMAC-signed token carrying the
+visit ID, landing page ID, slug and issue time. The tracking endpoints verify
+it instead of loading the visit and its landing page, so a beacon needs no
+database read before its write.
+
+Layout (URL-safe base64, no padding)::
+
+    version (1 byte) | visit_id (8) | landing_page_id (8) | issued_at (4, unix seconds) | slug | mac (16)
+
+The MAC is a truncated HMAC-SHA256 keyed from SECRET_KEY (tokens signed with
+one of SECRET_KEY_FALLBACKS are still accepted) and is compared with
+``hmac.compare_digest``; the expiry is only looked at once the MAC matched.
+"""
+
+import base64
+import binascii
+import hashlib
+import hmac
+import struct
+import time
+from functools import lru_cache
+
+from django.conf import settings
+
+TOKEN_VERSION = 1
+TOKEN_MAX_AGE = getattr(settings, 'LANDING_VISIT_TOKEN_MAX_AGE', 60 * 60 * 24)  # seconds
+TOKEN_CLOCK_SKEW = 5 * 60  # issue times this far in the future are tolerated (several app servers)
+
+_KEY_SALT = 'prometei.visit_tokens'
+_HEADER = struct.Struct('>BQQI')
+_MAC_SIZE = 16
+
+
+class InvalidVisitToken(Exception):
+    """Raised for malformed, forged and expired visit tokens."""
+
+
+class VisitToken:
+    """Verified contents of a visit token."""
+
+    __slots__ = ('visit_id', 'landing_page_id', 'slug', 'issued_at')
+
+    def __init__(self, visit_id, landing_page_id, slug, issued_at):
+        self.visit_id = visit_id
+        self.landing_page_id = landing_page_id
+        self.slug = slug
+        self.issued_at = issued_at
+
+    def __repr__(self):
+        return f'<VisitToken {self.visit_id} {self.slug}>'
+
+
+@lru_cache(maxsize=8)
+def _derive_key(secret):
+    # Як salted_hmac(), але ключ виводиться один раз, а не на кожен маяк
+    return hashlib.sha256(f'{_KEY_SALT}{secret}'.encode('utf-8')).digest()
+
+
+def _mac(key, payload):
+    return hmac.new(key, payload, hashlib.sha256).digest()[:_MAC_SIZE]
+
+
+def sign_visit_token(visit_id, landing_page_id, slug, issued_at=None):
+    """
+    Issue a token for a visit.
+
+    Args:
+        visit_id (int): ID reserved for the visit
+        landing_page_id (int): Visited landing page
+        slug (str): Its slug, used for rate-limit keys
+        issued_at (int, optional): Unix time, now by default
+
+    Returns:
+        str: URL-safe token
+    """
+    if issued_at is None:
+        issued_at = int(time.time())
+    payload = _HEADER.pack(TOKEN_VERSION, visit_id, landing_page_id, issued_at) + slug.encode('utf-8')
+    token = payload + _mac(_derive_key(settings.SECRET_KEY), payload)
+    return base64.urlsafe_b64encode(token).rstrip(b'=').decode('ascii')
+
+
+def verify_visit_token(token, max_age=None):
+    """
+    Check a visit token's signature and age without touching the database.
+
+    Args:
+        token (str): Token from the tracking payload
+        max_age (int, optional): Seconds, TOKEN_MAX_AGE by default
+
+    Returns:
+        VisitToken: Its contents
+
+    Raises:
+        InvalidVisitToken: If the token is malformed, forged or expired
+    """
+    if not isinstance(token, str) or len(token) > 512:
+        raise InvalidVisitToken('Malformed visit token.')
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+    except (binascii.Error, ValueError):
+        raise InvalidVisitToken('Malformed visit token.')
+    if len(raw) < _HEADER.size + _MAC_SIZE:
+        raise InvalidVisitToken('Malformed visit token.')
+
+    payload, mac = raw[:-_MAC_SIZE], raw[-_MAC_SIZE:]
+    valid = False
+    for secret in [settings.SECRET_KEY, *getattr(settings, 'SECRET_KEY_FALLBACKS', ())]:
+        valid |= hmac.compare_digest(mac, _mac(_derive_key(secret), payload))
+    if not valid:
+        raise InvalidVisitToken('Bad visit token signature.')
+
+    version, visit_id, landing_page_id, issued_at = _HEADER.unpack_from(payload)
+    if version != TOKEN_VERSION:
+        raise InvalidVisitToken('Unsupported visit token version.')
+    age = time.time() - issued_at
+    if age > (TOKEN_MAX_AGE if max_age is None else max_age) or age < -TOKEN_CLOCK_SKEW:
+        raise InvalidVisitToken('Visit token expired.')
+    return VisitToken(visit_id, landing_page_id, payload[_HEADER.size:].decode('utf-8'), issued_at)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+Async tracking endpoint concurrency benchmark
+
+Drives the ASGI stack in-process (``django.test.AsyncClient``, one event loop,
+i.e. one uvicorn worker) against a file-backed SQLite test database and posts
+--requests beacons to each endpoint with --concurrency requests in flight:
+
+    track        /landing/track/
+    interaction  /landing/interaction/
+    form         /landing/submit-form/
+    webhook      /payment/webhook/monobank/
+
+Settings are the production defaults: visits are ingested asynchronously (track
+heartbeats are buffered) and rate limits use the SQLite backend, with limits
+raised out of the way. Sync views are run
+by Django through ``sync_to_async`` like under uvicorn, so the same script on
+a tree with the sync views (``git stash``/``git checkout`` the previous
+commit) gives the comparison under the same worker count.
+
+Usage:
+    python scripts/bench_async_views.py [--requests 1000] [--concurrency 1 50 200]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from unittest import mock
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+os.chdir(BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+
+async def drive(client, url, payloads, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(payload):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(url, payload, content_type='application/json')
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.content
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(payload) for payload in payloads))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return len(payloads) / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 50, 200])
+    args = parser.parse_args()
+
+    import logging
+    import django
+    from django.conf import settings
+    tmp = tempfile.TemporaryDirectory()
+    # Файлова тестова БД: запити з різних потоків бачать ті самі рядки
+    settings.DATABASES['default']['TEST'] = {'NAME': os.path.join(tmp.name, 'bench.sqlite3')}
+    settings.DATABASES['default'].setdefault('OPTIONS', {})['timeout'] = 30
+    django.setup()
+    logging.disable(logging.WARNING)
+    from decimal import Decimal
+    from django.db import connection
+    from django.test import AsyncClient
+    from django.test.utils import override_settings, setup_test_environment
+    from django.urls import reverse
+    from payment.models import PaymentLink
+    from prometei.models import LandingPage, LandingPageVisit
+    from prometei.visit_tokens import sign_visit_token
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    page = LandingPage.objects.create(title='Bench', slug='bench-async', html_content='<html><body></body></html>')
+    visits = LandingPageVisit.objects.bulk_create(
+        [LandingPageVisit(landing_page=page) for _ in range(args.requests)])
+    visits = list(LandingPageVisit.objects.order_by('id'))
+    links = PaymentLink.objects.bulk_create([
+        PaymentLink(client_name='Bench', amount_usd=Decimal('1.00'), exchange_rate_usd_to_uah=Decimal('40.00'),
+                    description='Bench', status='pending')
+        for _ in range(args.requests)
+    ])
+    tokens = [sign_visit_token(visit.id, page.id, page.slug) for visit in visits]
+
+    endpoints = (
+        ('track', reverse('prometei:landing_track'),
+         [json.dumps({'visit_token': token, 'time_on_page': 12, 'metadata': {'lang': 'uk'}}) for token in tokens]),
+        ('interaction', reverse('prometei:landing_interaction'),
+         [json.dumps({'visit_token': token, 'type': 'click', 'element_id': 'cta'}) for token in tokens]),
+        ('form', reverse('prometei:landing_submit_form'),
+         [json.dumps({'landing_page_id': page.id, 'visit_id': str(visit.id), 'name': 'Bench',
+                      'contact': '+380000000000', 'message': 'Hello'}) for visit in visits]),
+        ('webhook', reverse('payment:monobank_webhook'),
+         [json.dumps({'status': 'success', 'merchantPaymInfo': {'reference': str(link.unique_id)}})
+          for link in links]),
+    )
+    no_limits = {name: '1000000/minute' for name in (
+        'RATE_LIMIT_TRACK_LP', 'RATE_LIMIT_INTERACT_LP', 'RATE_LIMIT_SUBMIT_LP')}
+
+    client = AsyncClient()
+    print(f"{'':<12} {'in flight':>9} {'req/s':>8} {'p50':>10} {'p95':>10}")
+    with override_settings(RATE_LIMIT_BACKEND='sqlite', RATE_LIMIT_SQLITE_PATH=os.path.join(tmp.name, 'rl.sqlite3'),
+                           EMAIL_OUTBOX_INLINE_WORKER=False), \
+            mock.patch.multiple('prometei.views', **no_limits):
+        for label, url, payloads in endpoints:
+            for concurrency in args.concurrency:
+                rate, p50, p95 = asyncio.run(drive(client, url, payloads, concurrency))
+                print(f"{label:<12} {concurrency:>9} {rate:>8.0f} {p50 * 1e3:>7.2f} ms {p95 * 1e3:>7.2f} ms")
+    connection.close()
+    tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
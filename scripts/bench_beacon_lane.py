@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+"""
+Beacon fast lane load benchmark
+
+Drives config.asgi in-process on one event loop (one uvicorn worker, minus
+HTTP parsing, which costs the same on both paths) and posts --requests
+beacons to each tracking endpoint with --concurrency requests in flight:
+
+    django   the Django ASGI application: full MIDDLEWARE stack and view
+    lane     config.asgi.application: prometei.beacon_lane in front of it
+
+Settings are the production defaults: asynchronous visit ingestion and the
+SQLite rate-limit backend (limits raised out of the way), with a file-backed
+SQLite test database. Beacons carry a CSRF cookie and header so the Django
+path accepts them. After each run the ingest queues are flushed and the
+interactions and visit summaries written are counted ("stored"), so queued
+beacons are checked to reach the database (the Django events view writes its
+summary directly, so only its interactions are counted).
+
+Usage:
+    python scripts/bench_beacon_lane.py [--requests 5000] [--concurrency 1 100]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from unittest import mock
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+os.chdir(BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+CSRF_TOKEN = 'b' * 32
+
+
+async def post(app, path, body):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'scheme': 'http',
+        'method': 'POST', 'path': path, 'raw_path': path.encode(), 'root_path': '', 'query_string': b'',
+        'headers': [
+            (b'host', b'localhost'),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            (b'cookie', f'csrftoken={CSRF_TOKEN}'.encode()),
+            (b'x-csrftoken', CSRF_TOKEN.encode()),
+        ],
+        'client': ('203.0.113.5', 50000), 'server': ('localhost', 80),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    status = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()  # disconnect is never sent
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+async def drive(app, path, payloads, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(body):
+        async with semaphore:
+            start = time.perf_counter()
+            status = await post(app, path, body)
+            latencies.append(time.perf_counter() - start)
+            assert status == 200, status
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(body) for body in payloads))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return len(payloads) / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 100])
+    args = parser.parse_args()
+
+    import logging
+    import django
+    from django.conf import settings
+    tmp = tempfile.TemporaryDirectory()
+    # Файлова тестова БД: фонові флашери пишуть зі своїх потоків
+    settings.DATABASES['default']['TEST'] = {'NAME': os.path.join(tmp.name, 'bench.sqlite3')}
+    settings.DATABASES['default'].setdefault('OPTIONS', {})['timeout'] = 30
+    settings.RATE_LIMIT_BACKEND = 'sqlite'
+    settings.RATE_LIMIT_SQLITE_PATH = os.path.join(tmp.name, 'rl.sqlite3')
+    django.setup()
+    logging.disable(logging.WARNING)
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    from django.urls import reverse
+    from config.asgi import application, django_application
+    from prometei import visit_ingest
+    from prometei.models import LandingPage, LandingPageInteraction, LandingPageVisit
+    from prometei.visit_tokens import sign_visit_token
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    page = LandingPage.objects.create(title='Bench', slug='bench-lane', html_content='<html><body></body></html>')
+    LandingPageVisit.objects.bulk_create([LandingPageVisit(landing_page=page) for _ in range(args.requests)])
+    tokens = [sign_visit_token(visit_id, page.id, page.slug)
+              for visit_id in LandingPageVisit.objects.order_by('id').values_list('id', flat=True)]
+
+    beacons = (
+        ('track', 'prometei:landing_track',
+         lambda token: {'visit_token': token, 'time_on_page': 12, 'metadata': {'lang': 'uk'}}),
+        ('interaction', 'prometei:landing_interaction',
+         lambda token: {'visit_token': token, 'type': 'click', 'element_id': 'cta', 'element_tag': 'BUTTON'}),
+        ('events', 'prometei:landing_events', lambda token: {
+            'visit_token': token, 'sent_at': 1_700_000_000_100,
+            'interactions': [{'type': 'click', 'element_id': f'cta-{i}', 'ts': 1_700_000_000_000} for i in range(5)],
+            'summary': {'time_on_page': 30, 'metadata': {'lang': 'uk'}},
+        }),
+    )
+    no_limits = {name: '1000000/minute' for name in (
+        'RATE_LIMIT_TRACK_LP', 'RATE_LIMIT_INTERACT_LP', 'RATE_LIMIT_EVENTS_LP')}
+
+    def stored():
+        """Interactions plus visit summaries written so far, once the flusher threads are done."""
+        time.sleep(visit_ingest.INGEST_FLUSH_INTERVAL * 2)
+        visit_ingest.interaction_queue.flush()
+        visit_ingest.summary_buffer.flush()
+        return LandingPageInteraction.objects.count() + visit_ingest.summary_buffer.metrics()['written']
+
+    print(f"{'':<12} {'app':<7} {'in flight':>9} {'req/s':>8} {'p50':>10} {'p95':>10} {'stored':>8}")
+    with mock.patch.multiple('prometei.views', **no_limits):
+        for label, url_name, build in beacons:
+            path = reverse(url_name)
+            payloads = [json.dumps(build(token)).encode() for token in tokens]
+            for concurrency in args.concurrency:
+                for app_label, app in (('django', django_application), ('lane', application)):
+                    before = stored()
+                    rate, p50, p95 = asyncio.run(drive(app, path, payloads, concurrency))
+                    print(f"{label:<12} {app_label:<7} {concurrency:>9} {rate:>8.0f} {p50 * 1e3:>7.2f} ms "
+                          f"{p95 * 1e3:>7.2f} ms {stored() - before:>8}")
+    connection.close()
+    tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+Tracking beacon throughput benchmark
+
+Posts --requests beacons to each tracking endpoint (track, interaction and a
+batched events beacon) in a throwaway test database and reports beacons per
+second, latency and the queries each beacon runs. Payloads carry both the
+visit ID and the signed visit token, so the script also runs against trees
+from before the tokens (``git stash``/``git checkout`` the previous commit)
+for a before/after comparison.
+
+The "heartbeats" line sends --heartbeats track beacons per visit with
+asynchronous ingestion on and counts the UPDATEs left after coalescing.
+
+The "lookup" line compares what happens before the write in isolation:
+
+    legacy   LandingPageVisit.objects.get(id=...) + visit.landing_page.slug
+    token    verify_visit_token(): HMAC check, no database access
+
+Usage:
+    python scripts/bench_beacons.py [--requests 2000] [--heartbeats 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from unittest import mock
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+os.chdir(BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--heartbeats', type=int, default=5)
+    args = parser.parse_args()
+
+    import logging
+    import django
+    django.setup()
+    logging.disable(logging.WARNING)
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import override_settings, setup_test_environment
+    from django.urls import reverse
+    from prometei import visit_ingest
+    from prometei.models import LandingPage, LandingPageVisit
+
+    try:
+        from prometei.visit_tokens import sign_visit_token, verify_visit_token
+    except ImportError:  # дерево до підписаних токенів
+        sign_visit_token = verify_visit_token = None
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    page = LandingPage.objects.create(title='Bench', slug='bench-beacons', html_content='<html><body></body></html>')
+    visits = [LandingPageVisit.objects.create(landing_page=page) for _ in range(args.requests)]
+
+    def identity(visit):
+        ids = {'visit_id': str(visit.id)}
+        if sign_visit_token:
+            ids['visit_token'] = sign_visit_token(visit.id, page.id, page.slug)
+        return ids
+
+    beacons = (
+        ('track', 'prometei:landing_track', lambda visit: {'time_on_page': 12, 'metadata': {'lang': 'uk'}}),
+        ('interaction', 'prometei:landing_interaction', lambda visit: {'type': 'click', 'element_id': 'cta'}),
+        ('events', 'prometei:landing_events', lambda visit: {
+            'sent_at': 1_700_000_000_100,
+            'interactions': [{'type': 'click', 'element_id': f'cta-{i}', 'ts': 1_700_000_000_000} for i in range(5)],
+            'summary': {'time_on_page': 30, 'metadata': {'lang': 'uk'}},
+        }),
+    )
+
+    client = Client()
+    print(f"{'':<12} {'beacons/s':>10} {'p50':>10} {'p95':>10} {'queries':>8}")
+    with override_settings(LANDING_VISIT_INGEST_ASYNC=False, RATE_LIMIT_BACKEND='cache'), \
+            mock.patch('prometei.views.check_rate_limit_flawless'), \
+            mock.patch('prometei.views.acheck_rate_limit_flawless', new_callable=mock.AsyncMock, create=True):
+        for label, url_name, build in beacons:
+            url = reverse(url_name)
+            payloads = [json.dumps(dict(identity(visit), **build(visit))) for visit in visits]
+            # CaptureQueriesContext is reset by request_started, so count at the cursor
+            queries = []
+            with connection.execute_wrapper(lambda execute, sql, *rest: queries.append(sql) or execute(sql, *rest)):
+                client.post(url, payloads[0], content_type='application/json')
+            latencies = []
+            start = time.perf_counter()
+            for payload in payloads:
+                request_start = time.perf_counter()
+                response = client.post(url, payload, content_type='application/json')
+                latencies.append(time.perf_counter() - request_start)
+                assert response.status_code == 200, response.content
+            elapsed = time.perf_counter() - start
+            latencies.sort()
+            print(f"{label:<12} {len(payloads) / elapsed:>10.0f} {statistics.median(latencies) * 1e3:>7.2f} ms "
+                  f"{latencies[int(len(latencies) * 0.95)] * 1e3:>7.2f} ms {len(queries):>8}")
+
+    summary_buffer = getattr(visit_ingest, 'summary_buffer', None)
+    if summary_buffer is not None:
+        summary_buffer.autostart = False
+        beating = visits[:args.requests // args.heartbeats]
+        payloads = [json.dumps(dict(identity(visit), time_on_page=beat, metadata={'lang': 'uk'}))
+                    for beat in range(args.heartbeats) for visit in beating]
+        url = reverse('prometei:landing_track')
+        updates = []
+        with override_settings(LANDING_VISIT_INGEST_ASYNC=True, RATE_LIMIT_BACKEND='cache'), \
+                mock.patch('prometei.views.check_rate_limit_flawless'), \
+                mock.patch('prometei.views.acheck_rate_limit_flawless', new_callable=mock.AsyncMock, create=True), \
+                connection.execute_wrapper(lambda execute, sql, *rest: (
+                    updates.append(sql) if sql.startswith('UPDATE') else None) or execute(sql, *rest)):
+            start = time.perf_counter()
+            for payload in payloads:
+                assert client.post(url, payload, content_type='application/json').status_code == 200
+            summary_buffer.flush()
+            elapsed = time.perf_counter() - start
+        print(f"heartbeats   {len(payloads) / elapsed:>10.0f} beacons/s, {len(payloads)} beacons -> "
+              f"{len(updates)} UPDATEs")
+
+    def per_call(func):
+        start = time.perf_counter()
+        for visit in visits:
+            func(visit)
+        return (time.perf_counter() - start) / len(visits)
+
+    legacy = per_call(lambda visit: LandingPageVisit.objects.get(id=visit.id).landing_page.slug)
+    line = f"lookup       legacy {legacy * 1e6:.1f} µs"
+    if verify_visit_token:
+        tokens = {visit.id: sign_visit_token(visit.id, page.id, page.slug) for visit in visits}
+        line += f"   token {per_call(lambda visit: verify_visit_token(tokens[visit.id]).slug) * 1e6:.1f} µs"
+    print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Form submit email latency benchmark
+
+Times the email part of a form submit (notification + confirmation, as in
+ContactPageView.form_valid) against a local SMTP stand-in with an artificial
+per-reply latency:
+
+    sync     the previous behaviour: both messages sent inside the request,
+             one SMTP connection each
+    outbox   EmailService queues both messages; the request only inserts rows.
+             The outbox is then drained separately and the delivery time and
+             SMTP connection count are reported.
+
+Usage:
+    python scripts/bench_email_outbox.py [--submits 20] [--latency-ms 60]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+os.chdir(BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ['EMAIL_HOST'] = '127.0.0.1'
+os.environ['EMAIL_USE_TLS'] = 'False'
+
+from fake_smtp_server import FakeSmtpServer
+
+server = None
+
+
+def main():
+    global server
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--submits', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=60)
+    args = parser.parse_args()
+
+    server = FakeSmtpServer(latency=args.latency_ms / 1000).start_in_thread()
+    os.environ['EMAIL_PORT'] = str(server.port)
+
+    import logging
+    import django
+    django.setup()
+    logging.disable(logging.WARNING)
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    from prometei import email_outbox
+    from prometei.email_service import EmailService
+    from prometei.models import ContactRequest, OutboundEmail
+
+    setup_test_environment()
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'  # test env swaps in locmem
+    settings.EMAIL_OUTBOX_INLINE_WORKER = False
+    connection.creation.create_test_db(verbosity=0)
+
+    def submit(i):
+        contact_request = ContactRequest.objects.create(
+            name=f'Bench {i}', contact_method=f'user{i}@example.com', message='Benchmark', request_type='contact'
+        )
+        started = time.perf_counter()
+        EmailService.send_contact_email(contact_request)
+        EmailService.send_confirmation_to_user(contact_request)
+        return time.perf_counter() - started
+
+    def report(name, latencies):
+        print(f"{name:<8} submit email time: mean={statistics.mean(latencies) * 1000:8.1f}ms  "
+              f"p50={statistics.median(latencies) * 1000:8.1f}ms  max={max(latencies) * 1000:8.1f}ms")
+
+    print(f"{args.submits} submits, SMTP stand-in with {args.latency_ms:.0f} ms per reply\n")
+
+    # Before: send inside the request
+    sync_enqueue = lambda message: SimpleNamespace(id=message.send(fail_silently=False))  # noqa: E731
+    with mock.patch.object(email_outbox, 'enqueue', sync_enqueue):
+        before = server.connections, len(server.messages)
+        report('sync', [submit(i) for i in range(args.submits)])
+    print(f"{'':<8} delivered={len(server.messages) - before[1]}  "
+          f"smtp connections={server.connections - before[0]}\n")
+
+    # After: queue in the request, deliver from the worker
+    report('outbox', [submit(i) for i in range(args.submits)])
+    before = server.connections, len(server.messages)
+    started = time.perf_counter()
+    totals = email_outbox.process_outbox()
+    elapsed = time.perf_counter() - started
+    print(f"{'':<8} worker drain: {elapsed * 1000:.0f}ms  sent={totals['sent']}  "
+          f"delivered={len(server.messages) - before[1]}  smtp connections={server.connections - before[0]}  "
+          f"still queued={OutboundEmail.objects.exclude(status=OutboundEmail.STATUS_SENT).count()}")
+
+
+if __name__ == '__main__':
+    main()
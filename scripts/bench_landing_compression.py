@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+Landing page compression benchmark
+
+Builds the render artifact of a landing page padded to --html-kb in a
+throwaway test database and compares, per request:
+
+    identity    render(): segments joined, no compression
+    gzip-live   render() + gzip.compress(level 6), what GZipMiddleware would do
+    br-live     render() + brotli.compress(quality 5)
+    gzip/br     render_encoded(): precompressed prefix + uncompressed tail
+
+and the time to build the artifact (minify + compress) at save time.
+
+Usage:
+    python scripts/bench_landing_compression.py [--html-kb 64] [--repeat 500]
+"""
+
+import argparse
+import gzip
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+os.chdir(BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+
+def per_call(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--html-kb', type=int, default=64)
+    parser.add_argument('--repeat', type=int, default=500)
+    args = parser.parse_args()
+
+    import brotli
+    import logging
+    import django
+    django.setup()
+    logging.disable(logging.WARNING)
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    from prometei.landing_renderer import compile_landing_page
+    from prometei.models import LandingPage
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+    section = ('    <section class="feature">\n'
+               '        <h2>Lorem ipsum dolor sit amet</h2>\n'
+               '        <p>Consectetur adipiscing elit, sed do eiusmod tempor incididunt.</p>\n'
+               '    </section>\n')
+    body = ''
+    while len(body) < args.html_kb * 1024:
+        body += section.replace('Lorem', f'Lorem {len(body)}')
+    page = LandingPage.objects.create(
+        title='Bench', slug='bench-compression',
+        html_content=f'<html>\n<head>\n    <title>Bench</title>\n</head>\n<body>\n{body}</body>\n</html>',
+    )
+
+    build_time = per_call(lambda: compile_landing_page(page), 5)
+    compiled = compile_landing_page(page)
+    values = {'visit_id': 370226596321243136, 'visit_token': 'x' * 60, 'csrf_token': 'x' * 64}
+    identity = compiled.render(**values)
+    print(f"page {len(page.html_content) / 1024:.1f} KB, served with tracking, minified {len(identity) / 1024:.1f} KB, "
+          f"build (minify + br + gzip) {build_time * 1e3:.1f} ms")
+
+    cases = (
+        ('identity', lambda: compiled.render(**values)),
+        ('gzip-live', lambda: gzip.compress(compiled.render(**values), 6)),
+        ('br-live', lambda: brotli.compress(compiled.render(**values), quality=5)),
+        ('gzip', lambda: compiled.render_encoded('gzip', **values)),
+        ('br', lambda: compiled.render_encoded('br', **values)),
+    )
+    print(f"{'':<10} {'bytes':>8} {'per request':>14}")
+    for label, func in cases:
+        print(f"{label:<10} {len(func()):>8} {per_call(func, args.repeat) * 1e6:>11.1f} µs")
+
+
+if __name__ == '__main__':
+    main()
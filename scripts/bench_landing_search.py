@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+Landing page search benchmark
+
+Generates --pages landing pages with realistic HTML (sections, inline CSS and
+JS, a few KB of Ukrainian copy each) in a throwaway test database and times
+the search behind find_landing_pages:
+
+    icontains   the previous filter: title OR html_content OR slug LIKE %q%,
+                which reads every html_content blob on every search
+    index       the full-text index from prometei/search.py, ranked
+
+Usage:
+    python scripts/bench_landing_search.py [--pages 10000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+os.chdir(BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+WORDS = (
+    'курс навчання школа онлайн урок викладач програма математика фізика англійська '
+    'підготовка іспит НМТ результат група заняття безкоштовно знижка реєстрація консультація '
+    'досвід студент учень батьки розклад вебінар сертифікат практика матеріали домашнє завдання '
+    'літо осінь старт місце ціна оплата відгук питання відповідь контакт телефон запис'
+).split()
+QUERIES = ['математика', 'англійська онлайн', 'вебінар', 'знижка літо', 'сертифікат практика', 'рідкісне']
+
+
+def paragraph(rng, words=60):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def page_html(rng, i):
+    sections = ''.join(
+        f'<section class="block-{s}"><h2>{paragraph(rng, 4)}</h2><p>{paragraph(rng)}</p>'
+        f'<p>{paragraph(rng)}</p><a class="cta" href="#form">{paragraph(rng, 2)}</a></section>'
+        for s in range(rng.randint(4, 10))
+    )
+    return (
+        f'<!DOCTYPE html><html lang="uk"><head><meta charset="utf-8"><title>Сторінка {i}</title>'
+        f'<style>.block-0{{padding:2rem}} .cta{{color:#fff;background:#0a6}}</style></head>'
+        f'<body><header><nav>Головна | Курси | Контакти</nav></header>{sections}'
+        f'<form id="form"><input name="name"><input name="phone"><button>Записатися</button></form>'
+        f'<script>document.querySelectorAll(".cta").forEach(function (a) {{ a.dataset.page = {i}; }});</script>'
+        f'</body></html>'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    import logging
+    import django
+    django.setup()
+    logging.disable(logging.WARNING)
+    from django.db import connection
+    from django.db.models import Q
+    from django.test.utils import setup_test_environment
+    from prometei import search
+    from prometei.landing_page_generator import find_landing_pages
+    from prometei.models import LandingPage
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+    rng = random.Random(42)
+    pages = [
+        LandingPage(title=paragraph(rng, 4), slug=f'bench-{i}', html_content=page_html(rng, i))
+        for i in range(args.pages)
+    ]
+    pages[-1].html_content = pages[-1].html_content.replace('</body>', '<p>рідкісне слово</p></body>')
+    LandingPage.objects.bulk_create(pages, batch_size=500)  # bulk_create не викликає сигнали
+    html_mb = sum(len(p.html_content.encode()) for p in pages) / 1024 / 1024
+
+    started = time.perf_counter()
+    search.rebuild_index()
+    print(f"{args.pages} pages, {html_mb:.1f} MB of HTML, index built in {time.perf_counter() - started:.1f}s "
+          f"({search.backend()})\n")
+
+    def legacy(q):
+        return LandingPage.objects.filter(
+            Q(title__icontains=q) | Q(html_content__icontains=q) | Q(slug__icontains=q)
+        ).order_by('-created_at')
+
+    def timed(build, q):
+        latencies = []
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            rows = list(build(q).values_list('id', flat=True)[:50])
+            latencies.append(time.perf_counter() - t)
+        return statistics.median(latencies), len(rows)
+
+    print(f"{'query':<22}{'icontains':>14}{'index':>14}{'speedup':>10}")
+    for q in QUERIES:
+        (old, old_rows), (new, new_rows) = timed(legacy, q), timed(find_landing_pages, q)
+        print(f"{q:<22}{old * 1000:>10.1f} ms{new * 1000:>10.1f} ms{old / new:>9.1f}x   "
+              f"(rows {old_rows}/{new_rows})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Landing page template rendering benchmark
+
+Loads the default templates (``load_default_templates``) into a throwaway test
+database, pads their HTML to --html-kb, and times variable substitution:
+
+    replace    the previous code: one str.replace pass over the HTML per variable
+    compiled   prometei/landing_templates.py: cached segments, a single join
+
+and then stamps out --pages pages one by one through
+``LandingPageTemplate.create_landing_page`` and in one call through
+``create_landing_pages_from_template``.
+
+Usage:
+    python scripts/bench_landing_templates.py [--html-kb 64] [--repeat 500] [--pages 300]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+os.chdir(BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+
+def legacy_render(template_content, template_variables):
+    html_content = template_content
+    for key, value in template_variables.items():
+        html_content = html_content.replace(f"{{{{{key}}}}}", str(value))
+    return html_content
+
+
+def per_call(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--html-kb', type=int, default=64)
+    parser.add_argument('--repeat', type=int, default=500)
+    parser.add_argument('--pages', type=int, default=300)
+    args = parser.parse_args()
+
+    import logging
+    import django
+    django.setup()
+    logging.disable(logging.WARNING)
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    from prometei.landing_page_generator import create_landing_pages_from_template
+    from prometei.landing_templates import compile_template, get_compiled_template
+    from prometei.models import LandingPage, LandingPageTemplate
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    call_command('load_default_templates', stdout=open(os.devnull, 'w'))
+
+    for template in LandingPageTemplate.objects.order_by('name'):
+        padding = '<section><p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p></section>\n'
+        body = template.html_template
+        while len(body) < args.html_kb * 1024:
+            body = body.replace('</body>', padding * 20 + '</body>', 1)
+        template.html_template = body
+        template.save()
+
+        variables = {name: f'value of {name}' for name in template.available_variables}
+        report = compile_template(body, variables).check(variables)
+        print(f"{template.name}: {len(body) // 1024} KB, {len(variables)} variables, missing {report['missing']}")
+
+        replace_time = per_call(lambda: legacy_render(body, variables), args.repeat)
+        compiled_time = per_call(lambda: get_compiled_template(template).render(variables), args.repeat)
+        assert legacy_render(body, variables) == get_compiled_template(template).render(variables)
+        print(f"  render    replace {replace_time * 1e3:7.3f} ms   compiled {compiled_time * 1e3:7.3f} ms")
+
+        start = time.perf_counter()
+        for i in range(args.pages):
+            template.create_landing_page(title=f'Bench {i}', variables=variables)
+        elapsed = time.perf_counter() - start
+        print(f"  create    {args.pages} pages in {elapsed:.2f} s ({elapsed / args.pages * 1e3:.2f} ms/page)")
+
+        start = time.perf_counter()
+        create_landing_pages_from_template(template, [
+            {'title': f'Bulk {i}', 'variables': variables} for i in range(args.pages)
+        ])
+        elapsed = time.perf_counter() - start
+        print(f"  bulk      {args.pages} pages in {elapsed:.2f} s ({elapsed / args.pages * 1e3:.2f} ms/page)")
+    print(f"{LandingPage.objects.count()} pages created")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Monobank client connection-reuse benchmark
+
+Calls check_payment_status against the local stand-in
+(scripts/fake_monobank_server.py) and reports latency and how many TCP
+connections were opened:
+
+    legacy   module-level requests.get per call (the previous code)
+    pooled   MonobankAcquiringService on the process-wide keep-alive session
+    async    AsyncMonobankAcquiringService, --concurrency calls in flight
+
+Usage:
+    python scripts/bench_monobank_client.py [--calls 200] [--latency-ms 20]
+                                            [--handshake-ms 60] [--concurrency 10]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure(MONOBANK_TOKEN='bench-token', ROOT_URLCONF=[])
+    django.setup()
+
+import requests
+
+from fake_monobank_server import FakeMonobankServer
+from payment.monobank_service import AsyncMonobankAcquiringService, MonobankAcquiringService
+
+
+def report(name, server, before, latencies, elapsed):
+    latencies = sorted(latencies)
+    p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+    print(f"{name:<7} {len(latencies) / elapsed:8.1f} calls/s  mean={statistics.mean(latencies) * 1000:7.1f}ms  "
+          f"p50={statistics.median(latencies) * 1000:7.1f}ms  p99={p99 * 1000:7.1f}ms  "
+          f"connections={server.connections - before}")
+
+
+def timed(call):
+    started = time.perf_counter()
+    call()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--handshake-ms', type=float, default=60)
+    parser.add_argument('--concurrency', type=int, default=10)
+    args = parser.parse_args()
+
+    server = FakeMonobankServer(latency=args.latency_ms / 1000, handshake_latency=args.handshake_ms / 1000)
+    server.start_in_thread()
+    status_url = f'{server.url}/api/merchant/invoice/status'
+    headers = {'X-Token': 'bench-token'}
+    print(f"{args.calls} status checks, {args.latency_ms:.0f} ms per request, "
+          f"{args.handshake_ms:.0f} ms per new connection\n")
+
+    before, started = server.connections, time.perf_counter()
+    latencies = [
+        timed(lambda: requests.get(status_url, headers=headers, params={'invoiceId': 'x'}, timeout=30).json())
+        for _ in range(args.calls)
+    ]
+    report('legacy', server, before, latencies, time.perf_counter() - started)
+
+    service = MonobankAcquiringService(base_url=server.url)
+    before, started = server.connections, time.perf_counter()
+    latencies = [timed(lambda: service.check_payment_status('x')) for _ in range(args.calls)]
+    report('pooled', server, before, latencies, time.perf_counter() - started)
+
+    async_service = AsyncMonobankAcquiringService(base_url=server.url)
+
+    async def run_async():
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies = []
+
+        async def one():
+            async with semaphore:
+                t = time.perf_counter()
+                await async_service.check_payment_status('x')
+                latencies.append(time.perf_counter() - t)
+
+        await asyncio.gather(*(one() for _ in range(args.calls)))
+        return latencies
+
+    before, started = server.connections, time.perf_counter()
+    latencies = asyncio.run(run_async())
+    report('async', server, before, latencies, time.perf_counter() - started)
+
+
+if __name__ == '__main__':
+    main()
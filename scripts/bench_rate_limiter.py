@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Rate limiter microbenchmark
+
+Runs several worker processes that hammer the same rate-limit key at the same
+time and reports per-check latency and how many requests each backend let
+through. The legacy get/set/incr check on a per-process LocMemCache lets
+through roughly ``limit x processes``; the shared backends stay at ``limit``.
+
+Usage:
+    python scripts/bench_rate_limiter.py [--processes 4] [--checks 2000] [--limit 100]
+                                         [--redis-url redis://host:port/0]
+
+Without --redis-url the Redis backend runs against the bundled stand-in
+(scripts/fake_redis_server.py), which measures protocol overhead rather than
+real Redis throughput.
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    django.setup()
+
+from fake_redis_server import FakeRedisServer
+from prometei.rate_limit import RateLimiter, build_backend
+
+PERIOD = 60
+
+
+def legacy_check(cache, key, limit):
+    """The previous check_rate_limit_flawless algorithm."""
+    count = cache.get(key, 0)
+    if count >= limit:
+        return False
+    if count == 0:
+        cache.set(key, 1, timeout=PERIOD)
+    else:
+        cache.incr(key)
+    return True
+
+
+def worker(backend_name, options, checks, limit, start_at, results):
+    if backend_name == 'legacy-locmem':
+        from django.core.cache import cache
+        check = lambda: legacy_check(cache, 'rl::bench', limit)  # noqa: E731
+    else:
+        limiter = RateLimiter(build_backend(backend_name, **options))
+        check = lambda: limiter.hit('bench', limit, PERIOD)[0]  # noqa: E731
+
+    while time.time() < start_at:
+        time.sleep(0.001)
+    latencies = []
+    allowed = 0
+    for _ in range(checks):
+        started = time.perf_counter()
+        allowed += check()
+        latencies.append(time.perf_counter() - started)
+    results.put((allowed, latencies))
+
+
+def run(backend_name, options, processes, checks, limit):
+    results = multiprocessing.Queue()
+    start_at = time.time() + 0.5
+    procs = [
+        multiprocessing.Process(target=worker, args=(backend_name, options, checks, limit, start_at, results))
+        for _ in range(processes)
+    ]
+    for p in procs:
+        p.start()
+    collected = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    allowed = sum(a for a, _ in collected)
+    latencies = sorted(l for _, ls in collected for l in ls)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{backend_name:<14} allowed={allowed:>6} (limit {limit})  "
+          f"mean={statistics.mean(latencies) * 1e6:8.1f}us  "
+          f"p50={statistics.median(latencies) * 1e6:8.1f}us  p99={p99 * 1e6:8.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--checks', type=int, default=2000)
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--redis-url')
+    args = parser.parse_args()
+
+    multiprocessing.set_start_method('fork')
+    redis_url = args.redis_url
+    if not redis_url:
+        redis_url = FakeRedisServer().start_in_thread().url
+
+    print(f"{args.processes} processes x {args.checks} checks on one key\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        scenarios = [
+            ('legacy-locmem', {}),
+            ('cache', {}),
+            ('sqlite', {'path': os.path.join(tmp, 'ratelimit.sqlite3')}),
+            ('redis', {'url': redis_url}),
+        ]
+        for name, options in scenarios:
+            run(name, options, args.processes, args.checks, args.limit)
+
+
+if __name__ == '__main__':
+    main()
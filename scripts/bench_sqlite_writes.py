@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+"""
+Multi-process SQLite write benchmark
+
+Forks --processes workers (WEB_CONCURRENCY in render.yaml) with --threads
+threads each. They hammer one file-backed SQLite test database with the
+tracking hot path's writes, --ops rounds per thread:
+
+    visit        INSERT of a visit (ingest with LANDING_VISIT_INGEST_ASYNC off)
+    submit       read the visit, then INSERT an interaction in one transaction
+                 (the form submission)
+    track        UPDATE of the visit summary
+    read         a small read, as page hits do between the writes
+
+It runs twice, each time on a fresh database file:
+
+    default      Django's SQLite defaults: rollback journal, deferred
+                 transactions, a 5 s lock wait, writes issued directly
+    tuned        prometei.sqlite_tuning pragmas (WAL, synchronous=NORMAL,
+                 busy_timeout, cache/mmap) and writes through db_writer,
+                 which opens them with BEGIN IMMEDIATE; reads stay deferred
+
+and reports operations per second, write latency and the share of
+operations that failed with "database is locked".
+
+Usage:
+    python scripts/bench_sqlite_writes.py [--processes 4] [--threads 4] [--ops 200]
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+os.chdir(BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+
+def worker(page_id, ops, threads, tuned, results):
+    from django.db import OperationalError, connection, transaction
+    from prometei.models import LandingPage, LandingPageInteraction, LandingPageVisit
+    from prometei.sqlite_tuning import db_writer, is_lock_error
+    from prometei.visit_ingest import next_visit_id
+
+    def insert_visit():
+        visit = LandingPageVisit(id=next_visit_id(), landing_page_id=page_id)
+        visit.save(force_insert=True)
+        return visit.id
+
+    def submit(visit_id):
+        with transaction.atomic():
+            if LandingPageVisit.objects.filter(id=visit_id).exists():
+                LandingPageInteraction.objects.create(visit_id=visit_id, interaction_type='submit', element_type='FORM')
+
+    def track(visit_id, seconds):
+        LandingPageVisit.objects.filter(id=visit_id).update(time_spent=seconds)
+
+    def write(func, *args):
+        return db_writer.run(func, *args) if tuned else func(*args)
+
+    stats = {'ok': 0, 'locked': 0, 'failed': 0, 'latencies': []}
+    lock = threading.Lock()
+
+    def run():
+        visit_id = None
+        for i in range(ops):
+            for name in ('visit', 'submit', 'track', 'read'):
+                start = time.perf_counter()
+                try:
+                    if name == 'visit':
+                        visit_id = write(insert_visit)
+                    elif name == 'submit':
+                        write(submit, visit_id)
+                    elif name == 'track':
+                        write(track, visit_id, i)
+                    else:
+                        LandingPage.objects.filter(id=page_id).values_list('slug', flat=True).first()
+                    outcome = 'ok'
+                except OperationalError as e:
+                    outcome = 'locked' if is_lock_error(e) else 'failed'
+                elapsed = time.perf_counter() - start
+                with lock:
+                    stats[outcome] += 1
+                    if name != 'read':
+                        stats['latencies'].append(elapsed)
+        connection.close()
+
+    pool = [threading.Thread(target=run) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put(stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--ops', type=int, default=200)
+    args = parser.parse_args()
+
+    import logging
+    import django
+    from django.conf import settings
+    django.setup()
+    logging.disable(logging.WARNING)
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    from prometei.models import LandingPage
+
+    setup_test_environment()
+    context = multiprocessing.get_context('fork')
+    tmp = tempfile.TemporaryDirectory()
+    print(f"{args.processes} processes x {args.threads} threads x {args.ops} rounds (4 operations each)")
+    print(f"{'':<8} {'ops/s':>8} {'write p50':>11} {'write p95':>11} {'locked':>8} {'failed':>7}")
+    for mode in ('default', 'tuned'):
+        tuned = mode == 'tuned'
+        settings.SQLITE_TUNING = tuned
+        connection.settings_dict['TEST']['NAME'] = os.path.join(tmp.name, f'{mode}.sqlite3')
+        connection.close()
+        connection.creation.create_test_db(verbosity=0)
+        page_id = LandingPage.objects.create(title='Bench', slug='bench-sqlite', html_content='<html></html>').id
+        connection.close()
+
+        results = context.Queue()
+        processes = [context.Process(target=worker, args=(page_id, args.ops, args.threads, tuned, results))
+                     for _ in range(args.processes)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        stats = [results.get() for _ in processes]
+        elapsed = time.perf_counter() - start
+        for process in processes:
+            process.join()
+
+        total = {name: sum(s[name] for s in stats) for name in ('ok', 'locked', 'failed')}
+        latencies = sorted(latency for s in stats for latency in s['latencies'])
+        attempts = sum(total.values())
+        print(f"{mode:<8} {total['ok'] / elapsed:>8.0f} {statistics.median(latencies) * 1e3:>8.2f} ms "
+              f"{latencies[int(len(latencies) * 0.95)] * 1e3:>8.2f} ms {total['locked'] / attempts:>7.1%} "
+              f"{total['failed']:>7}")
+    tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+"""
+Tracking payload sanitizer benchmark
+
+Times the cleaning of a typical tracking-script payload (metadata from
+extractMetadata() plus a batch of interactions) and the tracking endpoints
+end to end, in a throwaway test database:
+
+    bleach   the previous code: bleach.clean on every key, value and field
+    schema   prometei/payload_schema.py: typed fields, bleach only for text with markup
+
+Usage:
+    python scripts/bench_tracking_payload.py [--repeat 2000] [--requests 300]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from unittest import mock
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+os.chdir(BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+METADATA = {
+    'screen': {'w': 1920, 'h': 1080, 'cd': 24},
+    'viewport': {'w': 1903, 'h': 961},
+    'browser': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+               'Chrome/126.0.0.0 Safari/537.36',
+    'lang': 'uk-UA',
+    'tz': 'Europe/Kyiv',
+    'cookies': True,
+    'fbCookies': {'_fbp': True, '_fbc': True},
+}
+INTERACTIONS = [
+    {'element_id': f'cta-button-{i}', 'element_tag': 'BUTTON', 'type': 'click', 'ts': 1_700_000_000_000 + i}
+    for i in range(10)
+]
+
+
+def legacy_metadata(raw):
+    import bleach
+    clean = {}
+    for k, v in raw.items():
+        key = bleach.clean(str(k)[:50])
+        if isinstance(v, (str, int, float, bool)):
+            clean[key] = bleach.clean(str(v)[:200])
+        elif isinstance(v, list):
+            clean[key] = [bleach.clean(str(i)[:100]) for i in v[:20]]
+        elif isinstance(v, dict):
+            clean[key] = {bleach.clean(str(sk)[:50]): bleach.clean(str(sv)[:100]) for sk, sv in v.items()}
+        else:
+            clean[key] = 'Unsupported data type'
+    return clean
+
+
+def legacy_element(element_id, element_tag):
+    import bleach
+    return (bleach.clean(str(element_id)[:150]) if element_id else '',
+            bleach.clean(str(element_tag)[:50]) if element_tag else '')
+
+
+class LegacySchema:
+    @staticmethod
+    def clean(value):
+        return legacy_metadata(value)
+
+
+def per_call(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def timed_requests(client, url, payloads):
+    latencies = []
+    for payload in payloads:
+        start = time.perf_counter()
+        response = client.post(url, payload, content_type='application/json')
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.content
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+
+    import logging
+    import django
+    django.setup()
+    logging.disable(logging.WARNING)
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import override_settings, setup_test_environment
+    from django.urls import reverse
+    from prometei.models import LandingPage, LandingPageVisit
+    from prometei.payload_schema import METADATA_SCHEMA, clean_element
+    from prometei.visit_tokens import sign_visit_token
+
+    def legacy_payload():
+        legacy_metadata(METADATA)
+        for event in INTERACTIONS:
+            legacy_element(event['element_id'], event['element_tag'])
+
+    def schema_payload():
+        METADATA_SCHEMA.clean(METADATA)
+        for event in INTERACTIONS:
+            clean_element(event['element_id'], event['element_tag'])
+
+    print(f"{'':<8} {'payload':>12} {'events p50':>12} {'events p95':>12} {'track p50':>12}")
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    page = LandingPage.objects.create(title='Bench', slug='bench-tracking', html_content='<html><body></body></html>')
+    client = Client()
+    with override_settings(LANDING_VISIT_INGEST_ASYNC=False, RATE_LIMIT_BACKEND='cache'):
+        for label, payload_func, patches in (
+            ('bleach', legacy_payload, {'METADATA_SCHEMA': LegacySchema, 'clean_element': legacy_element}),
+            ('schema', schema_payload, {}),
+        ):
+            with mock.patch.multiple('prometei.views', check_rate_limit_flawless=mock.DEFAULT, **patches), \
+                    mock.patch('prometei.views.acheck_rate_limit_flawless', new_callable=mock.AsyncMock):
+                payload_time = per_call(payload_func, args.repeat)
+                visits = [LandingPageVisit.objects.create(landing_page=page) for _ in range(args.requests)]
+                tokens = [sign_visit_token(visit.id, page.id, page.slug) for visit in visits]
+                events = [json.dumps({'visit_token': token, 'sent_at': 1_700_000_000_100, 'interactions': INTERACTIONS,
+                                      'summary': {'time_on_page': 30, 'metadata': METADATA}}) for token in tokens]
+                track = [json.dumps({'visit_token': token, 'time_on_page': 30, 'metadata': METADATA})
+                         for token in tokens]
+                events_p50, events_p95 = timed_requests(client, reverse('prometei:landing_events'), events)
+                track_p50, _ = timed_requests(client, reverse('prometei:landing_track'), track)
+            print(f"{label:<8} {payload_time * 1e3:>9.3f} ms {events_p50 * 1e3:>9.2f} ms "
+                  f"{events_p95 * 1e3:>9.2f} ms {track_p50 * 1e3:>9.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
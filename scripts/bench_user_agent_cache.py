@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""
+User-Agent parsing benchmark
+
+Replays a User-Agent distribution through plain ``user_agents.parse`` and
+through the cached ``UserAgentCache`` and reports the per-lookup latency and
+the cache hit rate.
+
+Usage:
+    python scripts/bench_user_agent_cache.py [--requests 20000] [--cache-size 4096]
+                                             [--ua-file user_agents.txt]
+
+--ua-file takes captured traffic, one User-Agent per line (repeats included),
+e.g. ``cut -d'"' -f6 access.log`` or an export of LandingPageVisit.user_agent.
+Without it the bundled strings are sampled with a Zipf-like skew: a handful of
+current mobile browsers take most of the traffic, then a long tail of rare
+and bot User-Agents.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    django.setup()
+
+from prometei.user_agent_cache import UserAgentCache, parse_families
+
+SAMPLE_USER_AGENTS = [
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (Linux; Android 10; K) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15',
+    'Mozilla/5.0 (Linux; Android 14; SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.6478.71 Mobile Safari/537.36',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) CriOS/126.0.6478.54 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:127.0) Gecko/20100101 Firefox/127.0',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36 Edg/126.0.0.0',
+    'Mozilla/5.0 (Linux; Android 13; Redmi Note 12) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.6422.165 Mobile Safari/537.36',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 16_7_8 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.6 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (Linux; Android 12; SAMSUNG SM-A525F) AppleWebKit/537.36 (KHTML, like Gecko) SamsungBrowser/25.0 Chrome/121.0.0.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148 [FBAN/FBIOS;FBAV/470.0.0.38.108;FBBV/614540516]',
+    'Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.6478.71 Mobile Safari/537.36 Instagram 337.0.0.37.103 Android',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:127.0) Gecko/20100101 Firefox/127.0',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36 OPR/111.0.0.0',
+    'Mozilla/5.0 (iPad; CPU OS 17_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (Linux; Android 11; moto g(30)) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.6367.179 Mobile Safari/537.36',
+    'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)',
+    'facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)',
+    'TelegramBot (like TwitterBot)',
+    'Mozilla/5.0 (compatible; bingbot/2.0; +http://www.bing.com/bingbot.htm)',
+    'curl/8.5.0',
+    'python-requests/2.32.3',
+]
+
+
+def build_distribution(count, seed=1):
+    """Zipf-like traffic over the bundled strings, plus rare one-off variants."""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** 1.2 for rank in range(len(SAMPLE_USER_AGENTS))]
+    traffic = rng.choices(SAMPLE_USER_AGENTS, weights=weights, k=count)
+    # ~2% унікальних рядків (нові збірки, боти) - справжні промахи кешу
+    for i in rng.sample(range(count), count // 50):
+        traffic[i] = f'{traffic[i]} build/{rng.randrange(10 ** 6)}'
+    return traffic
+
+
+def timed(func, traffic):
+    latencies = []
+    for user_agent in traffic:
+        start = time.perf_counter()
+        func(user_agent)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(label, latencies):
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    print(f"{label:<10} {len(latencies) / total:>10.0f}/s  mean {statistics.mean(latencies) * 1e6:8.1f} us  "
+          f"p50 {latencies[len(latencies) // 2] * 1e6:8.1f} us  p99 {latencies[int(len(latencies) * 0.99)] * 1e6:8.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--cache-size', type=int, default=4096)
+    parser.add_argument('--ua-file', help='Captured User-Agents, one per line')
+    args = parser.parse_args()
+
+    if args.ua_file:
+        with open(args.ua_file, encoding='utf-8', errors='replace') as f:
+            traffic = [line.rstrip('\n') for line in f if line.strip()][:args.requests]
+    else:
+        traffic = build_distribution(args.requests)
+    print(f"{len(traffic)} lookups, {len(set(traffic))} distinct User-Agents")
+
+    cache = UserAgentCache(maxsize=args.cache_size, shared=False)
+    report('uncached', timed(parse_families, traffic))
+    report('cached', timed(cache.get, traffic))
+    stats = cache.stats()
+    print(f"hit rate {stats['hit_rate']:.1%}, size {stats['size']}/{stats['maxsize']}, "
+          f"evictions {stats['evictions']}")
+
+
+if __name__ == '__main__':
+    main()
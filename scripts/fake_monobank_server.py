@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+"""
+Local Monobank acquiring API stand-in
+
+A threaded HTTP/1.1 server with keep-alive that implements the two endpoints
+MonobankAcquiringService uses:
+
+    POST /api/merchant/invoice/create   -> {"invoiceId", "pageUrl"}
+    GET  /api/merchant/invoice/status   -> {"invoiceId", "status", ...}
+
+``handshake_latency`` is paid once per new TCP connection (standing in for
+the TCP + TLS handshake to api.monobank.ua) and ``latency`` once per request.
+The server counts connections and requests so connection reuse can be
+measured. ``fail_next`` makes the next N requests answer 503. Not for
+production use.
+
+Usage:
+    python scripts/fake_monobank_server.py [port] [latency_ms] [handshake_ms]
+
+Then point the app at it with MONOBANK_API_URL=http://127.0.0.1:<port>.
+"""
+
+import json
+import socket
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class MonobankHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.lock:
+            self.server.connections += 1
+        if self.server.handshake_latency:
+            time.sleep(self.server.handshake_latency)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _begin(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        with server.lock:
+            server.requests += 1
+            if server.fail_next:
+                server.fail_next -= 1
+                return False
+        return True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        if not self._begin():
+            return self._send_json(503, {'errCode': 'UNAVAILABLE'})
+        if urlparse(self.path).path != '/api/merchant/invoice/create':
+            return self._send_json(404, {'errCode': 'NOT_FOUND'})
+        invoice_id = uuid.uuid4().hex[:20]
+        with self.server.lock:
+            self.server.invoices[invoice_id] = {
+                'status': 'created',
+                'amount': payload.get('amount'),
+                'reference': payload.get('merchantPaymInfo', {}).get('reference'),
+            }
+        self._send_json(200, {'invoiceId': invoice_id, 'pageUrl': f'https://pay.example/{invoice_id}'})
+
+    def do_GET(self):
+        if not self._begin():
+            return self._send_json(503, {'errCode': 'UNAVAILABLE'})
+        url = urlparse(self.path)
+        if url.path != '/api/merchant/invoice/status':
+            return self._send_json(404, {'errCode': 'NOT_FOUND'})
+        invoice_id = parse_qs(url.query).get('invoiceId', [''])[0]
+        with self.server.lock:
+            invoice = self.server.invoices.get(invoice_id)
+            status = invoice['status'] if invoice else self.server.default_status
+        if status is None:
+            return self._send_json(400, {'errCode': 'INVOICE_NOT_FOUND'})
+        self._send_json(200, {
+            'invoiceId': invoice_id,
+            'status': status,
+            'amount': invoice and invoice['amount'],
+            'ccy': 980,
+            'reference': invoice and invoice['reference'],
+        })
+
+
+class FakeMonobankServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', 0), latency=0.0, handshake_latency=0.0, default_status='success'):
+        super().__init__(address, MonobankHandler)
+        self.latency = latency
+        self.handshake_latency = handshake_latency
+        self.default_status = default_status
+        self.invoices = {}
+        self.connections = 0
+        self.requests = 0
+        self.fail_next = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start_in_thread(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 0
+    handshake_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 0
+    server = FakeMonobankServer(('127.0.0.1', port), latency=latency_ms / 1000, handshake_latency=handshake_ms / 1000)
+    print(f"Fake Monobank API on {server.url} ({latency_ms:.0f} ms per request, {handshake_ms:.0f} ms per connection)")
+    server.serve_forever()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Local Redis stand-in
+
+A tiny threaded server that speaks enough of the Redis protocol (RESP) for
+the rate limiter and benchmarks: PING, GET, SET, INCR, EXPIRE, DEL, FLUSHDB,
+SELECT and AUTH. Keys expire lazily. Not for production use.
+
+Usage:
+    python scripts/fake_redis_server.py [port]
+"""
+
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        super().setup()
+
+    def _read_command(self):
+        header = self.rfile.readline()
+        if not header:
+            return None
+        if not header.startswith(b'*'):
+            return header.decode().split()
+        args = []
+        for _ in range(int(header[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2].decode())
+        return args
+
+    @staticmethod
+    def _bulk(value):
+        if value is None:
+            return b'$-1\r\n'
+        value = str(value).encode()
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+
+    def handle(self):
+        server = self.server
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            command, args = args[0].upper(), args[1:]
+            with server.lock:
+                now = time.monotonic()
+                for key in args[:1]:
+                    expires = server.expires.get(key)
+                    if expires is not None and expires <= now:
+                        server.store.pop(key, None)
+                        server.expires.pop(key, None)
+                if command == 'PING':
+                    reply = b'+PONG\r\n'
+                elif command in ('SELECT', 'AUTH', 'FLUSHDB'):
+                    if command == 'FLUSHDB':
+                        server.store.clear()
+                        server.expires.clear()
+                    reply = b'+OK\r\n'
+                elif command == 'GET':
+                    reply = self._bulk(server.store.get(args[0]))
+                elif command == 'SET':
+                    server.store[args[0]] = args[1]
+                    server.expires.pop(args[0], None)
+                    reply = b'+OK\r\n'
+                elif command == 'INCR':
+                    value = int(server.store.get(args[0], 0)) + 1
+                    server.store[args[0]] = value
+                    reply = b':%d\r\n' % value
+                elif command == 'EXPIRE':
+                    exists = args[0] in server.store
+                    if exists:
+                        server.expires[args[0]] = now + int(args[1])
+                    reply = b':%d\r\n' % exists
+                elif command == 'DEL':
+                    removed = sum(server.store.pop(key, None) is not None for key in args)
+                    reply = b':%d\r\n' % removed
+                else:
+                    reply = f'-ERR unknown command {command}\r\n'.encode()
+            self.wfile.write(reply)
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', 0)):
+        super().__init__(address, RespHandler)
+        self.store = {}
+        self.expires = {}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'redis://{host}:{port}/0'
+
+    def start_in_thread(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 6399
+    server = FakeRedisServer(('127.0.0.1', port))
+    print(f"Fake Redis listening on {server.url}")
+    server.serve_forever()
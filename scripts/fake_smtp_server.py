@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+Local SMTP stand-in
+
+A tiny threaded SMTP server that accepts every message and keeps it in
+memory. ``latency`` is added before each reply to imitate a remote provider
+(Gmail's submission port is typically 50-150 ms per round trip). Any AUTH is
+accepted and there is no TLS, so point Django at it with EMAIL_USE_TLS=False.
+Not for production use.
+
+Usage:
+    python scripts/fake_smtp_server.py [port] [latency_ms]
+"""
+
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        super().setup()
+
+    def reply(self, line):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply('220 fake-smtp ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith('EHLO'):
+                self.reply('250-fake-smtp\r\n250 AUTH PLAIN LOGIN')
+            elif command.startswith('HELO'):
+                self.reply('250 fake-smtp')
+            elif command.startswith('AUTH'):
+                self.reply('235 Authentication successful')
+            elif command.startswith(('MAIL', 'RCPT', 'RSET', 'NOOP')):
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk == b'.\r\n':
+                        break
+                    data.append(chunk)
+                with server.lock:
+                    server.messages.append(b''.join(data))
+                self.reply('250 OK queued')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class FakeSmtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', 0), latency=0.0):
+        super().__init__(address, SmtpHandler)
+        self.latency = latency
+        self.messages = []
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start_in_thread(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 2525
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 0
+    server = FakeSmtpServer(('127.0.0.1', port), latency=latency_ms / 1000)
+    print(f"Fake SMTP listening on 127.0.0.1:{server.port} ({latency_ms:.0f} ms per reply)")
+    server.serve_forever()
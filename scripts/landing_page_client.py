@@ -7,7 +7,7 @@ A simple Python client for the Prometey Landing Page API.
 
 import requests
 import json
-from typing import Dict, List, Optional, Union, Any
+from typing import Dict, Iterator, List, Optional, Union, Any
 
 
 class LandingPageClient:
@@ -103,7 +103,36 @@ class LandingPageClient:
         )
         self._check_response(response)
         return response.json()
-    
+
+    def create_from_template_bulk(
+        self,
+        template_id: int,
+        pages: List[Dict[str, Any]],
+        chunk_size: int = 500
+    ) -> List[Dict[str, Any]]:
+        """
+        Create many landing pages from one template.
+
+        Args:
+            template_id: ID of the template to use
+            pages: One dict per page with 'title' and optional 'variables',
+                'google_pixel_id', 'facebook_pixel_id', 'meta_robots', 'is_active'
+            chunk_size: Pages per request (the server accepts up to 1000); each
+                request is created atomically
+
+        Returns:
+            List of created landing pages (id, title, url, slug, is_active), in order
+        """
+        created = []
+        for offset in range(0, len(pages), chunk_size):
+            response = self.session.post(
+                f"{self.api_base}/landing-page-templates/create-pages/",
+                json={'template_id': template_id, 'pages': pages[offset:offset + chunk_size]}
+            )
+            self._check_response(response)
+            created.extend(response.json().get('landing_pages', []))
+        return created
+
     def create_landing_page(
         self, 
         title: str, 
@@ -140,6 +169,38 @@ class LandingPageClient:
         self._check_response(response)
         return response.json()
     
+    def iter_landing_pages(
+        self,
+        search: Optional[str] = None,
+        is_active: Optional[bool] = None,
+        page_size: int = 100
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream landing pages, newest first, following the API's pagination cursor.
+
+        Args:
+            search: Search query for title, slug, or content
+            is_active: Filter by active status
+            page_size: Landing pages fetched per request
+
+        Yields:
+            One landing page dict at a time
+        """
+        params = {'limit': page_size}
+        if search:
+            params['search'] = search
+        if is_active is not None:
+            params['is_active'] = str(is_active).lower()
+
+        while True:
+            response = self.session.get(f"{self.api_base}/landing-pages/", params=params)
+            self._check_response(response)
+            data = response.json()
+            yield from data.get('landing_pages', [])
+            if not data.get('next_cursor'):
+                return
+            params['cursor'] = data['next_cursor']
+
     def list_landing_pages(
         self, 
         search: Optional[str] = None, 
@@ -153,17 +214,9 @@ class LandingPageClient:
             is_active: Filter by active status
             
         Returns:
-            List of landing pages
+            List of all matching landing pages (see iter_landing_pages to stream them)
         """
-        params = {}
-        if search:
-            params['search'] = search
-        if is_active is not None:
-            params['is_active'] = str(is_active).lower()
-            
-        response = self.session.get(f"{self.api_base}/landing-pages/", params=params)
-        self._check_response(response)
-        return response.json().get('landing_pages', [])
+        return list(self.iter_landing_pages(search=search, is_active=is_active))
     
     def update_landing_page(
         self, 